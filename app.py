@@ -1,9 +1,11 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_from_directory
 from flask_pymongo import PyMongo
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt, get_jwt_identity, verify_jwt_in_request
 from flask_mail import Mail, Message
 from bson.objectid import ObjectId
 from bson import json_util
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 import os
 import re
 import ssl
@@ -12,13 +14,39 @@ import cloudinary
 import cloudinary.uploader
 import cloudinary.api
 from authlib.integrations.flask_client import OAuth
-import bcrypt
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import firebase_admin
 from firebase_admin import credentials, auth
 import json
 import math
-from pymongo import MongoClient
+import hashlib
+import uuid
+import gzip
+import threading
+import atexit
+import time
+from functools import lru_cache, wraps
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import MongoClient, UpdateOne
+from serialization import BSONJSONProvider, MSGPACK_MIMETYPE, msgpack, packb, wants_msgpack
+from compression import CompressionMiddleware
+import inventory
+import idempotency
+from smtp_pool import SMTPPool
+from password_hashing import PasswordHasher, PasswordHasherBusy
+from login_stats import LoginStatsBuffer
+from email_rendering import EmailRenderer
+from image_store import create_image_store
+import image_processing
+import photo_assets
+from map_tiles import lat_to_tile_y, lng_to_tile_x, tile_bounds, tile_match
+from responsive_images import responsive_url, srcset, with_responsive_images
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # Optional: responses fall back to gzip
 
 
 
@@ -26,6 +54,10 @@ from pymongo import MongoClient
 load_dotenv()
 
 app = Flask(__name__, template_folder=".")
+# Encode ObjectId/datetime/Decimal128 directly in jsonify responses
+app.json = BSONJSONProvider(app)
+# gzip/brotli for large responses, with compressed bodies cached by ETag
+app.wsgi_app = CompressionMiddleware(app.wsgi_app)
 
 # Configure Flask
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
@@ -117,6 +149,17 @@ else:
     if not cloudinary_api_secret:
         print("  - CLOUDINARY_API_SECRET is missing")
 
+# --- IMAGE STORE ---
+# Photos are uploaded by the browser straight to the store with signed
+# parameters; IMAGE_STORE=local uses a directory stand-in instead of Cloudinary
+image_store = create_image_store(
+    os.environ.get('IMAGE_STORE', 'auto'),
+    (cloudinary_cloud_name, cloudinary_api_key, cloudinary_api_secret),
+    os.environ.get('LOCAL_IMAGE_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'local_image_store')),
+    app.config['SECRET_KEY']
+)
+print(f"✓ Photo uploads go to the {image_store.name} image store")
+
 # --- FIREBASE ADMIN CONFIGURATION ---
 # Initialize Firebase Admin SDK
 firebase_config = {
@@ -159,6 +202,66 @@ app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER')
 # Initialize Mail
 mail = Mail(app)
 
+# Keep SMTP sessions open between sends instead of a new TLS login per message
+smtp_pool = SMTPPool(
+    mail,
+    max_connections=int(os.environ.get('SMTP_POOL_SIZE', 4)),
+    idle_timeout=int(os.environ.get('SMTP_IDLE_TIMEOUT', 60))
+)
+
+# HTML email templates in emails/, compiled once with their CSS inlined
+email_renderer = EmailRenderer(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'emails'))
+
+# Owner booking emails: 'instant' sends one per request, 'digest' collects new
+# requests into one email per window; owners pick theirs. Digests are only
+# mailed by a sweep (the thread below or `flask send-owner-digests` from cron)
+OWNER_NOTIFICATION_MODES = ('instant', 'digest')
+OWNER_NOTIFICATION_DEFAULT = os.environ.get('OWNER_NOTIFICATION_DEFAULT', 'instant')
+OWNER_DIGEST_MINUTES = int(os.environ.get('OWNER_DIGEST_MINUTES', 60))
+OWNER_DIGEST_SWEEP_SECONDS = int(os.environ.get('OWNER_DIGEST_SWEEP_SECONDS', 60))
+OWNER_DIGEST_CLAIM_MINUTES = int(os.environ.get('OWNER_DIGEST_CLAIM_MINUTES', 15))
+# Sweep thread on import, for WSGI servers; `python app.py` always starts it.
+# On by default when digest is the default mode, so those owners always get mail
+OWNER_DIGEST_THREAD = os.environ.get(
+    'OWNER_DIGEST_THREAD', 'true' if OWNER_NOTIFICATION_DEFAULT == 'digest' else 'false'
+).lower() in ['true', 'on', '1']
+PUBLIC_BASE_URL = os.environ.get('PUBLIC_BASE_URL', 'http://127.0.0.1:5000').rstrip('/')
+
+# --- BOOKING CONFIGURATION ---
+# How long a pending booking holds its room before it expires
+BOOKING_HOLD_HOURS = int(os.environ.get('BOOKING_HOLD_HOURS', 48))
+# Owner decisions: accepted as many per request, status each action moves a booking to
+BOOKING_BATCH_LIMIT = int(os.environ.get('BOOKING_BATCH_LIMIT', 200))
+BOOKING_ACTIONS = {'accept': 'accepted', 'reject': 'rejected'}
+
+# Booking emails are sent off the request thread
+notification_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('NOTIFICATION_WORKERS', 4)),
+    thread_name_prefix='notify'
+)
+
+# Listing photos are resized, uploaded and attached after the listing is saved
+photo_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('PHOTO_WORKERS', 2)),
+    thread_name_prefix='photos'
+)
+# Photo jobs live only in the process that took the upload; a listing still
+# processing after this long lost its job to a restart or crash
+PHOTO_JOB_TIMEOUT_MINUTES = int(os.environ.get('PHOTO_JOB_TIMEOUT_MINUTES', 15))
+
+# bcrypt runs in a bounded worker pool; logins and registrations beyond
+# workers + max pending are turned away with a 503 instead of queueing
+password_hasher = PasswordHasher(
+    workers=int(os.environ.get('BCRYPT_WORKERS', 2)),
+    max_pending=int(os.environ.get('BCRYPT_MAX_PENDING', 16)),
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', 12))
+)
+
+# Retried booking and listing submissions replay the first result for this long
+IDEMPOTENCY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_TTL_HOURS', 24))
+# A claim older than this is treated as abandoned by a crashed request
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', 60))
+
 # --- COLLEGE DATA ---
 def load_colleges():
     """Load colleges data from JSON file"""
@@ -172,8 +275,149 @@ def load_colleges():
         print(f"⚠ Error loading colleges data: {e}")
         return []
 
+# Words that don't contribute to a college's initials ("LDCE", not "LDCOE")
+COLLEGE_NAME_STOPWORDS = {'of', 'and', 'the', 'for', 'formerly'}
+
+def normalize_college_name(name):
+    """Lowercase, drop dots/apostrophes and collapse everything else to single spaces"""
+    name = re.sub(r"[.']", '', name.lower())
+    return ' '.join(re.split(r'[^a-z0-9]+', name)).strip()
+
+def college_name_aliases(name):
+    """Derive short aliases from a college name: initials and embedded acronyms"""
+    aliases = set()
+    main_name = name.split('(')[0]
+    initials = ''
+    for word in re.split(r'[\s.\-]+', main_name):
+        if not word or word.lower() in COLLEGE_NAME_STOPWORDS:
+            continue
+        initials += word if (len(word) > 1 and word.isupper()) else word[0]
+    if len(initials) > 1:
+        aliases.add(initials.lower())
+
+    # Acronyms written into the name, e.g. "DA-IICT", "PDEU", "(IIM-Ahmedabad)"
+    for word in re.split(r'[\s()]+', name):
+        letters = re.sub(r'[^A-Za-z]', '', word)
+        if len(letters) > 1 and letters.isupper():
+            aliases.add(letters.lower())
+        for part in word.split('-'):
+            part = re.sub(r'[^A-Za-z]', '', part)
+            if len(part) > 1 and part.isupper():
+                aliases.add(part.lower())
+    return aliases
+
+class CollegeIndex:
+    """Precomputed lookup maps over the college list, built once at load time"""
+
+    def __init__(self, college_list):
+        self.colleges = college_list
+        self.names = []
+        self.exact = {}
+        self.aliases = {}
+        self.tokens = {}
+        self.prefixes = {}
+
+        for position, college in enumerate(college_list):
+            normalized = normalize_college_name(college['Name'])
+            self.names.append(normalized)
+            self.exact.setdefault(normalized, position)
+            self.exact.setdefault(college['Name'].lower(), position)
+
+            aliases = college_name_aliases(college['Name'])
+            aliases.update(normalize_college_name(a).replace(' ', '') for a in college.get('Aliases', []))
+            for alias in aliases:
+                self.aliases.setdefault(alias, []).append(position)
+
+            for token in set(normalized.split()):
+                self.tokens.setdefault(token, set()).add(position)
+                for length in range(1, len(token) + 1):
+                    self.prefixes.setdefault(token[:length], set()).add(position)
+
+    def search(self, query, limit=5):
+        """Return up to `limit` (college, score) pairs, best match first"""
+        normalized = normalize_college_name(query or '')
+        if not normalized:
+            return []
+
+        scores = {}
+        if normalized in self.exact:
+            scores[self.exact[normalized]] = 100
+        for position in self.aliases.get(normalized.replace(' ', ''), []):
+            scores.setdefault(position, 90)
+
+        # Every query word must match a name word exactly or as a prefix
+        query_tokens = normalized.split()
+        candidates = None
+        for token in query_tokens:
+            matches = self.prefixes.get(token, set())
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                break
+        for position in candidates or ():
+            exact_hits = sum(1 for token in query_tokens if position in self.tokens.get(token, ()))
+            score = 50 + 20 * exact_hits / len(query_tokens)
+            if self.names[position].startswith(normalized):
+                score += 15
+            scores.setdefault(position, round(score, 1))
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self.names[item[0]]), item[0]))
+        return [(self.colleges[position], score) for position, score in ranked[:limit]]
+
 # Load colleges at startup
 colleges = load_colleges()
+college_index = CollegeIndex(colleges)
+
+# --- PRECOMPRESSED PAYLOADS ---
+# Static JSON datasets are serialized and compressed once at load time and
+# served from a content-hash URL that browsers may cache forever
+def build_static_payload(obj):
+    """Serialize obj once and keep its gzip/brotli (and msgpack) bodies in memory"""
+    body = json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(body).hexdigest()[:16]
+    return {
+        'digest': digest,
+        'identity': body,
+        'gzip': gzip.compress(body, 9),
+        'br': brotli.compress(body, quality=11) if brotli else None,
+        'msgpack': packb(obj) if msgpack else None
+    }
+
+def static_payload_etag(payload, variant):
+    """Strong ETag of one stored body; each encoding is a different representation"""
+    if variant == 'identity':
+        return f'"{payload["digest"]}"'
+    return f'"{payload["digest"]}-{variant}"'
+
+def static_payload_response(payload, cache_control):
+    """Serve a prebuilt payload, picking the best format and encoding the client accepts"""
+    if payload['msgpack'] is not None and wants_msgpack():
+        variant, mimetype = 'msgpack', MSGPACK_MIMETYPE
+    else:
+        mimetype = 'application/json'
+        variant = 'identity'
+        if payload['br'] and request.accept_encodings['br']:
+            variant = 'br'
+        elif request.accept_encodings['gzip']:
+            variant = 'gzip'
+    etag = static_payload_etag(payload, variant)
+    
+    # If-None-Match uses weak comparison over a comma-separated list (or *)
+    if request.if_none_match.contains_weak(etag.strip('"')):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(payload[variant], mimetype=mimetype)
+        if variant in ('gzip', 'br'):
+            response.headers['Content-Encoding'] = variant
+    response.headers['ETag'] = etag
+    response.headers['Vary'] = 'Accept, Accept-Encoding' if msgpack else 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+colleges_payload = build_static_payload({
+    'success': True,
+    'data': colleges,
+    'count': len(colleges)
+})
 
 def calculate_distance(lat1, lon1, lat2, lon2):
     """Calculate distance between two coordinates using Haversine formula"""
@@ -192,23 +436,287 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     return c * r
 
 def find_college_by_name(college_name):
-    """Find college by name (partial match)"""
+    """Find the best matching college by name, alias or word prefix"""
     if not college_name:
         return None
     
-    college_name_lower = college_name.lower()
+    matches = college_index.search(college_name, limit=1)
+    return matches[0][0] if matches else None
+
+# --- COLLEGE DISTANCE TABLE ---
+# Each hostel carries a sorted list of {college_id, distance} pairs for every
+# college within the horizon, so "hostels near college X" is one indexed query
+COLLEGE_DISTANCE_HORIZON_KM = float(os.environ.get('COLLEGE_DISTANCE_HORIZON_KM', 25))
+# Bump when hostel_location_fields() starts writing new fields so the startup
+# check backfills existing listings
+LOCATION_FIELDS_VERSION = 2
+EARTH_RADIUS_KM = 6371
+
+def colleges_fingerprint():
+    """Hash of the college coordinates, horizon and derived field layout the table was built from"""
+    payload = json.dumps(
+        [[c['NO.'], c['Latitude'], c['Longitude']] for c in colleges]
+        + [COLLEGE_DISTANCE_HORIZON_KM, LOCATION_FIELDS_VERSION]
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def compute_college_distances(latitude, longitude):
+    """Return [{college_id, distance}] for colleges within the horizon, nearest first"""
+    if not latitude or not longitude:
+        return []
+
+    pairs = []
     for college in colleges:
-        if college_name_lower in college['Name'].lower():
-            return college
-    return None
+        distance = calculate_distance(
+            college['Latitude'], college['Longitude'],
+            latitude, longitude
+        )
+        if distance <= COLLEGE_DISTANCE_HORIZON_KM:
+            pairs.append({'college_id': college['NO.'], 'distance': round(distance, 3)})
+
+    pairs.sort(key=lambda pair: pair['distance'])
+    return pairs
+
+def hostel_location_fields(latitude, longitude):
+    """Derived location fields stored on a hostel: GeoJSON point and college distances"""
+    geo = None
+    if latitude and longitude:
+        geo = {'type': 'Point', 'coordinates': [float(longitude), float(latitude)]}
+    return {
+        'geo': geo,
+        'college_distances': compute_college_distances(latitude, longitude)
+    }
+
+def rebuild_college_distances():
+    """Recompute the distance table for every hostel with coordinates"""
+    updates = []
+    for hostel in mongo.db.hostels.find({}, {'latitude': 1, 'longitude': 1}):
+        updates.append(UpdateOne(
+            {'_id': hostel['_id']},
+            {'$set': hostel_location_fields(hostel.get('latitude'), hostel.get('longitude'))}
+        ))
+        if len(updates) >= 500:
+            mongo.db.hostels.bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        mongo.db.hostels.bulk_write(updates, ordered=False)
+
+    mongo.db.meta.update_one(
+        {'_id': 'college_distances'},
+        {'$set': {'fingerprint': colleges_fingerprint(), 'rebuilt_at': datetime.utcnow()}},
+        upsert=True
+    )
 
-# --- API ENDPOINTS FOR JAVASCRIPT FRONTEND ---
-# Helper function to convert ObjectId to string
-def serialize_doc(doc):
-    if doc and '_id' in doc:
-        doc['_id'] = str(doc['_id'])
-    return doc
+def ensure_college_distances():
+    """Rebuild the distance table if colleges.json changed since the last build"""
+    state = mongo.db.meta.find_one({'_id': 'college_distances'})
+    if not state or state.get('fingerprint') != colleges_fingerprint():
+        print("Colleges data changed - rebuilding hostel distance table")
+        rebuild_college_distances()
+
+@app.cli.command('rebuild-college-distances')
+def rebuild_college_distances_command():
+    """Recompute college distances for all hostels"""
+    rebuild_college_distances()
+    print("✓ College distance table rebuilt")
+
+# --- DATABASE INDEXES ---
+def ensure_indexes():
+    """Create the indexes the API queries rely on"""
+    mongo.db.hostels.create_index([
+        ('college_distances.college_id', 1),
+        ('college_distances.distance', 1)
+    ])
+    mongo.db.hostels.create_index([('geo', '2dsphere')])
+    mongo.db.hostels.create_index([('latitude', 1), ('longitude', 1)])  # Map tiles
+    mongo.db.bookings.create_index([('user_id', 1), ('created_at', -1), ('_id', -1)])
+    mongo.db.bookings.create_index(
+        [('owner_digest_pending', 1), ('owner_id', 1), ('created_at', 1)],
+        partialFilterExpression={'owner_digest_pending': True}
+    )
+    mongo.db.bookings.create_index([('owner_digest_claimed_at', 1)], sparse=True)
+    inventory.ensure_inventory_indexes(mongo.db)
+    idempotency.ensure_idempotency_indexes(mongo.db, IDEMPOTENCY_TTL_HOURS)
+    photo_assets.ensure_photo_asset_indexes(mongo.db)
 
+if mongo.db is not None:
+    try:
+        ensure_indexes()
+        ensure_college_distances()
+    except Exception as e:
+        print(f"⚠ Index setup failed: {e}")
+
+# --- READ PATH ---
+# Opt-in fast path for read-only routes: documents come back as RawBSONDocument
+# (fields decode on first access, nested documents stay raw) and list views
+# only fetch the fields cards actually show
+RAW_BSON_READS = os.environ.get('RAW_BSON_READS', 'false').lower() in ['true', 'on', '1']
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+# Derived fields that only queries use
+HOSTEL_INTERNAL_PROJECTION = {'college_distances': 0, 'geo': 0}
+
+# Fields read by index.html cards and the frontend list components
+HOSTEL_CARD_PROJECTION = {
+    'name': 1, 'city': 1, 'location': 1, 'price': 1, 'original_price': 1,
+    'image': 1, 'image_card': 1, 'type': 1, 'property_type': 1, 'amenities': 1, 'desc': 1,
+    'latitude': 1, 'longitude': 1
+}
+
+# Compact hostel summary embedded in booking lists
+BOOKING_HOSTEL_PROJECTION = {
+    'name': 1, 'city': 1, 'location': 1, 'image': 1, 'image_card': 1, 'price': 1, 'property_type': 1
+}
+
+def hostel_list_projection(*computed):
+    """Projection for hostel list aggregations, keeping the computed fields (distances) on the card view"""
+    if not RAW_BSON_READS:
+        return HOSTEL_INTERNAL_PROJECTION
+    return dict(HOSTEL_CARD_PROJECTION, **{field: 1 for field in computed})
+
+def hostel_reader(view='detail'):
+    """Collection and projection for a read-only hostel query ('card' or 'detail' view)"""
+    if not RAW_BSON_READS:
+        return mongo.db.hostels, HOSTEL_INTERNAL_PROJECTION
+    projection = HOSTEL_CARD_PROJECTION if view == 'card' else HOSTEL_INTERNAL_PROJECTION
+    return mongo.db.hostels.with_options(codec_options=RAW_CODEC_OPTIONS), projection
+
+# Cards and galleries request width-limited Cloudinary copies instead of originals;
+# list payloads carry image_srcset, templates use these filters
+app.add_template_filter(responsive_url, 'responsive')
+app.add_template_filter(srcset, 'srcset')
+
+# --- TOKEN CLAIMS ---
+# Access tokens carry a snapshot of the user (name, user_type) and the
+# profile_version it was taken at, so routes that only need those can answer
+# from the token. A snapshot is trusted while it matches the user's current
+# version, which is cached per user for PROFILE_VERSION_TTL seconds; that TTL
+# bounds how long another process can serve a snapshot after a profile change.
+PROFILE_VERSION_TTL = float(os.environ.get('PROFILE_VERSION_TTL', 30))
+PROFILE_VERSION_CACHE_SIZE = 10000
+profile_versions = OrderedDict()  # user id -> (profile_version, or None if the user is gone; checked at)
+profile_versions_lock = threading.Lock()
+
+def issue_access_token(user):
+    """Access token for a user document, with its claims snapshot"""
+    return create_access_token(identity=str(user['_id']), additional_claims={
+        'name': user.get('name', ''),
+        'user_type': user.get('user_type', 'user'),
+        'pv': user.get('profile_version', 0)
+    })
+
+def current_profile_version(user_id):
+    """The user's profile_version (None if the user no longer exists), from the cache when fresh"""
+    now = time.monotonic()
+    with profile_versions_lock:
+        cached = profile_versions.get(user_id)
+        if cached and now - cached[1] < PROFILE_VERSION_TTL:
+            return cached[0]
+    user = mongo.db.users.find_one({'_id': ObjectId(user_id)}, {'profile_version': 1})
+    version = user.get('profile_version', 0) if user else None
+    with profile_versions_lock:
+        profile_versions[user_id] = (version, now)
+        profile_versions.move_to_end(user_id)
+        while len(profile_versions) > PROFILE_VERSION_CACHE_SIZE:
+            profile_versions.popitem(last=False)
+    return version
+
+def forget_profile_version(user_id):
+    """Drop the cached version after bumping profile_version, so this process sees it at once"""
+    with profile_versions_lock:
+        profile_versions.pop(str(user_id), None)
+
+def token_profile():
+    """Basic profile from the current token's claims, or None when they are stale or absent"""
+    claims = get_jwt()
+    if 'pv' not in claims:
+        return None  # Issued before tokens carried claims
+    user_id = get_jwt_identity()
+    if current_profile_version(user_id) != claims['pv']:
+        return None
+    return {'_id': user_id, 'name': claims['name'], 'user_type': claims['user_type'], 'profile_version': claims['pv']}
+
+def basic_profile():
+    """{_id, name, user_type, profile_version} of the current user: from the token's claims while
+    they are current, else from one projected lookup; None if the user no longer exists"""
+    profile = token_profile()
+    if profile:
+        return profile
+    user = mongo.db.users.find_one(
+        {'_id': ObjectId(get_jwt_identity())}, {'name': 1, 'user_type': 1, 'profile_version': 1}
+    )
+    if not user:
+        return None
+    return {
+        '_id': str(user['_id']),
+        'name': user.get('name', ''),
+        'user_type': user.get('user_type', 'user'),
+        'profile_version': user.get('profile_version', 0)
+    }
+
+# --- IDEMPOTENT SUBMISSIONS ---
+
+def current_api_user_id():
+    """User id from a JWT if one was sent, else from the login session"""
+    if verify_jwt_in_request(optional=True):
+        return get_jwt_identity()
+    return session.get('user_id')
+
+def idempotent(scope):
+    """Make a POST view replay its first response when retried with the same key.
+
+    The key comes from the Idempotency-Key header or an idempotency_key form
+    field and is scoped to the user. Requests without a key, or without a
+    logged-in user, run as before.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get('Idempotency-Key') or request.form.get('idempotency_key')
+            if request.method != 'POST' or not key or mongo.db is None:
+                return view(*args, **kwargs)
+            user_id = current_api_user_id()
+            if not user_id:
+                return view(*args, **kwargs)
+            
+            key_id = f'{scope}:{user_id}:{key[:128]}'
+            fingerprint = idempotency.request_fingerprint(
+                request.get_json(silent=True) if request.is_json else None,
+                request.form, request.files
+            )
+            outcome, record = idempotency.claim(mongo.db, key_id, fingerprint, IDEMPOTENCY_LOCK_SECONDS)
+            if outcome == idempotency.REPLAY:
+                response = app.response_class(record['body'], status=record['status'], headers=record['headers'])
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+            if outcome == idempotency.MISMATCH:
+                return jsonify({
+                    'success': False,
+                    'message': 'This Idempotency-Key was already used for a different request'
+                }), 422
+            if outcome == idempotency.IN_PROGRESS:
+                response = jsonify({
+                    'success': False,
+                    'message': 'This request is already being processed'
+                })
+                response.status_code = 409
+                response.headers['Retry-After'] = '1'
+                return response
+            
+            try:
+                response = app.make_response(view(*args, **kwargs))
+            except Exception:
+                idempotency.release(mongo.db, key_id)
+                raise
+            if response.status_code >= 500:
+                idempotency.release(mongo.db, key_id)  # Let the retry run it again
+            else:
+                idempotency.complete(mongo.db, key_id, response)
+            return response
+        return wrapper
+    return decorator
+
+# --- API ENDPOINTS FOR JAVASCRIPT FRONTEND ---
 @app.route('/api/hostels', methods=['GET'])
 def api_get_hostels():
     """Get all hostels as JSON API"""
@@ -230,13 +738,189 @@ def api_get_hostels():
         if amenities:
             query['amenities'] = {'$all': amenities}
         
-        hostels = list(mongo.db.hostels.find(query))
-        serialized_hostels = [serialize_doc(hostel) for hostel in hostels]
+        hostels_collection, projection = hostel_reader('card')
+        hostels = [with_responsive_images(hostel) for hostel in hostels_collection.find(query, projection)]
+        
+        return jsonify({
+            'success': True,
+            'data': hostels,
+            'count': len(hostels)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+# --- CATALOG VERSION ---
+# Incremented on every hostel write; derived caches key on it so they never
+# serve results from an older catalog
+def get_catalog_version():
+    """Current catalog version from the meta collection"""
+    state = mongo.db.meta.find_one({'_id': 'catalog'}, {'version': 1})
+    return state.get('version', 0) if state else 0
+
+def bump_catalog_version():
+    """Mark the hostel catalog as changed"""
+    mongo.db.meta.update_one({'_id': 'catalog'}, {'$inc': {'version': 1}}, upsert=True)
+
+# --- MAP TILES ---
+# Map queries are split into slippy-map tiles so each tile's result can be
+# cached per (zoom, x, y, catalog version) and shared between viewports
+MAP_MIN_ZOOM = 2
+MAP_POINT_ZOOM = int(os.environ.get('MAP_POINT_ZOOM', 15))
+MAP_GRID_SIZE = 8  # Cluster cells per tile edge
+MAP_MAX_TILES = 64
+
+@lru_cache(maxsize=2048)
+def map_tile(zoom, x, y, version):
+    """Clusters or compact points for one tile; `version` only keys the cache"""
+    west, south, east, north = tile_bounds(zoom, x, y)
+    match = tile_match(zoom, x, y)
+
+    if zoom >= MAP_POINT_ZOOM:
+        cursor = mongo.db.hostels.find(match, {'latitude': 1, 'longitude': 1, 'price': 1})
+        return tuple(
+            (str(h['_id']), h['latitude'], h['longitude'], h.get('price'))
+            for h in cursor
+        )
+
+    cell_width = (east - west) / MAP_GRID_SIZE
+    cell_height = (north - south) / MAP_GRID_SIZE
+    cells = mongo.db.hostels.aggregate([
+        {'$match': match},
+        {'$group': {
+            '_id': {
+                'x': {'$floor': {'$divide': [{'$subtract': ['$longitude', west]}, cell_width]}},
+                'y': {'$floor': {'$divide': [{'$subtract': ['$latitude', south]}, cell_height]}}
+            },
+            'count': {'$sum': 1},
+            'latitude': {'$avg': '$latitude'},
+            'longitude': {'$avg': '$longitude'},
+            'min_price': {'$min': '$price'}
+        }}
+    ])
+    return tuple(
+        (cell['count'], round(cell['latitude'], 6), round(cell['longitude'], 6), cell['min_price'])
+        for cell in cells
+    )
+
+@app.route('/api/hostels/map', methods=['GET'])
+def api_hostels_map():
+    """Hostel clusters (low zoom) or compact points (high zoom) for a map viewport"""
+    try:
+        try:
+            west, south, east, north = [float(v) for v in request.args.get('bbox', '').split(',')]
+            zoom = int(request.args.get('zoom', 12))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'bbox=west,south,east,north and an integer zoom are required'
+            }), 400
+        
+        if west > east or south > north:
+            # A viewport across the antimeridian has west > east; clients split it in two
+            return jsonify({
+                'success': False,
+                'message': 'bbox must have west <= east and south <= north; split viewports that cross the antimeridian'
+            }), 400
+        
+        zoom = max(MAP_MIN_ZOOM, min(zoom, 22))
+        min_x, max_x = lng_to_tile_x(west, zoom), lng_to_tile_x(east, zoom)
+        min_y, max_y = lat_to_tile_y(north, zoom), lat_to_tile_y(south, zoom)
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > MAP_MAX_TILES:
+            return jsonify({
+                'success': False,
+                'message': 'Viewport too large for this zoom level'
+            }), 400
+        
+        version = get_catalog_version()
+        items = []
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                items.extend(map_tile(zoom, x, y, version))
+        
+        if zoom >= MAP_POINT_ZOOM:
+            mode, fields = 'points', ['_id', 'latitude', 'longitude', 'price']
+        else:
+            mode, fields = 'clusters', ['count', 'latitude', 'longitude', 'min_price']
         
         return jsonify({
             'success': True,
-            'data': serialized_hostels,
-            'count': len(serialized_hostels)
+            'mode': mode,
+            'fields': fields,
+            'data': items,
+            'count': len(items),
+            'zoom': zoom,
+            'catalog_version': version
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/api/hostels/nearest', methods=['GET'])
+def api_nearest_hostels():
+    """The k hostels nearest to an arbitrary point, with distances in km"""
+    try:
+        try:
+            latitude = float(request.args['lat'])
+            longitude = float(request.args['lng'])
+            k = min(max(int(request.args.get('k', 10)), 1), 50)
+        except (KeyError, ValueError):
+            return jsonify({
+                'success': False,
+                'message': 'Numeric lat and lng are required'
+            }), 400
+        
+        max_distance = None  # Optional radius in km
+        if request.args.get('max_distance') not in (None, ''):
+            try:
+                max_distance = float(request.args['max_distance'])
+            except ValueError:
+                max_distance = float('nan')
+            if not math.isfinite(max_distance) or max_distance <= 0:
+                return jsonify({
+                    'success': False,
+                    'message': 'max_distance must be a positive number of km'
+                }), 400
+        
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return jsonify({
+                'success': False,
+                'message': 'Coordinates out of range'
+            }), 400
+        
+        # $geoNear walks the 2dsphere index outward from the point and stops
+        # after k documents, so cost follows k rather than catalog size
+        geo_near = {
+            'near': {'type': 'Point', 'coordinates': [longitude, latitude]},
+            'key': 'geo',
+            'distanceField': 'distance',
+            'distanceMultiplier': 0.001,  # Metres to km
+            'spherical': True
+        }
+        if max_distance is not None:
+            geo_near['maxDistance'] = max_distance * 1000
+        property_type = request.args.get('property_type', 'all')
+        if property_type in ('hostel', 'pg', 'apartment'):
+            geo_near['query'] = {'property_type': {'$regex': f'^{property_type}', '$options': 'i'}}
+        
+        hostels = list(mongo.db.hostels.aggregate([
+            {'$geoNear': geo_near},
+            {'$limit': k},
+            {'$project': hostel_list_projection('distance')}
+        ]))
+        hostels = [with_responsive_images(dict(hostel, distance=round(hostel['distance'], 2))) for hostel in hostels]
+        
+        return jsonify({
+            'success': True,
+            'data': hostels,
+            'count': len(hostels),
+            'latitude': latitude,
+            'longitude': longitude,
+            'k': k
         })
     except Exception as e:
         return jsonify({
@@ -248,11 +932,12 @@ def api_get_hostels():
 def api_get_hostel(hostel_id):
     """Get specific hostel by ID as JSON API"""
     try:
-        hostel = mongo.db.hostels.find_one({"_id": ObjectId(hostel_id)})
+        hostels_collection, projection = hostel_reader('detail')
+        hostel = hostels_collection.find_one({"_id": ObjectId(hostel_id)}, projection)
         if hostel:
             return jsonify({
                 'success': True,
-                'data': serialize_doc(hostel)
+                'data': hostel
             })
         else:
             return jsonify({
@@ -346,13 +1031,13 @@ def api_search_hostels():
         else:
             search_query = {}
         
-        hostels = list(mongo.db.hostels.find(search_query))
-        serialized_hostels = [serialize_doc(hostel) for hostel in hostels]
+        hostels_collection, projection = hostel_reader('card')
+        hostels = [with_responsive_images(hostel) for hostel in hostels_collection.find(search_query, projection)]
         
         return jsonify({
             'success': True,
-            'data': serialized_hostels,
-            'count': len(serialized_hostels),
+            'data': hostels,
+            'count': len(hostels),
             'query': query,
             'property_type': property_type
         })
@@ -364,12 +1049,44 @@ def api_search_hostels():
 
 @app.route('/api/colleges', methods=['GET'])
 def api_get_colleges():
-    """Get all colleges as JSON API"""
+    """Get all colleges as JSON API (revalidated by ETag on every use)"""
     try:
+        response = static_payload_response(colleges_payload, 'no-cache')
+        response.headers['Content-Location'] = url_for('api_get_colleges_versioned', digest=colleges_payload['digest'])
+        return response
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/api/colleges/<digest>.json', methods=['GET'])
+def api_get_colleges_versioned(digest):
+    """Get all colleges from a content-hash URL that never changes"""
+    if digest != colleges_payload['digest']:
+        # Stale link from an older page; send the client to the current version
+        return redirect(url_for('api_get_colleges_versioned', digest=colleges_payload['digest']))
+    return static_payload_response(colleges_payload, 'public, max-age=31536000, immutable')
+
+@app.route('/api/colleges/search', methods=['GET'])
+def api_search_colleges():
+    """Resolve a college name or alias to ranked candidates"""
+    try:
+        query = request.args.get('q', '')
+        try:
+            limit = min(max(int(request.args.get('limit', 5)), 1), 20)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'limit must be an integer'
+            }), 400
+        matches = college_index.search(query, limit=limit)
+        
         return jsonify({
             'success': True,
-            'data': colleges,
-            'count': len(colleges)
+            'data': [dict(college, score=score) for college, score in matches],
+            'count': len(matches),
+            'query': query
         })
     except Exception as e:
         return jsonify({
@@ -400,50 +1117,165 @@ def api_search_hostels_by_college():
                 'message': f'College "{college_name}" not found'
             }), 404
         
-        # Get all hostels with coordinates
-        hostels = list(mongo.db.hostels.find({
-            'latitude': {'$exists': True},
-            'longitude': {'$exists': True}
-        }))
+        # Hostels within range of the college, read from the precomputed
+        # distance table (distances beyond the horizon are not stored)
+        max_distance = min(max_distance, COLLEGE_DISTANCE_HORIZON_KM)
+        college_id = college['NO.']
+        match = {
+            'college_distances': {
+                '$elemMatch': {'college_id': college_id, 'distance': {'$lte': max_distance}}
+            }
+        }
+        if property_type and property_type != 'all' and property_type in ('hostel', 'pg', 'apartment'):
+            match['property_type'] = {'$regex': f'^{property_type}', '$options': 'i'}
+
+        nearby_hostels = list(mongo.db.hostels.aggregate([
+            {'$match': match},
+            {'$addFields': {'distance_from_college': {'$arrayElemAt': [
+                {'$filter': {
+                    'input': '$college_distances',
+                    'as': 'pair',
+                    'cond': {'$eq': ['$$pair.college_id', college_id]}
+                }},
+                0
+            ]}}},
+            {'$addFields': {'distance_from_college': {'$round': ['$distance_from_college.distance', 2]}}},
+            {'$sort': {'distance_from_college': 1}},
+            {'$project': hostel_list_projection('distance_from_college')}
+        ]))
+        nearby_hostels = [with_responsive_images(hostel) for hostel in nearby_hostels]
         
-        # Filter hostels within distance and by property type
-        nearby_hostels = []
-        for hostel in hostels:
-            if not hostel.get('latitude') or not hostel.get('longitude'):
-                continue
-                
-            distance = calculate_distance(
-                college['Latitude'], college['Longitude'],
-                hostel['latitude'], hostel['longitude']
-            )
-            
-            if distance <= max_distance:
-                # Add distance to hostel data
-                hostel['distance_from_college'] = round(distance, 2)
-                
-                # Filter by property type if specified
-                if property_type and property_type != 'all':
-                    if property_type == 'hostel' and not hostel.get('property_type', '').lower().startswith('hostel'):
-                        continue
-                    elif property_type == 'pg' and not hostel.get('property_type', '').lower().startswith('pg'):
-                        continue
-                    elif property_type == 'apartment' and not hostel.get('property_type', '').lower().startswith('apartment'):
-                        continue
-                
-                nearby_hostels.append(hostel)
+        return jsonify({
+            'success': True,
+            'data': nearby_hostels,
+            'count': len(nearby_hostels),
+            'college': college,
+            'max_distance': max_distance,
+            'query': college_name
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+def resolve_search_point(point):
+    """Turn a {college_name | latitude/longitude, weight} spec into a search point"""
+    if not isinstance(point, dict):
+        raise ValueError('Each point must be an object')
+    weight = float(point.get('weight', 1))
+    if weight <= 0:
+        raise ValueError('Point weights must be positive')
+
+    if point.get('college_name'):
+        college = find_college_by_name(point['college_name'])
+        if not college:
+            raise LookupError(f'College "{point["college_name"]}" not found')
+        return {
+            'label': college['Name'],
+            'latitude': college['Latitude'],
+            'longitude': college['Longitude'],
+            'weight': weight
+        }
+
+    if point.get('latitude') is None or point.get('longitude') is None:
+        raise ValueError('Each point needs a college_name or latitude and longitude')
+    return {
+        'label': point.get('label', 'Location'),
+        'latitude': float(point['latitude']),
+        'longitude': float(point['longitude']),
+        'weight': weight
+    }
+
+def rank_by_distance(hostels, points, rank_by):
+    """Score hostels by their distances to the points and return them best first.
+
+    'max' scores by the farthest point, so every point is close; 'weighted'
+    by the weighted mean distance, so heavier points pull harder.
+    """
+    total_weight = sum(p['weight'] for p in points)
+    for hostel in hostels:
+        distances = [calculate_distance(p['latitude'], p['longitude'], hostel['latitude'], hostel['longitude'])
+                     for p in points]
+        if rank_by == 'max':
+            score = max(distances)
+        else:
+            score = sum(p['weight'] * d for p, d in zip(points, distances)) / total_weight
+        hostel['distances'] = [round(d, 2) for d in distances]
+        hostel['score'] = round(score, 2)
+    return sorted(hostels, key=lambda x: x['score'])
+
+@app.route('/api/hostels/search/multi', methods=['POST'])
+def api_search_hostels_multi():
+    """Search hostels near several colleges or points, ranked by max or weighted distance"""
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({
+                'success': False,
+                'message': 'A JSON object body is required'
+            }), 400
+        try:
+            max_distance = float(data.get('max_distance', 5))  # Radius around every point
+        except (TypeError, ValueError):
+            max_distance = None
+        if max_distance is None or not math.isfinite(max_distance) or max_distance <= 0:
+            return jsonify({
+                'success': False,
+                'message': 'max_distance must be a positive number of km'
+            }), 400
+        rank_by = data.get('rank_by', 'max')
+        property_type = data.get('property_type', 'all')
+        raw_points = data.get('points', [])
         
-        # Sort by distance
-        nearby_hostels.sort(key=lambda x: x['distance_from_college'])
+        if not isinstance(raw_points, list):
+            return jsonify({
+                'success': False,
+                'message': 'points must be a list'
+            }), 400
+        if rank_by not in ('max', 'weighted'):
+            return jsonify({
+                'success': False,
+                'message': 'rank_by must be "max" or "weighted"'
+            }), 400
         
-        serialized_hostels = [serialize_doc(hostel) for hostel in nearby_hostels]
+        try:
+            points = [resolve_search_point(point) for point in raw_points]
+        except LookupError as e:
+            return jsonify({'success': False, 'message': str(e)}), 404
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        if len(points) < 2:
+            return jsonify({
+                'success': False,
+                'message': 'At least two points are required'
+            }), 400
+        
+        # A hostel must be within max_distance of every point, so the
+        # candidate set is the intersection of one 2dsphere circle per point
+        radius = max_distance / EARTH_RADIUS_KM
+        conditions = [
+            {'geo': {'$geoWithin': {'$centerSphere': [[p['longitude'], p['latitude']], radius]}}}
+            for p in points
+        ]
+        if property_type and property_type != 'all' and property_type in ('hostel', 'pg', 'apartment'):
+            conditions.append({'property_type': {'$regex': f'^{property_type}', '$options': 'i'}})
+        
+        hostels = [
+            with_responsive_images(hostel)
+            for hostel in mongo.db.hostels.find({'$and': conditions}, hostel_list_projection())
+        ]
+        
+        hostels = rank_by_distance(hostels, points, rank_by)
         
         return jsonify({
             'success': True,
-            'data': serialized_hostels,
-            'count': len(serialized_hostels),
-            'college': college,
+            'data': hostels,
+            'count': len(hostels),
+            'points': points,
             'max_distance': max_distance,
-            'query': college_name
+            'rank_by': rank_by
         })
     except Exception as e:
         return jsonify({
@@ -454,19 +1286,30 @@ def api_search_hostels_by_college():
 @app.route('/api/user/profile', methods=['GET'])
 @jwt_required()
 def api_get_user_profile():
-    """Get current user profile as JSON API"""
+    """Get current user profile as JSON API; ?basic=1 returns only {_id, name, user_type, profile_version}"""
     try:
+        if request.args.get('basic') in ('1', 'true'):
+            profile = basic_profile()
+            if profile:
+                return jsonify({
+                    'success': True,
+                    'data': profile
+                })
+            return jsonify({
+                'success': False,
+                'message': 'User not found'
+            }), 404
+        
         current_user_id = get_jwt_identity()
         user = mongo.db.users.find_one({"_id": ObjectId(current_user_id)})
         
         if user:
             # Remove password from response
-            user_data = serialize_doc(user)
-            user_data.pop('password', None)
+            user.pop('password', None)
             
             return jsonify({
                 'success': True,
-                'data': user_data
+                'data': user
             })
         else:
             return jsonify({
@@ -482,15 +1325,63 @@ def api_get_user_profile():
 @app.route('/api/user/bookings', methods=['GET'])
 @jwt_required()
 def api_get_user_bookings():
-    """Get user bookings as JSON API"""
+    """Get user bookings as JSON API, newest first, with a hostel card per booking"""
     try:
         current_user_id = get_jwt_identity()
-        # This would integrate with a bookings collection
-        # For now, return empty array
+        try:
+            limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'limit must be an integer'
+            }), 400
+        cursor = request.args.get('cursor')
+        
+        match = {'user_id': ObjectId(current_user_id)}
+        if cursor:
+            # Keyset pagination: continue strictly after the last (created_at, _id) seen
+            try:
+                created_ms, last_id = cursor.split('-', 1)
+                created_at = datetime.utcfromtimestamp(int(created_ms) / 1000)
+                last_id = ObjectId(last_id)
+            except Exception:
+                return jsonify({
+                    'success': False,
+                    'message': 'Invalid cursor'
+                }), 400
+            match['$or'] = [
+                {'created_at': {'$lt': created_at}},
+                {'created_at': created_at, '_id': {'$lt': last_id}}
+            ]
+        
+        bookings = list(mongo.db.bookings.aggregate([
+            {'$match': match},
+            {'$sort': {'created_at': -1, '_id': -1}},
+            {'$limit': limit + 1},
+            {'$lookup': {
+                'from': 'hostels',
+                'let': {'hostel_id': '$hostel_id'},
+                'pipeline': [
+                    {'$match': {'$expr': {'$eq': ['$_id', '$$hostel_id']}}},
+                    {'$project': BOOKING_HOSTEL_PROJECTION}
+                ],
+                'as': 'hostel'
+            }},
+            {'$unwind': {'path': '$hostel', 'preserveNullAndEmptyArrays': True}}
+        ]))
+        
+        next_cursor = None
+        if len(bookings) > limit:
+            bookings = bookings[:limit]
+            last = bookings[-1]
+            created_ms = int(last['created_at'].replace(tzinfo=timezone.utc).timestamp() * 1000)
+            next_cursor = f"{created_ms}-{last['_id']}"
+        
         return jsonify({
             'success': True,
-            'data': [],
-            'message': 'Bookings feature coming soon'
+            'data': bookings,
+            'count': len(bookings),
+            'next_cursor': next_cursor
         })
     except Exception as e:
         return jsonify({
@@ -500,6 +1391,7 @@ def api_get_user_bookings():
 
 @app.route('/api/bookings/request', methods=['POST'])
 @jwt_required()
+@idempotent('booking')
 def api_request_booking():
     """Submit booking request and send confirmation emails"""
     try:
@@ -550,7 +1442,24 @@ def api_request_booking():
                 'message': 'Hostel not found'
             }), 404
         
+        # Hold a room of this type; expired holds are swept before giving up
+        reservation = inventory.reserve_room(mongo.db, hostel['_id'], room_id)
+        if reservation == inventory.SOLD_OUT and inventory.expire_pending_bookings(mongo.db, hostel['_id'], room_id):
+            reservation = inventory.reserve_room(mongo.db, hostel['_id'], room_id)
+        if reservation == inventory.SOLD_OUT:
+            return jsonify({
+                'success': False,
+                'message': f'No {property_type} - {facility} rooms are available at {hostel["name"]} right now'
+            }), 409
+        
+        # Owners in digest mode hear about this booking in their next digest
+        owner = None
+        if ObjectId.is_valid(hostel.get('created_by')):
+            owner = mongo.db.users.find_one({'_id': ObjectId(hostel['created_by'])}, {'notification_mode': 1})
+        digest_owner = owner is not None and owner_notification_mode(owner) == 'digest'
+        
         # Create booking record
+        now = datetime.utcnow()
         booking = {
             'user_id': ObjectId(current_user_id),
             'hostel_id': ObjectId(hostel_id),
@@ -558,73 +1467,47 @@ def api_request_booking():
             'property_type': property_type,
             'facility': facility,
             'status': 'pending',
-            'created_at': datetime.utcnow()
+            'room_reserved': reservation == inventory.RESERVED,
+            'created_at': now,
+            'expires_at': now + timedelta(hours=BOOKING_HOLD_HOURS)
         }
+        if digest_owner:
+            booking['owner_id'] = owner['_id']
+            booking['owner_digest_pending'] = True
         
         # Save booking to database
-        mongo.db.bookings.insert_one(booking)
+        try:
+            mongo.db.bookings.insert_one(booking)
+        except Exception:
+            if booking['room_reserved']:
+                inventory.release_room(mongo.db, hostel['_id'], room_id)
+            raise
         
         # Send confirmation emails
         try:
             # Email to user
-            user_subject = f"Booking Request Confirmed - {hostel['name']}"
-            user_msg = Message(
-                user_subject,
+            email_context = {'user': user, 'hostel': hostel, 'property_type': property_type, 'facility': facility}
+            outgoing = [email_renderer.message(
+                'booking_confirmation_user',
+                f"Booking Request Confirmed - {hostel['name']}",
                 sender=app.config['MAIL_DEFAULT_SENDER'],
-                recipients=[user['email']]
-            )
-            user_msg.body = f"""
-Dear {user.get('name', 'User')},
-
-Your booking request for {hostel['name']} has been received.
-
-Details:
-- Property: {hostel['name']}
-- Location: {hostel.get('location', 'N/A')}, {hostel.get('city', 'N/A')}
-- Room Type: {property_type}
-- Facility: {facility}
-- Status: Pending
-- Request Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-
-Thank you for using Stayfinder! We'll notify you once the property owner confirms your booking.
-
-Best regards,
-Stayfinder Team
-            """
-            mail.send(user_msg)
-            print(f" User email sent to: {user['email']}")
+                recipients=[user['email']],
+                **email_context
+            )]
             
-            # Email to owner (if contact email exists)
-            if hostel.get('contact_email'):
-                owner_subject = f"New Booking Request - {property_type} - {facility}"
-                owner_msg = Message(
-                    owner_subject,
+            # Email to owner (if contact email exists and they want one per request)
+            if hostel.get('contact_email') and not digest_owner:
+                outgoing.append(email_renderer.message(
+                    'booking_confirmation_owner',
+                    f"New Booking Request - {property_type} - {facility}",
                     sender=app.config['MAIL_DEFAULT_SENDER'],
-                    recipients=[hostel['contact_email']]
-                )
-                owner_msg.body = f"""
-New Booking Request!
-
-Property Details:
-- Name: {hostel['name']}
-- Location: {hostel.get('location', 'N/A')}, {hostel.get('city', 'N/A')}
-- Room Type: {property_type}
-- Facility: {facility}
-
-User Details:
-- Name: {user.get('name', 'Unknown')}
-- Email: {user.get('email', 'No email')}
-- Phone: {user.get('phone', 'Not provided')}
-- Request Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-
-Action Required:
-Please contact the user to confirm availability and proceed with the booking.
-
-Best regards,
-Stayfinder Team
-                """
-                mail.send(owner_msg)
-                print(f" Owner email sent to: {hostel['contact_email']}")
+                    recipients=[hostel['contact_email']],
+                    **email_context
+                ))
+            
+            # Both emails go over one pooled SMTP session
+            smtp_pool.send(*outgoing)
+            print(f" Booking emails sent to: {', '.join(m.recipients[0] for m in outgoing)}")
                 
         except Exception as email_error:
             print(f" Email sending failed: {email_error}")
@@ -642,6 +1525,422 @@ Stayfinder Team
             'message': str(e)
         }), 500
 
+@app.route('/api/hostels/<hostel_id>/inventory', methods=['GET'])
+def api_get_inventory(hostel_id):
+    """Room capacity and availability per room type"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': inventory.get_inventory(mongo.db, ObjectId(hostel_id))
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/api/hostels/<hostel_id>/inventory', methods=['PUT'])
+@jwt_required()
+def api_set_inventory(hostel_id):
+    """Set room capacities, e.g. {"double_ac": 4, "triple_regular": 6}"""
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        hostel = mongo.db.hostels.find_one({"_id": ObjectId(hostel_id)}, {'created_by': 1})
+        if not hostel:
+            return jsonify({
+                'success': False,
+                'message': 'Hostel not found'
+            }), 404
+        if hostel.get('created_by') != current_user_id:
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        for room_id, capacity in data.items():
+            if not isinstance(capacity, int) or capacity < 0:
+                return jsonify({
+                    'success': False,
+                    'message': f'Capacity for {room_id} must be a non-negative integer'
+                }), 400
+        
+        for room_id, capacity in data.items():
+            inventory.set_capacity(mongo.db, hostel['_id'], room_id, capacity)
+        
+        return jsonify({
+            'success': True,
+            'data': inventory.get_inventory(mongo.db, hostel['_id']),
+            'message': 'Room inventory updated'
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+# --- OWNER BOOKING DECISIONS ---
+
+def apply_booking_decisions(owner_id, decisions):
+    """Accept or reject pending bookings on the owner's listings.
+
+    decisions maps booking ObjectIds to an action in BOOKING_ACTIONS. One
+    query checks every booking belongs to the owner, one bulk write moves
+    them out of pending, and rejected bookings give their rooms back.
+    Returns (applied bookings, {booking id: reason} for the rest).
+    """
+    owned = {
+        booking['_id']: booking
+        for booking in mongo.db.bookings.aggregate([
+            {'$match': {'_id': {'$in': list(decisions)}}},
+            {'$lookup': {'from': 'hostels', 'localField': 'hostel_id', 'foreignField': '_id', 'as': 'hostel'}},
+            {'$unwind': '$hostel'},
+            {'$match': {'hostel.created_by': owner_id}},
+            {'$project': {'status': 1, 'user_id': 1, 'hostel_id': 1, 'room_id': 1, 'room_reserved': 1,
+                          'property_type': 1, 'facility': 1, 'hostel_name': '$hostel.name'}}
+        ])
+    }
+
+    skipped = {}
+    for booking_id in decisions:
+        if booking_id not in owned:
+            skipped[booking_id] = 'not_found'
+        elif owned[booking_id].get('status') != 'pending':
+            skipped[booking_id] = 'not_pending'
+    pending = [booking_id for booking_id in decisions if booking_id not in skipped]
+    if not pending:
+        return [], skipped
+
+    # The status filter makes each transition happen once even if two
+    # requests race; the batch tag tells us afterwards which ones we won
+    batch = ObjectId()
+    now = datetime.utcnow()
+    mongo.db.bookings.bulk_write([
+        UpdateOne(
+            {'_id': booking_id, 'status': 'pending'},
+            {'$set': {'status': BOOKING_ACTIONS[decisions[booking_id]], 'decided_at': now,
+                      'updated_at': now, 'decision_batch': batch},
+             '$unset': {'owner_digest_pending': ''}}  # Already decided; nothing to put in a digest
+        )
+        for booking_id in pending
+    ], ordered=False)
+
+    won = {
+        booking['_id']
+        for booking in mongo.db.bookings.find({'_id': {'$in': pending}, 'decision_batch': batch}, {'_id': 1})
+    }
+    applied = []
+    for booking_id in pending:
+        if booking_id in won:
+            applied.append(dict(owned[booking_id], status=BOOKING_ACTIONS[decisions[booking_id]]))
+        else:
+            skipped[booking_id] = 'not_pending'
+
+    inventory.release_rooms(mongo.db, [b for b in applied if b['status'] == 'rejected'])
+    return applied, skipped
+
+def send_booking_decision_emails(bookings):
+    """Tell each user whether their booking was accepted or rejected"""
+    with app.app_context():
+        users = {
+            user['_id']: user
+            for user in mongo.db.users.find(
+                {'_id': {'$in': list({b['user_id'] for b in bookings})}},
+                {'name': 1, 'email': 1}
+            )
+        }
+        with smtp_pool.connection() as conn:
+            for booking in bookings:
+                user = users.get(booking['user_id'])
+                if not user or not user.get('email'):
+                    continue
+                try:
+                    conn.send(email_renderer.message(
+                        'booking_decision',
+                        f"Booking {booking['status'].title()} - {booking.get('hostel_name', 'Stayfinder')}",
+                        sender=app.config['MAIL_DEFAULT_SENDER'],
+                        recipients=[user['email']],
+                        user=user, booking=booking
+                    ))
+                except Exception as email_error:
+                    print(f" Booking decision email failed for {user['email']}: {email_error}")
+
+def notify_booking_decisions(bookings):
+    """Queue decision emails so the owner's request doesn't wait on SMTP"""
+    if bookings:
+        notification_executor.submit(send_booking_decision_emails, bookings)
+
+def parse_booking_decisions(items):
+    """Turn [{"booking_id": ..., "action": ...}] into {ObjectId: action}"""
+    decisions = {}
+    for item in items:
+        action = str(item.get('action', '')).lower()
+        if action not in BOOKING_ACTIONS:
+            raise ValueError(f"Unknown action '{item.get('action')}', expected accept or reject")
+        if not ObjectId.is_valid(item.get('booking_id')):
+            raise ValueError(f"Invalid booking id '{item.get('booking_id')}'")
+        decisions[ObjectId(item['booking_id'])] = action
+    return decisions
+
+@app.route('/api/bookings/<booking_id>/<action>', methods=['POST'])
+def api_booking_decision(booking_id, action):
+    """Accept or reject one booking on the owner's listing"""
+    try:
+        owner_id = current_api_user_id()
+        if not owner_id:
+            return jsonify({'success': False, 'message': 'Please login first'}), 401
+        
+        try:
+            decisions = parse_booking_decisions([{'booking_id': booking_id, 'action': action}])
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        applied, skipped = apply_booking_decisions(owner_id, decisions)
+        if skipped.get(ObjectId(booking_id)) == 'not_found':
+            return jsonify({'success': False, 'message': 'Booking not found'}), 404
+        if skipped:
+            return jsonify({'success': False, 'message': 'Booking is no longer pending'}), 409
+        
+        notify_booking_decisions(applied)
+        return jsonify({
+            'success': True,
+            'data': {'booking_id': booking_id, 'status': applied[0]['status']},
+            'message': f"Booking {applied[0]['status']}"
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/api/bookings/bulk', methods=['POST'])
+def api_bulk_booking_decisions():
+    """Apply many decisions at once: {"decisions": [{"booking_id": ..., "action": "accept"}]}"""
+    try:
+        owner_id = current_api_user_id()
+        if not owner_id:
+            return jsonify({'success': False, 'message': 'Please login first'}), 401
+        
+        items = (request.get_json(silent=True) or {}).get('decisions')
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'message': 'decisions must be a non-empty list'}), 400
+        if len(items) > BOOKING_BATCH_LIMIT:
+            return jsonify({
+                'success': False,
+                'message': f'At most {BOOKING_BATCH_LIMIT} decisions per request'
+            }), 400
+        
+        try:
+            decisions = parse_booking_decisions(items)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        applied, skipped = apply_booking_decisions(owner_id, decisions)
+        notify_booking_decisions(applied)
+        return jsonify({
+            'success': True,
+            'data': {
+                'updated': [{'booking_id': b['_id'], 'status': b['status']} for b in applied],
+                'skipped': [{'booking_id': k, 'reason': v} for k, v in skipped.items()]
+            },
+            'message': f'{len(applied)} bookings updated, {len(skipped)} skipped'
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+# --- OWNER BOOKING DIGESTS ---
+
+def owner_notification_mode(owner):
+    return owner.get('notification_mode') or OWNER_NOTIFICATION_DEFAULT
+
+def send_owner_digests(now=None):
+    """Send one email per owner covering their bookings not yet notified.
+
+    An owner's digest goes out once their oldest unsent booking is
+    OWNER_DIGEST_MINUTES old. Bookings are claimed before sending, so
+    overlapping sweeps (several workers, the CLI) never mail one twice.
+    A failed send gives the claim back; claims left by a sweep that died
+    are reclaimed after OWNER_DIGEST_CLAIM_MINUTES, as are those of owners
+    with no email address. Bookings the owner already accepted or rejected
+    are left out.
+    Returns the number of digests sent.
+    """
+    now = now or datetime.utcnow()
+    reclaim_stale_owner_digests(now)
+    cutoff = now - timedelta(minutes=OWNER_DIGEST_MINUTES)
+    due = list(mongo.db.bookings.aggregate([
+        {'$match': {'owner_digest_pending': True, 'status': 'pending'}},
+        {'$group': {'_id': '$owner_id', 'oldest': {'$min': '$created_at'}, 'booking_ids': {'$push': '$_id'}}},
+        {'$match': {'oldest': {'$lte': cutoff}}}
+    ]))
+    if not due:
+        return 0
+    
+    sent = 0
+    owners = {
+        owner['_id']: owner
+        for owner in mongo.db.users.find({'_id': {'$in': [d['_id'] for d in due]}}, {'name': 1, 'email': 1})
+    }
+    with app.app_context(), smtp_pool.connection() as conn:
+        for group in due:
+            batch = ObjectId()
+            mongo.db.bookings.update_many(
+                {'_id': {'$in': group['booking_ids']}, 'owner_digest_pending': True, 'status': 'pending'},
+                {'$set': {'owner_digest_pending': False, 'owner_digest_batch': batch, 'owner_digest_claimed_at': now}}
+            )
+            recipient = None
+            try:
+                bookings = list(mongo.db.bookings.find({'_id': {'$in': group['booking_ids']}, 'owner_digest_batch': batch}).sort('created_at', 1))
+                if not bookings:
+                    continue  # Another sweep got there first
+                
+                users = {u['_id']: u for u in mongo.db.users.find(
+                    {'_id': {'$in': list({b['user_id'] for b in bookings})}}, {'name': 1, 'email': 1, 'phone': 1})}
+                hostels = {h['_id']: h for h in mongo.db.hostels.find(
+                    {'_id': {'$in': list({b['hostel_id'] for b in bookings})}}, {'name': 1, 'contact_email': 1})}
+                for booking in bookings:
+                    booking['user'] = users.get(booking['user_id'], {})
+                    booking['hostel'] = hostels.get(booking['hostel_id'], {})
+                
+                owner = owners.get(group['_id'], {})
+                recipient = owner.get('email') or bookings[0]['hostel'].get('contact_email')
+                if not recipient:
+                    # Nothing is marked notified: the claim lapses and these bookings are
+                    # retried after OWNER_DIGEST_CLAIM_MINUTES, e.g. once the owner adds an email
+                    print(f" Owner digest skipped for owner {group['_id']}: no email address")
+                    continue
+                conn.send(email_renderer.message(
+                    'owner_booking_digest',
+                    f"{len(bookings)} New Booking Request{'s' if len(bookings) != 1 else ''} - Stayfinder",
+                    sender=app.config['MAIL_DEFAULT_SENDER'],
+                    recipients=[recipient],
+                    owner=owner,
+                    bookings=bookings,
+                    since=bookings[0]['created_at'],
+                    dashboard_url=f'{PUBLIC_BASE_URL}/owner-dashboard'
+                ))
+                sent += 1
+            except Exception as email_error:
+                # Give the claim back so the next sweep retries these bookings
+                print(f" Owner digest failed for {recipient or group['_id']}: {email_error}")
+                release_owner_digest_claim({'owner_digest_batch': batch, '_id': {'$in': group['booking_ids']}})
+                continue
+            mongo.db.bookings.update_many(
+                {'_id': {'$in': [b['_id'] for b in bookings]}},
+                {'$set': {'owner_notified_at': now},
+                 '$unset': {'owner_digest_pending': '', 'owner_digest_batch': '', 'owner_digest_claimed_at': ''}}
+            )
+    return sent
+
+def release_owner_digest_claim(query):
+    mongo.db.bookings.update_many(
+        query,
+        {'$set': {'owner_digest_pending': True}, '$unset': {'owner_digest_batch': '', 'owner_digest_claimed_at': ''}}
+    )
+
+def reclaim_stale_owner_digests(now):
+    """Put back bookings claimed by a sweep that died before sending (killed worker, deploy)"""
+    release_owner_digest_claim({
+        'owner_digest_claimed_at': {'$lte': now - timedelta(minutes=OWNER_DIGEST_CLAIM_MINUTES)},
+        'status': 'pending'
+    })
+
+def owner_digest_loop():
+    """Background sweep sending owner digests as they come due"""
+    while True:
+        time.sleep(OWNER_DIGEST_SWEEP_SECONDS)
+        try:
+            send_owner_digests()
+        except Exception as e:
+            print(f"⚠ Owner digest sweep failed: {e}")
+
+owner_digest_thread = None
+
+def start_owner_digest_thread():
+    """Run the digest sweep in this process; called by the server, not on import"""
+    global owner_digest_thread
+    if mongo.db is not None and owner_digest_thread is None:
+        owner_digest_thread = threading.Thread(target=owner_digest_loop, name='owner-digests', daemon=True)
+        owner_digest_thread.start()
+
+# WSGI servers (gunicorn) import the app without running __main__, so the sweep
+# starts here when OWNER_DIGEST_THREAD is on; with it off, run the CLI from cron
+if OWNER_DIGEST_THREAD:
+    start_owner_digest_thread()
+
+# --- LOGIN STATS ---
+# last_login / login_count are written behind the login, batched; see
+# login_stats.py for how many updates a crash can lose (LOGIN_STATS_FLUSH_SECONDS' worth).
+# The flusher starts with the first login, so importing the app starts no thread
+login_stats = None
+login_stats_lock = threading.Lock()
+
+def record_login(user_id):
+    """Count a successful login without writing on the request path"""
+    global login_stats
+    if login_stats is None:
+        if mongo.db is None:
+            return
+        with login_stats_lock:
+            if login_stats is None:
+                buffer = LoginStatsBuffer(
+                    mongo.db.users,
+                    flush_interval=float(os.environ.get('LOGIN_STATS_FLUSH_SECONDS', 5)),
+                    max_pending=int(os.environ.get('LOGIN_STATS_MAX_PENDING', 500))
+                )
+                buffer.start()
+                atexit.register(buffer.stop)
+                login_stats = buffer
+    login_stats.record(user_id)
+
+@app.route('/api/owner/notifications', methods=['GET', 'PUT'])
+def api_owner_notifications():
+    """Read or set how an owner hears about new bookings: {"mode": "instant" | "digest"}"""
+    try:
+        user_id = current_api_user_id()
+        if not user_id:
+            return jsonify({'success': False, 'message': 'Please login first'}), 401
+        
+        owner = mongo.db.users.find_one({'_id': ObjectId(user_id)}, {'user_type': 1, 'notification_mode': 1})
+        if not owner or owner.get('user_type') != 'owner':
+            return jsonify({'success': False, 'message': 'Owner account required'}), 403
+        
+        if request.method == 'PUT':
+            mode = (request.get_json(silent=True) or {}).get('mode')
+            if mode not in OWNER_NOTIFICATION_MODES:
+                return jsonify({
+                    'success': False,
+                    'message': f"mode must be one of: {', '.join(OWNER_NOTIFICATION_MODES)}"
+                }), 400
+            mongo.db.users.update_one({'_id': owner['_id']}, {'$set': {'notification_mode': mode}})
+            owner['notification_mode'] = mode
+        
+        return jsonify({
+            'success': True,
+            'data': {'mode': owner_notification_mode(owner), 'digest_minutes': OWNER_DIGEST_MINUTES}
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.cli.command('send-owner-digests')
+def send_owner_digests_command():
+    """Send owner booking digests that are due"""
+    sent = send_owner_digests()
+    print(f"✓ Sent {sent} owner digests")
+
+@app.cli.command('expire-bookings')
+def expire_bookings_command():
+    """Expire pending bookings past their hold time and free their rooms"""
+    expired = inventory.expire_pending_bookings(mongo.db)
+    print(f"✓ Expired {expired} pending bookings")
+
 @app.route('/api/hostels/<hostel_id>', methods=['PUT'])
 @jwt_required()
 def api_update_hostel(hostel_id):
@@ -666,19 +1965,27 @@ def api_update_hostel(hostel_id):
             }), 403
         
         # Update hostel
-        update_data = {k: v for k, v in data.items() if k != '_id'}
+        update_data = {k: v for k, v in data.items() if k not in ('_id', 'geo', 'college_distances')}
         update_data['updated_at'] = datetime.utcnow()
         
+        # Keep the geo point and college distance table in sync with moved coordinates
+        if 'latitude' in update_data or 'longitude' in update_data:
+            update_data.update(hostel_location_fields(
+                update_data.get('latitude', hostel.get('latitude')),
+                update_data.get('longitude', hostel.get('longitude'))
+            ))
+        
         mongo.db.hostels.update_one(
             {"_id": ObjectId(hostel_id)},
             {"$set": update_data}
         )
+        bump_catalog_version()
         
         updated_hostel = mongo.db.hostels.find_one({"_id": ObjectId(hostel_id)})
         
         return jsonify({
             'success': True,
-            'data': serialize_doc(updated_hostel),
+            'data': updated_hostel,
             'message': 'Hostel updated successfully'
         })
     except Exception as e:
@@ -709,7 +2016,9 @@ def api_delete_hostel(hostel_id):
                 'message': 'Permission denied'
             }), 403
         
-        mongo.db.hostels.delete_one({"_id": ObjectId(hostel_id)})
+        if mongo.db.hostels.delete_one({"_id": ObjectId(hostel_id)}).deleted_count:
+            release_photo_assets(hostel.get('photo_assets', []))
+        bump_catalog_version()
         
         return jsonify({
             'success': True,
@@ -724,18 +2033,14 @@ def api_delete_hostel(hostel_id):
 @app.route('/api/auth/verify', methods=['GET'])
 @jwt_required()
 def api_verify_token():
-    """Verify JWT token"""
+    """Verify JWT token; data is always {_id, name, user_type, profile_version}, from the claims while current.
+    Use /api/user/profile for the full user document."""
     try:
-        current_user_id = get_jwt_identity()
-        user = mongo.db.users.find_one({"_id": ObjectId(current_user_id)})
-        
-        if user:
-            user_data = serialize_doc(user)
-            user_data.pop('password', None)
-            
+        profile = basic_profile()
+        if profile:
             return jsonify({
                 'success': True,
-                'data': user_data,
+                'data': profile,
                 'message': 'Token is valid'
             })
         else:
@@ -749,6 +2054,234 @@ def api_verify_token():
             'message': str(e)
         }), 500
 
+# --- PHOTO UPLOADS ---
+
+def upload_folder(user_id):
+    """Store folder an owner's signed uploads land in"""
+    return f'stayfinder/hostels/{user_id}'
+
+def store_photo_asset(user_id, sha256, variants, public_ids):
+    """Record freshly stored photo files as an asset, or drop them if the same content won the race"""
+    asset, created = photo_assets.register(mongo.db, user_id, sha256, variants, public_ids)
+    if not created:
+        delete_stored_photos(public_ids)
+    return asset
+
+def delete_stored_photos(public_ids):
+    for public_id in public_ids:
+        try:
+            image_store.delete(public_id)
+        except Exception as e:
+            print(f"Error deleting stored photo {public_id}: {e}")
+
+def release_photo_assets(asset_ids):
+    """Drop listing references on photo assets and delete the files nothing uses any more"""
+    for asset in photo_assets.release(mongo.db, asset_ids):
+        delete_stored_photos(asset['public_ids'])
+
+def attach_uploaded_photo(photo, user_id):
+    """Asset for a photo the browser uploaded (or skipped because the owner has it stored); None if it doesn't check out"""
+    if not isinstance(photo, dict):
+        return None
+    sha256 = photo.get('sha256')
+    if 'public_id' not in photo:
+        return photo_assets.acquire(mongo.db, user_id, sha256)
+    try:
+        public_id, version, signature = photo['public_id'], int(photo['version']), photo['signature']
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not isinstance(public_id, str) or not public_id.startswith(upload_folder(user_id) + '/'):
+        return None
+    if not image_store.verify(public_id, version, signature):
+        return None
+    return store_photo_asset(user_id, sha256, image_store.variant_urls(public_id, version), [public_id])
+
+def spool_uploaded_photo(photo):
+    """Copy a photo posted with the form to local disk, hashing it as it streams in"""
+    digest = hashlib.sha256()
+    path = image_processing.spool_to_tempfile(
+        photo.stream, suffix=os.path.splitext(photo.filename or '')[1], digest=digest
+    )
+    return {'path': path, 'sha256': digest.hexdigest()}
+
+def discard_spooled_photos(pending_photos):
+    for pending in pending_photos:
+        if 'path' in pending:
+            try:
+                os.unlink(pending['path'])
+            except FileNotFoundError:
+                pass
+
+def process_spooled_photo(path, sha256, user_id):
+    """Reuse the owner's stored copy of a spooled photo, or downscale it and upload its card and detail variants"""
+    asset = photo_assets.acquire(mongo.db, user_id, sha256)
+    if asset:
+        return asset
+    folder = upload_folder(user_id)
+    if not image_processing.available():
+        stored = image_store.upload_file(path, folder)
+        return store_photo_asset(user_id, sha256,
+                                 {name: stored['url'] for name in image_processing.VARIANTS},
+                                 [stored['public_id']])
+    variants = image_processing.make_variants(path)
+    try:
+        stored = {name: image_store.upload_file(v['path'], folder) for name, v in variants.items()}
+    finally:
+        image_processing.discard_variants(variants)
+    return store_photo_asset(user_id, sha256,
+                             {name: s['url'] for name, s in stored.items()},
+                             [s['public_id'] for s in stored.values()])
+
+def attach_listing_photos(hostel_id, user_id, pending_photos, main_image):
+    """Background job: store a new listing's photos in order, attach them and tell the owner.
+
+    pending_photos holds {'uploaded': <signed result from the browser>} or
+    {'path', 'sha256'} for spooled form uploads; main_image is False when the
+    owner gave an image URL that the first photo mustn't replace.
+    """
+    assets = []
+    try:
+        for pending in pending_photos:
+            try:
+                if 'uploaded' in pending:
+                    asset = attach_uploaded_photo(pending['uploaded'], user_id)
+                else:
+                    asset = process_spooled_photo(pending['path'], pending['sha256'], user_id)
+            except Exception as e:
+                print(f"Error processing photo for listing {hostel_id}: {e}")
+                continue
+            if asset:
+                assets.append(asset)
+            else:
+                print(f"Rejected unverified photo upload for listing {hostel_id}")
+    finally:
+        discard_spooled_photos(pending_photos)
+    
+    try:
+        photo_variants = [asset['variants'] for asset in assets]
+        update = {
+            'photos': [variants['detail'] for variants in photo_variants],
+            'photo_variants': photo_variants,
+            'photo_assets': [asset['_id'] for asset in assets],
+            'photos_status': 'ready' if assets else 'failed'
+        }
+        if main_image and photo_variants:
+            update['image'] = photo_variants[0]['detail']
+            update['image_card'] = photo_variants[0]['card']
+        
+        result = mongo.db.hostels.update_one({'_id': hostel_id, 'photos_status': 'processing'}, {'$set': update})
+        if not result.matched_count:
+            # The listing was deleted, or marked failed as stale, while its photos were processing
+            release_photo_assets(update['photo_assets'])
+            return
+        bump_catalog_version()
+    except Exception as e:
+        print(f"Error attaching photos to listing {hostel_id}: {e}")
+        release_photo_assets([asset['_id'] for asset in assets])
+        mongo.db.hostels.update_one({'_id': hostel_id, 'photos_status': 'processing'},
+                                    {'$set': {'photos_status': 'failed'}})
+
+def fail_stale_photo_jobs(query=None, now=None):
+    """Mark listings whose photo job outlived PHOTO_JOB_TIMEOUT_MINUTES as failed; returns how many"""
+    cutoff = (now or datetime.utcnow()) - timedelta(minutes=PHOTO_JOB_TIMEOUT_MINUTES)
+    result = mongo.db.hostels.update_many(
+        dict(query or {}, photos_status='processing', created_at={'$lte': cutoff}),
+        {'$set': {'photos_status': 'failed'}}
+    )
+    return result.modified_count
+
+@app.cli.command('fail-stale-photos')
+def fail_stale_photos_command():
+    """Mark listings whose photo job was lost (restart, crash) as failed"""
+    failed = fail_stale_photo_jobs()
+    print(f"✓ Marked {failed} listings' photos as failed")
+
+@app.route('/api/uploads/sign', methods=['POST'])
+def api_sign_upload():
+    """Short-lived signed parameters for uploading listing photos straight to the image store"""
+    try:
+        user_id = current_api_user_id()
+        if not user_id:
+            return jsonify({'success': False, 'message': 'Please login first'}), 401
+        user = mongo.db.users.find_one({'_id': ObjectId(user_id)}, {'user_type': 1})
+        if not user or user.get('user_type') != 'owner':
+            return jsonify({'success': False, 'message': 'Owner account required'}), 403
+        
+        return jsonify({
+            'success': True,
+            'data': dict(image_store.upload_params(upload_folder(user_id)), store=image_store.name)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/api/uploads/known', methods=['POST'])
+def api_known_uploads():
+    """Which photos (by SHA-256 of their bytes) the owner already has stored, so the browser skips them"""
+    try:
+        user_id = current_api_user_id()
+        if not user_id:
+            return jsonify({'success': False, 'message': 'Please login first'}), 401
+        hashes = (request.get_json(silent=True) or {}).get('sha256') or []
+        if not isinstance(hashes, list):
+            return jsonify({'success': False, 'message': 'sha256 must be a list'}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': {'known': sorted(photo_assets.known_hashes(mongo.db, user_id, hashes[:50]))}
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/api/hostels/<hostel_id>/photos', methods=['GET'])
+def api_hostel_photos(hostel_id):
+    """Photo processing state of a listing, polled by the owner dashboard"""
+    try:
+        hostel = mongo.db.hostels.find_one(
+            {'_id': ObjectId(hostel_id)}, {'photos_status': 1, 'image_card': 1, 'photos': 1}
+        )
+        if not hostel:
+            return jsonify({'success': False, 'message': 'Hostel not found'}), 404
+        if hostel.get('photos_status') == 'processing' and fail_stale_photo_jobs({'_id': hostel['_id']}):
+            hostel['photos_status'] = 'failed'
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'photos_status': hostel.get('photos_status', 'ready'),
+                'image_card': hostel.get('image_card'),
+                'photos': hostel.get('photos', [])
+            }
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+if image_store.name == 'local':
+    @app.route('/_local_store/upload', methods=['POST'])
+    def local_store_upload():
+        """Stand-in for the image store's upload API"""
+        photo = request.files.get('file')
+        if not photo:
+            return jsonify({'error': {'message': 'Missing file'}}), 400
+        try:
+            return jsonify(image_store.accept_upload(request.form, photo))
+        except PermissionError as e:
+            return jsonify({'error': {'message': str(e)}}), 401
+        except ValueError as e:
+            return jsonify({'error': {'message': str(e)}}), 400
+
+    @app.route('/_local_store/v<int:version>/<path:public_id>')
+    def local_store_file(version, public_id):
+        return send_from_directory(image_store.directory, public_id, max_age=31536000)
+
 # --- ROUTES ---
 
 # Debug route to check email configuration
@@ -770,6 +2303,12 @@ def debug_email():
         "note": "Visit this URL to check if your email .env settings are loaded correctly"
     })
 
+# Debug route to size the bcrypt pool: queue state and time per cost factor
+@app.route('/debug/bcrypt')
+def debug_bcrypt():
+    """Password hashing pool metrics"""
+    return jsonify(password_hasher.metrics())
+
 # Debug route to check Cloudinary configuration (remove in production)
 @app.route('/debug/cloudinary')
 def debug_cloudinary():
@@ -802,11 +2341,27 @@ def inject_user():
     
     return dict(user=user)
 
+@app.after_request
+def add_response_etag(response):
+    """ETag full GET responses so clients can revalidate and compressed bodies can be cached"""
+    if (request.method == 'GET' and response.status_code == 200
+            and not response.is_streamed and not response.direct_passthrough
+            and 'ETag' not in response.headers):
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+@app.context_processor
+def inject_asset_urls():
+    """Versioned URLs for datasets the frontend loads"""
+    return dict(colleges_url=url_for('api_get_colleges_versioned', digest=colleges_payload['digest']))
+
 @app.route('/')
 def home():
     # Get all hostels from the database
     if mongo.db is not None:
-        hostels = list(mongo.db.hostels.find())
+        hostels_collection, projection = hostel_reader('card')
+        hostels = list(hostels_collection.find({}, projection))
     else:
         hostels = []  # Empty list when database is not available
     return render_template('index.html', hostels=hostels)
@@ -820,7 +2375,8 @@ def search():
     query = request.form.get('query')
     # Simple search by City (case insensitive)
     if mongo.db is not None:
-        hostels = list(mongo.db.hostels.find({"city": {"$regex": query, "$options": "i"}}))
+        hostels_collection, projection = hostel_reader('card')
+        hostels = list(hostels_collection.find({"city": {"$regex": query, "$options": "i"}}, projection))
     else:
         hostels = []  # Empty list when database is not available
     return render_template('index.html', hostels=hostels)
@@ -867,12 +2423,14 @@ def debug_session():
 def detail(hostel_id):
     # Find specific hostel by ID
     if mongo.db is not None:
-        hostel = mongo.db.hostels.find_one({"_id": ObjectId(hostel_id)})
+        hostels_collection, projection = hostel_reader('detail')
+        hostel = hostels_collection.find_one({"_id": ObjectId(hostel_id)}, projection)
     else:
         hostel = None  # No hostel when database is not available
     return render_template('detail.html', hostel=hostel)
 
 @app.route('/add', methods=['GET', 'POST'])
+@idempotent('listing')
 def add_hostel():
     # Check if user is logged in
     if 'user_id' not in session:
@@ -887,204 +2445,183 @@ def add_hostel():
     # This page lets you add hostels to the database easily
     if request.method == 'POST':
         image_url = request.form.get("image") or None  # Fallback to URL if provided
-        photo_urls = []
         
-        # Handle multiple photo uploads
-        if 'photos' in request.files:
-            photos = request.files.getlist('photos')
-            uploaded_count = 0
-            
-            for photo in photos:
+        # Photos are stored and attached in the background once the listing is saved;
+        # form uploads are only spooled to local disk here
+        pending_photos = []
+        try:
+            for raw_photo in request.form.getlist('uploaded_photos'):
+                try:
+                    pending_photos.append({'uploaded': json.loads(raw_photo)})
+                except ValueError:
+                    print(f"Rejected malformed photo upload: {raw_photo[:200]}")
+        
+            # Photos posted with the form (browsers without JavaScript)
+            for photo in request.files.getlist('photos'):
                 if photo and photo.filename != '':
                     try:
-                        # Check if Cloudinary is configured
-                        cloud_name = os.environ.get("CLOUDINARY_CLOUD_NAME", "").strip()
-                        api_key = os.environ.get("CLOUDINARY_API_KEY", "").strip()
-                        api_secret = os.environ.get("CLOUDINARY_API_SECRET", "").strip()
-                        
-                        if cloud_name and api_key and api_secret:
-                            # Ensure Cloudinary is configured with current values
-                            cloudinary.config(
-                                cloud_name=cloud_name,
-                                api_key=api_key,
-                                api_secret=api_secret
-                            )
-                            
-                            # Upload to Cloudinary
-                            upload_result = cloudinary.uploader.upload(
-                                photo,
-                                folder="stayfinder/hostels",
-                                resource_type="image"
-                            )
-                            photo_url = upload_result.get('secure_url')
-                            if photo_url:
-                                photo_urls.append(photo_url)
-                                uploaded_count += 1
-                        else:
-                            # If Cloudinary not configured, skip file upload
-                            missing = []
-                            if not cloud_name:
-                                missing.append("CLOUDINARY_CLOUD_NAME")
-                            if not api_key:
-                                missing.append("CLOUDINARY_API_KEY")
-                            if not api_secret:
-                                missing.append("CLOUDINARY_API_SECRET")
-                            return jsonify({
-                                'success': False,
-                                'message': f'Cloudinary credentials missing: {", ".join(missing)}. Photos not uploaded.'
-                            }), 500
+                        pending_photos.append(spool_uploaded_photo(photo))
                     except Exception as e:
-                        print(f"Error uploading photo: {e}")
+                        print(f"Error receiving photo: {e}")
                         continue
-            
-            if uploaded_count > 0:
-                # Photos uploaded successfully, continue processing
-                # Set the first photo as the main image if no image_url provided
-                if not image_url and photo_urls:
-                    image_url = photo_urls[0]
-        
-        # Ensure we have an image URL - use placeholder if none provided
-        if not image_url or image_url.strip() == '':
-            # Default placeholder image
-            image_url = "https://via.placeholder.com/400x300?text=No+Image"
-        
-        # Get amenities from form (can be multiple)
-        amenities = request.form.getlist("amenities")
-        # If no amenities selected, use default ones
-        if not amenities:
-            amenities = ["WiFi", "Fully Furnished", "AC", "TV", "Laundry"]
-        
-        # Get original_price (optional)
-        original_price = request.form.get("original_price")
-        if original_price and original_price.strip():
-            original_price = int(original_price)
-        else:
-            original_price = None
-        
-        # Get appliances from form (can be multiple)
-        appliances = request.form.getlist("appliances")
-        
-        # Get room types and pricing from new form structure
-        room_types = []
-        
-        # Double Sharing - Regular
-        double_regular_price = request.form.get("double_sharing_regular_price")
-        has_double_regular = request.form.get("has_double_regular")
-        if has_double_regular and double_regular_price:
-            room_types.append({
-                "type": "Double Sharing",
-                "facility": "Regular",
-                "price": int(double_regular_price)
-            })
-        
-        # Double Sharing - AC
-        double_ac_price = request.form.get("double_sharing_ac_price")
-        has_double_ac = request.form.get("has_double_ac")
-        if has_double_ac and double_ac_price:
-            room_types.append({
-                "type": "Double Sharing",
-                "facility": "AC",
-                "price": int(double_ac_price)
-            })
         
-        # Triple Sharing - Regular
-        triple_regular_price = request.form.get("triple_sharing_regular_price")
-        has_triple_regular = request.form.get("has_triple_regular")
-        if has_triple_regular and triple_regular_price:
-            room_types.append({
-                "type": "Triple Sharing",
-                "facility": "Regular",
-                "price": int(triple_regular_price)
-            })
+            # Ensure we have an image URL - use placeholder if none provided
+            first_photo_is_main = not image_url or image_url.strip() == ''
+            if first_photo_is_main:
+                # Default placeholder image
+                image_url = "https://via.placeholder.com/400x300?text=No+Image"
+        
+            # Get amenities from form (can be multiple)
+            amenities = request.form.getlist("amenities")
+            # If no amenities selected, use default ones
+            if not amenities:
+                amenities = ["WiFi", "Fully Furnished", "AC", "TV", "Laundry"]
+        
+            # Get original_price (optional)
+            original_price = request.form.get("original_price")
+            if original_price and original_price.strip():
+                original_price = int(original_price)
+            else:
+                original_price = None
+        
+            # Get appliances from form (can be multiple)
+            appliances = request.form.getlist("appliances")
+        
+            # Get room types and pricing from new form structure
+            room_types = []
+        
+            # Double Sharing - Regular
+            double_regular_price = request.form.get("double_sharing_regular_price")
+            has_double_regular = request.form.get("has_double_regular")
+            if has_double_regular and double_regular_price:
+                room_types.append({
+                    "type": "Double Sharing",
+                    "facility": "Regular",
+                    "price": int(double_regular_price)
+                })
         
-        # Triple Sharing - AC
-        triple_ac_price = request.form.get("triple_sharing_ac_price")
-        has_triple_ac = request.form.get("has_triple_ac")
-        if has_triple_ac and triple_ac_price:
-            room_types.append({
-                "type": "Triple Sharing",
-                "facility": "AC",
-                "price": int(triple_ac_price)
-            })
+            # Double Sharing - AC
+            double_ac_price = request.form.get("double_sharing_ac_price")
+            has_double_ac = request.form.get("has_double_ac")
+            if has_double_ac and double_ac_price:
+                room_types.append({
+                    "type": "Double Sharing",
+                    "facility": "AC",
+                    "price": int(double_ac_price)
+                })
         
-        # Quadruple Sharing - Regular
-        quadruple_regular_price = request.form.get("quadruple_sharing_regular_price")
-        has_quadruple_regular = request.form.get("has_quadruple_regular")
-        if has_quadruple_regular and quadruple_regular_price:
-            room_types.append({
-                "type": "Quadruple Sharing",
-                "facility": "Regular",
-                "price": int(quadruple_regular_price)
-            })
+            # Triple Sharing - Regular
+            triple_regular_price = request.form.get("triple_sharing_regular_price")
+            has_triple_regular = request.form.get("has_triple_regular")
+            if has_triple_regular and triple_regular_price:
+                room_types.append({
+                    "type": "Triple Sharing",
+                    "facility": "Regular",
+                    "price": int(triple_regular_price)
+                })
         
-        # Quadruple Sharing - AC
-        quadruple_ac_price = request.form.get("quadruple_sharing_ac_price")
-        has_quadruple_ac = request.form.get("has_quadruple_ac")
-        if has_quadruple_ac and quadruple_ac_price:
-            room_types.append({
-                "type": "Quadruple Sharing",
-                "facility": "AC",
-                "price": int(quadruple_ac_price)
-            })
+            # Triple Sharing - AC
+            triple_ac_price = request.form.get("triple_sharing_ac_price")
+            has_triple_ac = request.form.get("has_triple_ac")
+            if has_triple_ac and triple_ac_price:
+                room_types.append({
+                    "type": "Triple Sharing",
+                    "facility": "AC",
+                    "price": int(triple_ac_price)
+                })
         
-        # Also store the individual pricing fields for direct access in templates
-        pricing_data = {
-            "has_double_regular": bool(has_double_regular),
-            "double_sharing_regular_price": int(double_regular_price) if double_regular_price else None,
-            "has_double_ac": bool(has_double_ac),
-            "double_sharing_ac_price": int(double_ac_price) if double_ac_price else None,
-            "has_triple_regular": bool(has_triple_regular),
-            "triple_sharing_regular_price": int(triple_regular_price) if triple_regular_price else None,
-            "has_triple_ac": bool(has_triple_ac),
-            "triple_sharing_ac_price": int(triple_ac_price) if triple_ac_price else None,
-            "has_quadruple_regular": bool(has_quadruple_regular),
-            "quadruple_sharing_regular_price": int(quadruple_regular_price) if quadruple_regular_price else None,
-            "has_quadruple_ac": bool(has_quadruple_ac),
-            "quadruple_sharing_ac_price": int(quadruple_ac_price) if quadruple_ac_price else None
-        }
+            # Quadruple Sharing - Regular
+            quadruple_regular_price = request.form.get("quadruple_sharing_regular_price")
+            has_quadruple_regular = request.form.get("has_quadruple_regular")
+            if has_quadruple_regular and quadruple_regular_price:
+                room_types.append({
+                    "type": "Quadruple Sharing",
+                    "facility": "Regular",
+                    "price": int(quadruple_regular_price)
+                })
         
-        # Get neighborhood highlights
-        neighborhood_highlights = []
-        for i in range(1, 6):  # Support up to 5 nearby places
-            place_name = request.form.get(f"nearby_place_{i}")
-            place_distance = request.form.get(f"nearby_distance_{i}")
-            place_time = request.form.get(f"nearby_time_{i}")
-            
-            if place_name and place_distance and place_time:
-                neighborhood_highlights.append({
-                    "name": place_name,
-                    "distance": place_distance,
-                    "time": place_time
+            # Quadruple Sharing - AC
+            quadruple_ac_price = request.form.get("quadruple_sharing_ac_price")
+            has_quadruple_ac = request.form.get("has_quadruple_ac")
+            if has_quadruple_ac and quadruple_ac_price:
+                room_types.append({
+                    "type": "Quadruple Sharing",
+                    "facility": "AC",
+                    "price": int(quadruple_ac_price)
                 })
         
-        new_hostel = {
-            "name": request.form.get("name"),
-            "city": request.form.get("city"),
-            "location": request.form.get("location", "").strip(),  # Area/locality
-            "price": int(request.form.get("price")),
-            "original_price": original_price,
-            "image": image_url,  # Cloudinary URL or provided URL
-            "photos": photo_urls,  # Multiple photo URLs
-            "desc": request.form.get("desc"),
-            "type": request.form.get("type"),  # e.g., Boys, Girls, Co-ed
-            "amenities": amenities,
-            "appliances": appliances,
-            "room_types": room_types,
-            "longitude": float(request.form.get("longitude", 0.0)),
-            "latitude": float(request.form.get("latitude", 0.0)),
-            "neighborhood_highlights": neighborhood_highlights,
-            "contact_phone": request.form.get("contact_phone", ""),
-            "contact_email": request.form.get("contact_email", ""),
-            "address": request.form.get("address", ""),
-            "property_type": request.form.get("property_type", "Hostel"),  # Hostel or PG
-            "created_by": session['user_id'],  # Associate with the owner
-            "status": "pending",  # pending, active, inactive
-            "created_at": datetime.utcnow()
-        }
+            # Also store the individual pricing fields for direct access in templates
+            pricing_data = {
+                "has_double_regular": bool(has_double_regular),
+                "double_sharing_regular_price": int(double_regular_price) if double_regular_price else None,
+                "has_double_ac": bool(has_double_ac),
+                "double_sharing_ac_price": int(double_ac_price) if double_ac_price else None,
+                "has_triple_regular": bool(has_triple_regular),
+                "triple_sharing_regular_price": int(triple_regular_price) if triple_regular_price else None,
+                "has_triple_ac": bool(has_triple_ac),
+                "triple_sharing_ac_price": int(triple_ac_price) if triple_ac_price else None,
+                "has_quadruple_regular": bool(has_quadruple_regular),
+                "quadruple_sharing_regular_price": int(quadruple_regular_price) if quadruple_regular_price else None,
+                "has_quadruple_ac": bool(has_quadruple_ac),
+                "quadruple_sharing_ac_price": int(quadruple_ac_price) if quadruple_ac_price else None
+            }
+        
+            # Get neighborhood highlights
+            neighborhood_highlights = []
+            for i in range(1, 6):  # Support up to 5 nearby places
+                place_name = request.form.get(f"nearby_place_{i}")
+                place_distance = request.form.get(f"nearby_distance_{i}")
+                place_time = request.form.get(f"nearby_time_{i}")
+            
+                if place_name and place_distance and place_time:
+                    neighborhood_highlights.append({
+                        "name": place_name,
+                        "distance": place_distance,
+                        "time": place_time
+                    })
+        
+            new_hostel = {
+                "name": request.form.get("name"),
+                "city": request.form.get("city"),
+                "location": request.form.get("location", "").strip(),  # Area/locality
+                "price": int(request.form.get("price")),
+                "original_price": original_price,
+                "image": image_url,  # Provided URL; the first photo replaces the placeholder once processed
+                "image_card": None,  # Card-sized variant of the main image
+                "photos": [],  # Multiple photo URLs, attached by attach_listing_photos
+                "photo_variants": [],
+                "photo_assets": [],  # References held on the stored files
+                "photos_status": "processing" if pending_photos else "ready",
+                "desc": request.form.get("desc"),
+                "type": request.form.get("type"),  # e.g., Boys, Girls, Co-ed
+                "amenities": amenities,
+                "appliances": appliances,
+                "room_types": room_types,
+                "longitude": float(request.form.get("longitude", 0.0)),
+                "latitude": float(request.form.get("latitude", 0.0)),
+                "neighborhood_highlights": neighborhood_highlights,
+                "contact_phone": request.form.get("contact_phone", ""),
+                "contact_email": request.form.get("contact_email", ""),
+                "address": request.form.get("address", ""),
+                "property_type": request.form.get("property_type", "Hostel"),  # Hostel or PG
+                "created_by": session['user_id'],  # Associate with the owner
+                "status": "pending",  # pending, active, inactive
+                "created_at": datetime.utcnow()
+            }
         
-        # Add individual pricing fields to the hostel document
-        new_hostel.update(pricing_data)
-        mongo.db.hostels.insert_one(new_hostel)
+            # Add individual pricing fields to the hostel document
+            new_hostel.update(pricing_data)
+            new_hostel.update(hostel_location_fields(new_hostel['latitude'], new_hostel['longitude']))
+            mongo.db.hostels.insert_one(new_hostel)
+            if pending_photos:
+                photo_executor.submit(attach_listing_photos, new_hostel['_id'], session['user_id'],
+                                      pending_photos, first_photo_is_main)
+        except Exception:
+            # Until the job is submitted the spooled files are ours to remove; a listing
+            # saved before the failure is marked failed by fail_stale_photo_jobs
+            discard_spooled_photos(pending_photos)
+            raise
+        bump_catalog_version()
         
         # Update owner's properties count
         mongo.db.users.update_one(
@@ -1094,7 +2631,37 @@ def add_hostel():
         
         flash('Property listed successfully! It will be visible after verification.', 'success')
         return redirect(url_for('owner_dashboard'))
-    return render_template('add.html')
+    return render_template('add.html', idempotency_key=uuid.uuid4().hex)
+
+# Form each password route re-renders when the bcrypt pool turns it away, and
+# the fields it refills: template variable -> form field (never passwords)
+PASSWORD_FORM_TEMPLATES = {
+    'login': ('login.html', {}),
+    'login_student': ('login_student.html', {}),
+    'login_owner': ('login_owner.html', {}),
+    'register': ('register.html', {}),
+    'register_owner': ('register_owner.html', dict(
+        {field: field for field in ('first_name', 'last_name', 'email', 'phone', 'business_name', 'business_type',
+                                    'pan_number', 'address', 'city', 'state', 'pincode')},
+        terms_accepted='terms'
+    ))
+}
+
+@app.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(e):
+    """Login or registration during a burst the bcrypt pool can't take: 503 with Retry-After"""
+    retry_headers = {'Retry-After': str(e.retry_after)}
+    form = PASSWORD_FORM_TEMPLATES.get(request.endpoint)
+    if form is None:
+        return jsonify({
+            'success': False,
+            'message': 'Too many sign-ins right now, please retry shortly'
+        }), 503, retry_headers
+    flash(f'Too many sign-ins right now. Please try again in {e.retry_after} seconds.', 'error')
+    # Keep what was typed in the fields the form shows again
+    template, fields = form
+    values = {name: request.form.get(field) for name, field in fields.items()}
+    return render_template(template, **values), 503, retry_headers
 
 @app.route('/login-student', methods=['GET', 'POST'])
 def login_student():
@@ -1105,26 +2672,20 @@ def login_student():
         # Find user in database
         user = mongo.db.users.find_one({'email': email})
         
-        if user and bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
+        if user and password_hasher.check(password, user['password']):
             # Check if user is a student (not owner)
             if user.get('user_type') == 'owner':
                 flash('This is an owner account. Please use Owner Login.', 'error')
                 return render_template('login_student.html')
             
             # Create JWT token
-            access_token = create_access_token(identity=str(user['_id']))
+            access_token = issue_access_token(user)
             session['user_id'] = str(user['_id'])
             session['access_token'] = access_token
             session['user_type'] = user.get('user_type', 'user')
             
-            # Update login stats
-            mongo.db.users.update_one(
-                {'_id': user['_id']},
-                {
-                    '$set': {'last_login': datetime.utcnow()},
-                    '$inc': {'login_count': 1}
-                }
-            )
+            # Update login stats (buffered, written in batches)
+            record_login(user['_id'])
             
             flash('Login successful!', 'success')
             return redirect(url_for('home'))
@@ -1142,26 +2703,20 @@ def login_owner():
         # Find user in database
         user = mongo.db.users.find_one({'email': email})
         
-        if user and bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
+        if user and password_hasher.check(password, user['password']):
             # Check if user is an owner
             if user.get('user_type') != 'owner':
                 flash('This is a student account. Please use Student Login.', 'error')
                 return render_template('login_owner.html')
             
             # Create JWT token
-            access_token = create_access_token(identity=str(user['_id']))
+            access_token = issue_access_token(user)
             session['user_id'] = str(user['_id'])
             session['access_token'] = access_token
             session['user_type'] = 'owner'
             
-            # Update login stats
-            mongo.db.users.update_one(
-                {'_id': user['_id']},
-                {
-                    '$set': {'last_login': datetime.utcnow()},
-                    '$inc': {'login_count': 1}
-                }
-            )
+            # Update login stats (buffered, written in batches)
+            record_login(user['_id'])
             
             flash('Login successful!', 'success')
             return redirect(url_for('owner_dashboard'))
@@ -1179,21 +2734,15 @@ def login():
         # Find user in database
         user = mongo.db.users.find_one({'email': email})
         
-        if user and bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
+        if user and password_hasher.check(password, user['password']):
             # Create JWT token
-            access_token = create_access_token(identity=str(user['_id']))
+            access_token = issue_access_token(user)
             session['user_id'] = str(user['_id'])
             session['access_token'] = access_token
             session['user_type'] = user.get('user_type', 'user')  # Store user type in session
             
-            # Update login stats
-            mongo.db.users.update_one(
-                {'_id': user['_id']},
-                {
-                    '$set': {'last_login': datetime.utcnow()},
-                    '$inc': {'login_count': 1}
-                }
-            )
+            # Update login stats (buffered, written in batches)
+            record_login(user['_id'])
             
             flash('Login successful!', 'success')
             
@@ -1226,13 +2775,13 @@ def register():
             return render_template('register.html')
         
         # Hash password
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        hashed_password = password_hasher.hash(password)
                             
         # Create new user
         new_user = {
             'name': name,
             'email': email,
-            'password': hashed_password.decode('utf-8'),
+            'password': hashed_password,
             'user_type': 'user',  # Explicitly set as regular user
             'created_at': datetime.utcnow(),
             'auth_method': 'email',
@@ -1385,7 +2934,7 @@ def register_owner():
                     terms_accepted=terms_accepted)
             
             # Hash password
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+            hashed_password = password_hasher.hash(password)
             
             # Create new owner user
             new_user = {
@@ -1401,7 +2950,7 @@ def register_owner():
                 'city': city,
                 'state': state,
                 'pincode': pincode,
-                'password': hashed_password.decode('utf-8'),
+                'password': hashed_password,
                 'user_type': 'owner',
                 'created_at': datetime.utcnow(),
                 'auth_method': 'email',
@@ -1483,7 +3032,7 @@ Need help? Contact our support team at support@stayfinder.com
 Best regards,
 StayFinder Team
                 """
-                mail.send(welcome_msg)
+                smtp_pool.send(welcome_msg)
                 print(f"Welcome email sent to owner: {email}")
             except Exception as email_error:
                 print(f"Failed to send welcome email: {email_error}")
@@ -1491,6 +3040,8 @@ StayFinder Team
             flash(f'Welcome {first_name}! Your owner account has been created successfully. Please login to continue.', 'success')
             return redirect(url_for('login'))
             
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             print(f"Owner registration error: {e}")
             flash('An error occurred during registration. Please try again or contact support.', 'error')
@@ -1534,7 +3085,7 @@ def google_auth_callback():
             user = new_user
         
         # Create JWT token
-        access_token = create_access_token(identity=str(user['_id']))
+        access_token = issue_access_token(user)
         session['user_id'] = str(user['_id'])
         session['access_token'] = access_token
         flash('Login successful with Google!', 'success')
@@ -1578,7 +3129,7 @@ def facebook_auth_callback():
             user = new_user
         
         # Create JWT token
-        access_token = create_access_token(identity=str(user['_id']))
+        access_token = issue_access_token(user)
         session['user_id'] = str(user['_id'])
         session['access_token'] = access_token
         flash('Login successful with Facebook!', 'success')
@@ -1641,19 +3192,14 @@ def firebase_google_auth():
             user_id = str(result.inserted_id)
         else:
             user_id = str(user['_id'])
-            # Update user info if needed
-            mongo.db.users.update_one(
-                {'_id': ObjectId(user_id)},
-                {'$set': {
-                    'firebase_uid': uid,
-                    'profile_picture': photo_url,
-                    'email_verified': email_verified,
-                    'last_login': datetime.utcnow()
-                }}
-            )
+            # Update user info if needed; login stats are buffered
+            profile = {'firebase_uid': uid, 'profile_picture': photo_url, 'email_verified': email_verified}
+            if any(user.get(field) != value for field, value in profile.items()):
+                mongo.db.users.update_one({'_id': user['_id']}, {'$set': profile})
+            record_login(user['_id'])
         
         # Create JWT token
-        access_token = create_access_token(identity=user_id)
+        access_token = issue_access_token(user or new_user)
         session['user_id'] = user_id
         session['access_token'] = access_token
         
@@ -1704,6 +3250,7 @@ def owner_dashboard():
                          owner_profile=owner_profile,
                          properties=properties,
                          recent_bookings=recent_bookings,
+                         notification_mode=owner_notification_mode(user),
                          total_properties=total_properties,
                          active_properties=active_properties,
                          pending_bookings=pending_bookings)
@@ -1752,10 +3299,12 @@ def update_profile():
             'profile_picture': data.get('profile_picture')
         }
         
+        # Name is in issued tokens' claims; the new version makes them stale
         mongo.db.users.update_one(
             {'_id': user_id},
-            {'$set': update_data}
+            {'$set': update_data, '$inc': {'profile_version': 1}}
         )
+        forget_profile_version(user_id)
         
         return {'success': True, 'message': 'Profile updated successfully'}
     except Exception as e:
@@ -1764,5 +3313,6 @@ def update_profile():
 if __name__ == '__main__':
     # Get the port from the environment variable, default to 5000 if not found
     port = int(os.environ.get("PORT", 5000))
+    start_owner_digest_thread()
     # Bind to 0.0.0.0 so Render can access it
     app.run(host='0.0.0.0', port=port)
\ No newline at end of file
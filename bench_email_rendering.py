@@ -0,0 +1,64 @@
+# Benchmark: cost of building one booking email on each rendering path
+# Compares compiling the template per email (with and without inlining the
+# CSS each time) against the renderer's cached compiled templates
+
+import os
+import time
+from datetime import datetime
+from flask import Flask
+from flask_mail import Mail
+from jinja2 import Environment, select_autoescape
+from email_rendering import EmailRenderer, inline_css, moment
+
+EMAILS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'emails')
+TEMPLATE = 'booking_confirmation_owner'
+ROUNDS = 2000
+
+CONTEXT = {
+    'user': {'name': 'Asha Patel', 'email': 'asha@example.com', 'phone': '+91 98765 43210',
+             'created_at': datetime(2024, 3, 1)},
+    'hostel': {'name': 'Sunrise Boys Hostel', 'location': 'Navrangpura', 'city': 'Ahmedabad',
+               'address': '12 CG Road', 'contact_phone': '+91 90000 00000', 'type': 'Boys'},
+    'property_type': 'Double Sharing',
+    'facility': 'AC'
+}
+
+
+def per_email_compile_and_inline(source, env):
+    env.from_string(inline_css(source)).render(CONTEXT)
+
+
+def per_email_compile(source, env):
+    env.from_string(source).render(CONTEXT)
+
+
+def run(label, build):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        build()
+    per_email = (time.perf_counter() - start) / ROUNDS
+    print(f'{label:<40} {per_email * 1e6:9.1f} us/email')
+
+
+if __name__ == '__main__':
+    with open(os.path.join(EMAILS_DIR, TEMPLATE + '.html'), encoding='utf-8') as f:
+        source = f.read()
+    inlined = inline_css(source)
+    env = Environment(autoescape=select_autoescape(default_for_string=True))
+    env.globals['moment'] = moment
+
+    start = time.perf_counter()
+    renderer = EmailRenderer(EMAILS_DIR)
+    print(f'Renderer startup (all templates compiled): {(time.perf_counter() - start) * 1000:.1f} ms')
+    print(f'{TEMPLATE}, {ROUNDS} emails per path')
+
+    run('compile + inline CSS per email (html)', lambda: per_email_compile_and_inline(source, env))
+    run('compile per email (html)', lambda: per_email_compile(inlined, env))
+    run('cached renderer (html + text)', lambda: renderer.render(TEMPLATE, **CONTEXT))
+
+    app = Flask(__name__)
+    Mail(app)
+    with app.app_context():
+        run('cached renderer + MIME encoding', lambda: renderer.message(
+            TEMPLATE, 'New Booking Request', ['owner@example.com'], sender='noreply@example.com', **CONTEXT
+        ).as_bytes())
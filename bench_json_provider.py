@@ -0,0 +1,93 @@
+# Benchmark: encode a 5,000-hostel API response
+# Compares the old serialize_doc copy + default Flask encoder with the
+# BSON-aware JSON provider (standard library and orjson backends)
+
+import random
+import time
+from datetime import datetime, timedelta
+from bson.decimal128 import Decimal128
+from bson.objectid import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+import serialization
+from serialization import BSONJSONProvider
+
+HOSTEL_COUNT = 5000
+ROUNDS = 5
+
+
+def make_hostels(count):
+    """Synthetic hostel documents shaped like the ones add_hostel writes"""
+    created = datetime(2025, 1, 1)
+    hostels = []
+    for i in range(count):
+        hostels.append({
+            '_id': ObjectId(),
+            'name': f'Hostel {i}',
+            'city': 'Ahmedabad',
+            'location': 'Navrangpura',
+            'price': random.randint(3000, 15000),
+            'deposit': Decimal128(str(random.randint(5, 30) * 1000)),
+            'image': f'https://res.cloudinary.com/demo/image/upload/hostel_{i}.jpg',
+            'photos': [f'https://res.cloudinary.com/demo/image/upload/hostel_{i}_{p}.jpg' for p in range(4)],
+            'amenities': ['WiFi', 'Fully Furnished', 'AC', 'TV', 'Laundry'],
+            'room_types': [
+                {'type': 'Double Sharing', 'facility': 'AC', 'price': 9000},
+                {'type': 'Triple Sharing', 'facility': 'Regular', 'price': 6000}
+            ],
+            'latitude': 23.0 + random.random() / 10,
+            'longitude': 72.5 + random.random() / 10,
+            'created_by': ObjectId(),
+            'created_at': created + timedelta(minutes=i),
+            'status': 'active'
+        })
+    return hostels
+
+
+def old_default(obj):
+    """The previous path: only _id was stringified, everything else hit Flask's encoder"""
+    if isinstance(obj, (ObjectId, Decimal128)):
+        return str(obj)
+    return DefaultJSONProvider.default(obj)
+
+
+def old_encode(app, hostels):
+    copies = [dict(h) for h in hostels]  # routes re-read documents per request
+    for doc in copies:
+        doc['_id'] = str(doc['_id'])
+    return app.json.dumps({'success': True, 'data': copies, 'count': len(copies)}, default=old_default)
+
+
+def new_encode(app, hostels):
+    return app.json.dumps({'success': True, 'data': hostels, 'count': len(hostels)})
+
+
+def run(label, encode, app, hostels):
+    best = float('inf')
+    size = 0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        size = len(encode(app, hostels))
+        best = min(best, time.perf_counter() - start)
+    print(f'{label:<28} {best * 1000:8.1f} ms  {len(hostels) / best:10.0f} docs/s  {size / 1024:8.0f} KiB')
+
+
+if __name__ == '__main__':
+    hostels = make_hostels(HOSTEL_COUNT)
+
+    default_app = Flask('default')
+    provider_app = Flask('provider')
+    provider_app.json = BSONJSONProvider(provider_app)
+
+    print(f'Encoding {HOSTEL_COUNT} hostels, best of {ROUNDS} rounds')
+    run('serialize_doc + Flask', old_encode, default_app, hostels)
+
+    fast_backend = serialization.orjson
+    serialization.orjson = None
+    run('BSON provider (json)', new_encode, provider_app, hostels)
+    serialization.orjson = fast_backend
+
+    if fast_backend is not None:
+        run('BSON provider (orjson)', new_encode, provider_app, hostels)
+    else:
+        print('orjson not installed - skipping fast backend')
@@ -0,0 +1,78 @@
+# Benchmark: decode cost of a hostel list request on each read path
+# Simulates the wire bytes a find() returns and times decoding plus the
+# field accesses a card template makes, with peak allocations per request
+
+import time
+import tracemalloc
+import bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from bench_json_provider import make_hostels
+
+HOSTELS_PER_REQUEST = 500
+ROUNDS = 20
+CARD_FIELDS = ['_id', 'name', 'city', 'location', 'price', 'original_price', 'image', 'type', 'amenities']
+RAW_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+def wire_bytes(hostels, fields=None):
+    """BSON bytes of a result batch, optionally as projected by the server"""
+    if fields:
+        hostels = [{k: h[k] for k in fields if k in h} for h in hostels]
+    return b''.join(bson.encode(h) for h in hostels)
+
+
+def touch_cards(docs):
+    """Read the fields index.html cards render"""
+    for doc in docs:
+        for field in CARD_FIELDS:
+            doc.get(field)
+
+
+def full_dicts(full, projected):
+    touch_cards(bson.decode_all(full))
+
+
+def projected_dicts(full, projected):
+    touch_cards(bson.decode_all(projected))
+
+
+def projected_raw(full, projected):
+    touch_cards(bson.decode_all(projected, RAW_OPTIONS))
+
+
+def raw_untouched(full, projected):
+    """Documents fetched but never read, e.g. only counted or passed through"""
+    len(bson.decode_all(full, RAW_OPTIONS))
+
+
+def dict_untouched(full, projected):
+    len(bson.decode_all(full))
+
+
+def run(label, read, full, projected):
+    best = float('inf')
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        read(full, projected)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    read(full, projected)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<32} {best * 1000:7.2f} ms/request  {peak / 1024:8.0f} KiB peak')
+
+
+if __name__ == '__main__':
+    hostels = make_hostels(HOSTELS_PER_REQUEST)
+    full = wire_bytes(hostels)
+    projected = wire_bytes(hostels, CARD_FIELDS)
+
+    print(f'{HOSTELS_PER_REQUEST} hostels per request, best of {ROUNDS} rounds')
+    print(f'wire size: full {len(full) / 1024:.0f} KiB, card projection {len(projected) / 1024:.0f} KiB')
+    run('dict, full document', full_dicts, full, projected)
+    run('dict, card projection', projected_dicts, full, projected)
+    run('RawBSONDocument, card projection', projected_raw, full, projected)
+    run('dict, full document, unread', dict_untouched, full, projected)
+    run('RawBSONDocument, full, unread', raw_untouched, full, projected)
@@ -0,0 +1,208 @@
+# Compression Middleware Module - gzip/brotli for API JSON and rendered pages
+# Wrap the Flask WSGI app: app.wsgi_app = CompressionMiddleware(app.wsgi_app)
+
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # Optional: only gzip is offered without it
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/msgpack',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml'
+)
+
+
+def choose_encoding(accept_encoding):
+    """Pick br or gzip from an Accept-Encoding header, or None"""
+    offered = {}
+    for item in accept_encoding.lower().split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip()] = quality
+
+    if brotli is not None and offered.get('br', 0) > 0:
+        return 'br'
+    if offered.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+class CompressionMiddleware:
+    """Negotiate gzip/brotli for large responses and cache compressed bodies by ETag"""
+
+    def __init__(self, app, min_size=500, cache_size=64, max_cached_body=2 * 1024 * 1024,
+                 gzip_level=6, brotli_quality=5):
+        self.app = app
+        self.min_size = min_size
+        self.cache_size = cache_size
+        self.max_cached_body = max_cached_body
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'compressed': 0, 'cache_hits': 0, 'streamed': 0}
+
+    def __call__(self, environ, start_response):
+        encoding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        captured = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = headers
+            captured['exc_info'] = exc_info
+            return lambda data: captured.setdefault('written', []).append(data)
+
+        body = self.app(environ, capture_start_response)
+        if 'status' not in captured:
+            # Generator apps may only call start_response once iterated
+            iterator = iter(body)
+            first = next(iterator, b'')
+            body = _chain([first], iterator, body)
+        status = captured['status']
+        headers = captured['headers']
+        exc_info = captured.get('exc_info')
+
+        if not self._should_compress(status, headers):
+            start_response(status, headers, exc_info)
+            return self._with_written(captured, body)
+
+        content_length = _header(headers, 'Content-Length')
+        if content_length is None or captured.get('written'):
+            self.stats['streamed'] += 1
+            headers = _replace_headers(headers, encoding, None)
+            start_response(status, headers, exc_info)
+            return self._stream(self._with_written(captured, body), encoding)
+
+        try:
+            data = b''.join(body)
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+        if len(data) < self.min_size:
+            start_response(status, headers, exc_info)
+            return [data]
+
+        compressed = self._compress_cached(data, encoding, _header(headers, 'ETag'))
+        start_response(status, _replace_headers(headers, encoding, len(compressed)), exc_info)
+        return [compressed]
+
+    def _should_compress(self, status, headers):
+        if not status.startswith('200'):
+            return False
+        if _header(headers, 'Content-Encoding'):
+            return False
+        if 'no-transform' in (_header(headers, 'Cache-Control') or ''):
+            return False
+        content_type = (_header(headers, 'Content-Type') or '').lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _compress_cached(self, data, encoding, etag):
+        """Compress data, reusing a previous result for the same ETag"""
+        key = (etag, encoding) if etag else None
+        if key:
+            with self.lock:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.cache.move_to_end(key)
+                    self.stats['cache_hits'] += 1
+                    return cached
+
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(data, self.gzip_level)
+        self.stats['compressed'] += 1
+
+        if key and len(compressed) <= self.max_cached_body:
+            with self.lock:
+                self.cache[key] = compressed
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return compressed
+
+    def _stream(self, chunks, encoding):
+        """Compress a streamed body chunk by chunk, flushing so clients see data promptly"""
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            compress = compressor.compress
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            finish = compressor.flush
+
+        try:
+            for chunk in chunks:
+                if chunk:
+                    yield compress(chunk) + flush()
+            yield finish()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    @staticmethod
+    def _with_written(captured, body):
+        """Prepend anything the app sent through the legacy write() callable"""
+        written = captured.get('written')
+        if not written:
+            return body
+        return _chain(written, body, body)
+
+
+def _chain(first, rest, closeable):
+    try:
+        yield from first
+        yield from rest
+    finally:
+        if hasattr(closeable, 'close'):
+            closeable.close()
+
+
+def _header(headers, name):
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _replace_headers(headers, encoding, length):
+    """Headers for the compressed variant; strong ETags become weak"""
+    result = []
+    vary = None
+    for key, value in headers:
+        lower = key.lower()
+        if lower == 'content-length':
+            continue
+        if lower == 'vary':
+            vary = value
+            continue
+        if lower == 'etag' and not value.startswith('W/'):
+            value = 'W/' + value
+        result.append((key, value))
+
+    result.append(('Content-Encoding', encoding))
+    if length is not None:
+        result.append(('Content-Length', str(length)))
+    if vary and 'accept-encoding' not in vary.lower():
+        vary = f'{vary}, Accept-Encoding'
+    result.append(('Vary', vary or 'Accept-Encoding'))
+    return result
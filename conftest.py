@@ -0,0 +1,61 @@
+import os
+from types import SimpleNamespace
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+# Shared fixtures for the tests that drive app.py's routes
+# Needs a MongoDB server: TEST_MONGO_URI (default mongodb://localhost:27017)
+TEST_MONGO_URI = os.environ.get('TEST_MONGO_URI', 'mongodb://localhost:27017')
+TEST_DATABASE = 'stayfinder_app_test'
+
+
+@pytest.fixture(scope='session')
+def stayfinder():
+    """The app module, imported against the test server so it never touches MONGO_URI's database"""
+    os.environ['MONGO_URI'] = TEST_MONGO_URI
+    os.environ.setdefault('OWNER_DIGEST_THREAD', 'false')
+    import app as stayfinder
+    stayfinder.app.config['TESTING'] = True
+    return stayfinder
+
+
+@pytest.fixture
+def app_db(stayfinder):
+    """A fresh test database swapped in for the app's, dropped afterwards"""
+    client = MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command('ping')
+    except PyMongoError:
+        pytest.skip(f'MongoDB not reachable at {TEST_MONGO_URI}')
+    client.drop_database(TEST_DATABASE)
+    database = client[TEST_DATABASE]
+
+    original = stayfinder.mongo
+    stayfinder.mongo = SimpleNamespace(db=database, cx=client)
+    stayfinder.ensure_indexes()
+    stayfinder.profile_versions.clear()
+    stayfinder.map_tile.cache_clear()
+    yield database
+    stayfinder.mongo = original
+    client.drop_database(TEST_DATABASE)
+    client.close()
+
+
+@pytest.fixture
+def client(stayfinder):
+    return stayfinder.app.test_client()
+
+
+@pytest.fixture
+def make_user(app_db):
+    """Insert a user and return (document, access token for it)"""
+    def make(**fields):
+        import app as stayfinder
+        user = dict({'name': 'Test User', 'email': f'{os.urandom(4).hex()}@example.com',
+                     'user_type': 'student', 'password': 'x'}, **fields)
+        app_db.users.insert_one(user)
+        with stayfinder.app.app_context():
+            token = stayfinder.issue_access_token(user)
+        return user, {'Authorization': f'Bearer {token}'}
+    return make
@@ -0,0 +1,227 @@
+# Email Rendering Module - HTML emails from the templates in emails/
+# Templates are compiled once when the renderer is created: their <style>
+# rules are inlined into the markup (most mail clients drop <head> styles)
+# and a plain-text twin is derived from the same source, so sending an email
+# only renders two cached templates
+
+import os
+import re
+import threading
+from datetime import datetime
+from flask_mail import Message
+from jinja2 import BaseLoader, Environment, TemplateNotFound, select_autoescape
+
+TEXT_SUFFIX = '.txt'
+
+
+# --- moment() helper used by the templates ---
+
+MOMENT_TOKENS = re.compile(r'YYYY|YY|MMMM|MMM|MM|M|Do|DD|D|dddd|ddd|HH|H|hh|h|mm|ss|A')
+
+
+def ordinal(day):
+    if 11 <= day % 100 <= 13:
+        return f'{day}th'
+    return f"{day}{ {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th') }"
+
+
+class Moment:
+    """The small part of moment.js the email templates use: moment().format(...)"""
+
+    def __init__(self, value=None):
+        self.value = value or datetime.now()
+
+    def format(self, pattern='YYYY-MM-DD HH:mm'):
+        value = self.value
+        hour12 = value.hour % 12 or 12
+        tokens = {
+            'YYYY': f'{value.year:04d}', 'YY': f'{value.year % 100:02d}',
+            'MMMM': value.strftime('%B'), 'MMM': value.strftime('%b'),
+            'MM': f'{value.month:02d}', 'M': str(value.month),
+            'Do': ordinal(value.day), 'DD': f'{value.day:02d}', 'D': str(value.day),
+            'dddd': value.strftime('%A'), 'ddd': value.strftime('%a'),
+            'HH': f'{value.hour:02d}', 'H': str(value.hour),
+            'hh': f'{hour12:02d}', 'h': str(hour12),
+            'mm': f'{value.minute:02d}', 'ss': f'{value.second:02d}',
+            'A': 'AM' if value.hour < 12 else 'PM'
+        }
+        return MOMENT_TOKENS.sub(lambda m: tokens[m.group(0)], pattern)
+
+
+def moment(value=None):
+    return Moment(value)
+
+
+# --- CSS inlining ---
+
+STYLE_BLOCK = re.compile(r'<style[^>]*>(.*?)</style>', re.S | re.I)
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_RULE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+SIMPLE_SELECTOR = re.compile(r'^([a-z][a-z0-9]*)?(?:\.([\w-]+))?$', re.I)
+START_TAG = re.compile(r'<([a-z][a-z0-9]*)(\s[^<>]*?)?(/?)>', re.I)
+CLASS_ATTR = re.compile(r'\sclass="([^"]*)"', re.I)
+STYLE_ATTR = re.compile(r'\sstyle="([^"]*)"', re.I)
+
+
+def strip_at_rules(css):
+    """Drop @media and other @-blocks; they can't be inlined and stay in <style>"""
+    out, depth, i = [], 0, 0
+    while i < len(css):
+        if depth == 0 and css[i] == '@':
+            depth_start = css.find('{', i)
+            if depth_start == -1:
+                break
+            depth, i = 1, depth_start + 1
+            while i < len(css) and depth:
+                depth += {'{': 1, '}': -1}.get(css[i], 0)
+                i += 1
+            continue
+        out.append(css[i])
+        i += 1
+    return ''.join(out)
+
+
+def parse_css_rules(css):
+    """[(tag, class, declarations)] for the simple selectors in a stylesheet"""
+    rules = []
+    css = strip_at_rules(CSS_COMMENT.sub('', css))
+    for selectors, body in CSS_RULE.findall(css):
+        declarations = '; '.join(d.strip() for d in body.split(';') if d.strip())
+        for selector in selectors.split(','):
+            match = SIMPLE_SELECTOR.match(selector.strip())
+            if match and any(match.groups()):
+                rules.append((match.group(1), match.group(2), declarations))
+    return rules
+
+
+def specificity(rule):
+    tag, cls, _ = rule
+    return (cls is not None, tag is not None)
+
+
+def inline_css(html):
+    """Copy <style> rules onto the elements they match as style attributes.
+
+    Handles tag, .class and tag.class selectors, which is what the email
+    templates use; declarations already in a style attribute win.
+    """
+    rules = []
+    for css in STYLE_BLOCK.findall(html):
+        rules.extend(parse_css_rules(css))
+    rules.sort(key=specificity)  # Stable: source order within equal specificity
+    if not rules:
+        return html
+
+    body_start = html.lower().find('<body')
+    head, body = html[:max(body_start, 0)], html[max(body_start, 0):]
+
+    def apply(match):
+        tag, attrs, self_closing = match.group(1), match.group(2) or '', match.group(3)
+        class_match = CLASS_ATTR.search(attrs)
+        classes = set(class_match.group(1).split()) if class_match else set()
+        styles = [
+            declarations for rule_tag, rule_class, declarations in rules
+            if (rule_tag is None or rule_tag.lower() == tag.lower())
+            and (rule_class is None or rule_class in classes)
+        ]
+        if not styles:
+            return match.group(0)
+        style_match = STYLE_ATTR.search(attrs)
+        if style_match:
+            styles.append(style_match.group(1).strip().rstrip(';'))
+            attrs = STYLE_ATTR.sub('', attrs)
+        return f'<{tag}{attrs} style="{"; ".join(styles)}"{self_closing}>'
+
+    return head + START_TAG.sub(apply, body)
+
+
+# --- Plain-text twin ---
+
+TEXT_DROP = re.compile(r'<(head|style|script)[^>]*>.*?</\1>', re.S | re.I)
+PARAGRAPH = '\n\x00\n'  # Marks a blank line; plain line breaks collapse into each other
+TEXT_BREAKS = [
+    (re.compile(r'<li[^>]*>', re.I), '\n- '),
+    (re.compile(r'<(h[1-6])[^>]*>|</(p|h[1-6]|ul|ol)>', re.I), PARAGRAPH),
+    (re.compile(r'<br\s*/?>|</?(div|li|tr)[^>]*>', re.I), '\n'),
+    (re.compile(r'<[^>]+>'), ''),
+]
+WHITESPACE = re.compile(r'[ \t\r\n]+')
+BLANK_RUNS = re.compile(r'\n{3,}')
+# Inline {% if %} blocks leave stray spaces behind when rendered
+TEXT_EDGE_SPACES = re.compile(r'^[ \t]+|[ \t]+$', re.M)
+TEXT_INNER_SPACES = re.compile(r'(?<=\S)[ \t]{2,}')
+
+
+def html_to_text_source(html):
+    """Turn an HTML template into a plain-text template with the same Jinja code"""
+    text = WHITESPACE.sub(' ', TEXT_DROP.sub('', html))
+    for pattern, replacement in TEXT_BREAKS:
+        text = pattern.sub(replacement, text)
+    lines = [line.strip() for line in text.split('\n')]
+    text = '\n'.join(line for line in lines if line).replace('\x00', '')
+    return BLANK_RUNS.sub('\n\n', text).strip() + '\n'
+
+
+def tidy_text(text):
+    """Clean up whitespace left by template tags in a rendered text body"""
+    text = TEXT_INNER_SPACES.sub(' ', TEXT_EDGE_SPACES.sub('', text))
+    return BLANK_RUNS.sub('\n\n', text)
+
+
+# --- Loader and renderer ---
+
+class EmailTemplateLoader(BaseLoader):
+    """Loads emails/*.html with CSS inlined; name.txt is derived from name.html"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get_source(self, environment, template):
+        is_text = template.endswith(TEXT_SUFFIX)
+        name = template[:-len(TEXT_SUFFIX)] + '.html' if is_text else template
+        path = os.path.join(self.directory, name)
+        if not os.path.isfile(path):
+            raise TemplateNotFound(template)
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        source = html_to_text_source(source) if is_text else inline_css(source)
+        return source, path, lambda: True  # Compiled once per process
+
+    def list_templates(self):
+        return sorted(f for f in os.listdir(self.directory) if f.endswith('.html'))
+
+
+class EmailRenderer:
+    """Compiles every email template once and renders multipart messages"""
+
+    def __init__(self, directory):
+        loader = EmailTemplateLoader(directory)
+        html_env = Environment(loader=loader, autoescape=select_autoescape(['html']), auto_reload=False)
+        text_env = Environment(loader=loader, autoescape=False, auto_reload=False,
+                               trim_blocks=True, lstrip_blocks=True)
+        for env in (html_env, text_env):
+            env.globals['moment'] = moment
+
+        self._lock = threading.Lock()
+        self._templates = {}
+        self._envs = (html_env, text_env)
+        for name in loader.list_templates():
+            self._compile(name[:-len('.html')])
+
+    def _compile(self, name):
+        html_env, text_env = self._envs
+        pair = (html_env.get_template(name + '.html'), text_env.get_template(name + TEXT_SUFFIX))
+        with self._lock:
+            self._templates[name] = pair
+        return pair
+
+    def render(self, name, **context):
+        """(html, text) for a template name such as 'booking_confirmation_user'"""
+        pair = self._templates.get(name) or self._compile(name)
+        html_template, text_template = pair
+        return html_template.render(context), tidy_text(text_template.render(context))
+
+    def message(self, name, subject, recipients, sender=None, **context):
+        """A flask-mail Message carrying both the HTML and plain-text bodies"""
+        html, text = self.render(name, **context)
+        return Message(subject, sender=sender, recipients=recipients, body=text, html=html)
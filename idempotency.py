@@ -0,0 +1,90 @@
+# Idempotency Module - replay the first result of a retried submission
+# A client sends the same Idempotency-Key with every retry of one action;
+# the first request claims the key and its response is stored, so retries
+# get that response back instead of running the writes, emails and uploads again
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+
+CLAIMED = 'claimed'
+REPLAY = 'replay'
+IN_PROGRESS = 'in_progress'
+MISMATCH = 'mismatch'  # Key reused for a different request body
+
+REPLAYED_HEADERS = ('Content-Type', 'Location')
+
+
+def ensure_idempotency_indexes(db, ttl_hours):
+    """Expire stored keys ttl_hours after they were first used"""
+    db.idempotency_keys.create_index('created_at', expireAfterSeconds=int(ttl_hours * 3600))
+
+
+def request_fingerprint(json_body=None, form=None, files=None):
+    """Hash of what a request asks for, so a reused key can't replay a different action"""
+    if json_body is not None:
+        payload = {'json': json_body}
+    else:
+        payload = {
+            'form': sorted((k, v) for k, v in (form or {}).items(multi=True) if k != 'idempotency_key'),
+            'files': sorted((k, f.filename) for k, f in (files or {}).items(multi=True))
+        }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def claim(db, key_id, fingerprint, lock_seconds):
+    """Claim a key for this request.
+
+    Returns (CLAIMED, None) when the caller should run the action, or
+    (REPLAY | IN_PROGRESS | MISMATCH, record) when a request with the same
+    key already did. A claim left behind by a crashed request is taken over
+    once it is older than lock_seconds.
+    """
+    now = datetime.utcnow()
+    try:
+        db.idempotency_keys.insert_one({
+            '_id': key_id,
+            'fingerprint': fingerprint,
+            'state': IN_PROGRESS,
+            'created_at': now,
+            'locked_at': now
+        })
+        return CLAIMED, None
+    except DuplicateKeyError:
+        pass
+
+    record = db.idempotency_keys.find_one({'_id': key_id})
+    if record is None:
+        return claim(db, key_id, fingerprint, lock_seconds)  # Expired in between
+    if record.get('fingerprint') != fingerprint:
+        return MISMATCH, record
+    if record['state'] == 'done':
+        return REPLAY, record
+
+    taken = db.idempotency_keys.update_one(
+        {'_id': key_id, 'state': IN_PROGRESS, 'locked_at': {'$lt': now - timedelta(seconds=lock_seconds)}},
+        {'$set': {'locked_at': now}}
+    )
+    if taken.modified_count:
+        return CLAIMED, None
+    return IN_PROGRESS, record
+
+
+def complete(db, key_id, response):
+    """Store the response a claimed request produced"""
+    db.idempotency_keys.update_one(
+        {'_id': key_id},
+        {'$set': {
+            'state': 'done',
+            'status': response.status_code,
+            'headers': {h: response.headers[h] for h in REPLAYED_HEADERS if h in response.headers},
+            'body': response.get_data()
+        }}
+    )
+
+
+def release(db, key_id):
+    """Drop a claim whose request failed, so a retry can run it again"""
+    db.idempotency_keys.delete_one({'_id': key_id, 'state': IN_PROGRESS})
@@ -0,0 +1,113 @@
+# Image Processing Module - downscale and re-encode listing photos
+# Phone photos arrive at 8-12 MB; listings store a card-sized and a
+# detail-sized variant instead, re-encoded as WebP (JPEG if Pillow lacks WebP)
+# with EXIF metadata dropped
+
+import os
+import tempfile
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None  # Optional: photos are stored as uploaded without Pillow
+
+CHUNK_SIZE = 64 * 1024
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+MAX_PIXELS = 60_000_000  # Refuse decompression bombs before decoding
+
+# Variant name -> bounding box; photos are shrunk to fit, never enlarged
+VARIANTS = {
+    'card': (640, 480),
+    'detail': (1600, 1200)
+}
+
+SAVE_OPTIONS = {
+    'WEBP': {'quality': 80, 'method': 4},
+    'JPEG': {'quality': 82, 'optimize': True, 'progressive': True}
+}
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+def available():
+    return Image is not None
+
+
+def output_format():
+    return 'WEBP' if features.check('webp') else 'JPEG'
+
+
+def spool_to_tempfile(stream, suffix='', max_bytes=MAX_UPLOAD_BYTES, digest=None):
+    """Copy an upload stream to a temp file in chunks; the caller deletes it.
+
+    A hashlib object passed as digest is fed each chunk as it streams in.
+    """
+    tmp = tempfile.NamedTemporaryFile(prefix='photo-', suffix=suffix, delete=False)
+    size = 0
+    try:
+        with tmp:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f'Photos must be smaller than {max_bytes // (1024 * 1024)} MB')
+                tmp.write(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+    except Exception:
+        os.unlink(tmp.name)
+        raise
+    return tmp.name
+
+
+def make_variants(path, variants=VARIANTS):
+    """Write each variant of the photo at path to its own temp file.
+
+    Returns {name: {'path', 'format', 'extension', 'width', 'height', 'bytes'}};
+    the caller deletes the files. Raises ValueError for files that aren't
+    images or are too large to decode safely.
+    """
+    fmt = output_format()
+    results = {}
+    try:
+        with Image.open(path) as image:
+            if image.width * image.height > MAX_PIXELS:
+                raise ValueError('Photo resolution is too large')
+            # JPEGs decode straight at a reduced scale when much bigger than needed
+            image.draft('RGB', max(variants.values()))
+            image = ImageOps.exif_transpose(image)
+            has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha and fmt == 'WEBP' else 'RGB')
+
+            # Largest first, so each smaller variant is resized from an already small image
+            for name, box in sorted(variants.items(), key=lambda item: item[1], reverse=True):
+                image = image.copy()
+                image.thumbnail(box, Image.LANCZOS)
+                out = tempfile.NamedTemporaryFile(prefix=f'photo-{name}-', suffix='.' + EXTENSIONS[fmt], delete=False)
+                with out:
+                    image.save(out, fmt, **SAVE_OPTIONS[fmt])
+                results[name] = {
+                    'path': out.name,
+                    'format': fmt,
+                    'extension': EXTENSIONS[fmt],
+                    'width': image.width,
+                    'height': image.height,
+                    'bytes': os.path.getsize(out.name)
+                }
+    except (OSError, Image.DecompressionBombError) as e:
+        discard_variants(results)
+        raise ValueError(f'Not a readable image: {e}') from e
+    except Exception:
+        discard_variants(results)
+        raise
+    return results
+
+
+def discard_variants(variants):
+    """Delete the temp files make_variants wrote"""
+    for variant in variants.values():
+        try:
+            os.unlink(variant['path'])
+        except FileNotFoundError:
+            pass
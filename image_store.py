@@ -0,0 +1,188 @@
+# Image Store Module - signed direct uploads from the browser
+# The server only hands out short-lived signed upload parameters; the browser
+# sends the photo bytes straight to the store, and the listing form submits
+# the store's signed result, which is verified here before the URL is saved.
+# Cloudinary in production, a local directory as a stand-in for development and tests
+
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import shutil
+import time
+import cloudinary.uploader
+import cloudinary.utils
+import image_processing
+
+UPLOAD_TTL_SECONDS = 3600  # Cloudinary accepts an upload signature for an hour
+# Applied by Cloudinary as the photo arrives, so raw phone photos aren't stored full size
+CLOUDINARY_INCOMING_TRANSFORMATION = 'c_limit,w_2560,h_2560'
+SAFE_EXTENSION = re.compile(r'^[a-z0-9]{1,5}$')
+
+
+class CloudinaryStore:
+    """Signed uploads to Cloudinary's upload API"""
+
+    name = 'cloudinary'
+
+    def __init__(self, cloud_name, api_key, api_secret):
+        self.cloud_name = cloud_name
+        self.api_key = api_key
+        self.api_secret = api_secret
+
+    def upload_params(self, folder):
+        """Where and with which signed fields the browser posts a photo"""
+        timestamp = int(time.time())
+        params = {'folder': folder, 'timestamp': timestamp, 'transformation': CLOUDINARY_INCOMING_TRANSFORMATION}
+        return {
+            'upload_url': f'https://api.cloudinary.com/v1_1/{self.cloud_name}/image/upload',
+            'fields': dict(params, api_key=self.api_key,
+                           signature=cloudinary.utils.api_sign_request(params, self.api_secret)),
+            'expires_at': timestamp + UPLOAD_TTL_SECONDS
+        }
+
+    def verify(self, public_id, version, signature):
+        """True if (public_id, version) came from an upload response Cloudinary signed"""
+        expected = cloudinary.utils.api_sign_request(
+            {'public_id': public_id, 'version': version}, self.api_secret, signature_version=1
+        )
+        return hmac.compare_digest(expected, str(signature))
+
+    def url(self, public_id, version):
+        return cloudinary.utils.cloudinary_url(
+            public_id, version=version, secure=True, cloud_name=self.cloud_name
+        )[0]
+
+    def variant_urls(self, public_id, version):
+        """Card and detail sizes of an uploaded original, resized by Cloudinary on delivery"""
+        return {
+            name: cloudinary.utils.cloudinary_url(
+                public_id, version=version, secure=True, cloud_name=self.cloud_name,
+                width=width, height=height, crop='limit', fetch_format='auto', quality='auto'
+            )[0]
+            for name, (width, height) in image_processing.VARIANTS.items()
+        }
+
+    def upload_file(self, path, folder):
+        """Upload a file from the server (the no-JavaScript form path); returns its public_id and URL"""
+        result = cloudinary.uploader.upload(
+            path, folder=folder, resource_type='image',
+            cloud_name=self.cloud_name, api_key=self.api_key, api_secret=self.api_secret
+        )
+        return {'public_id': result['public_id'], 'url': result['secure_url']}
+
+    def delete(self, public_id):
+        """Remove a photo along with its derived (resized) versions"""
+        cloudinary.uploader.destroy(
+            public_id, invalidate=True,
+            cloud_name=self.cloud_name, api_key=self.api_key, api_secret=self.api_secret
+        )
+
+
+class LocalImageStore:
+    """Stand-in store keeping photos in a directory, signed like Cloudinary does"""
+
+    name = 'local'
+
+    def __init__(self, directory, secret, base_url='/_local_store', ttl=600, max_bytes=10 * 1024 * 1024):
+        self.directory = directory
+        self.secret = secret.encode('utf-8')
+        self.base_url = base_url.rstrip('/')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def _sign(self, *parts):
+        message = '|'.join(str(part) for part in parts).encode('utf-8')
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+
+    def upload_params(self, folder):
+        expires = int(time.time()) + self.ttl
+        return {
+            'upload_url': f'{self.base_url}/upload',
+            'fields': {'folder': folder, 'expires': expires, 'signature': self._sign('upload', folder, expires)},
+            'expires_at': expires
+        }
+
+    def accept_upload(self, fields, file):
+        """Handle a browser upload: check the signed fields, save the file, sign the result"""
+        folder, expires = fields.get('folder', ''), fields.get('expires', '0')
+        if not hmac.compare_digest(self._sign('upload', folder, expires), fields.get('signature', '')):
+            raise PermissionError('Invalid upload signature')
+        if not expires.isdigit() or int(expires) < time.time():
+            raise PermissionError('Upload signature expired')
+
+        data = file.read(self.max_bytes + 1)
+        if len(data) > self.max_bytes:
+            raise ValueError(f'Photos must be smaller than {self.max_bytes // (1024 * 1024)} MB')
+        extension = os.path.splitext(file.filename or '')[1].lstrip('.').lower()
+        if not SAFE_EXTENSION.match(extension):
+            extension = 'jpg'
+
+        public_id = f'{folder}/{secrets.token_hex(10)}.{extension}'
+        os.makedirs(os.path.dirname(self._path(public_id)), exist_ok=True)
+        with open(self._path(public_id), 'wb') as f:
+            f.write(data)
+
+        version = int(time.time())
+        return {
+            'public_id': public_id,
+            'version': version,
+            'signature': self._sign('result', public_id, version),
+            'secure_url': self.url(public_id, version),
+            'bytes': len(data)
+        }
+
+    def verify(self, public_id, version, signature):
+        return hmac.compare_digest(self._sign('result', public_id, version), str(signature))
+
+    def url(self, public_id, version):
+        return f'{self.base_url}/v{version}/{public_id}'
+
+    def _path(self, public_id):
+        return os.path.join(self.directory, *public_id.split('/'))
+
+    def _store(self, source_path, public_id):
+        os.makedirs(os.path.dirname(self._path(public_id)), exist_ok=True)
+        shutil.copyfile(source_path, self._path(public_id))
+        return {'public_id': public_id, 'url': self.url(public_id, int(time.time()))}
+
+    def variant_urls(self, public_id, version):
+        """Card and detail sizes of an uploaded original, written next to it as <name>-<variant>"""
+        if not image_processing.available():
+            return {name: self.url(public_id, version) for name in image_processing.VARIANTS}
+        base = os.path.splitext(public_id)[0]
+        variants = image_processing.make_variants(self._path(public_id))
+        try:
+            return {
+                name: self._store(v['path'], f"{base}-{name}.{v['extension']}")['url']
+                for name, v in variants.items()
+            }
+        finally:
+            image_processing.discard_variants(variants)
+
+    def upload_file(self, path, folder):
+        extension = os.path.splitext(path)[1].lstrip('.').lower()
+        if not SAFE_EXTENSION.match(extension):
+            extension = 'jpg'
+        return self._store(path, f'{folder}/{secrets.token_hex(10)}.{extension}')
+
+    def delete(self, public_id):
+        """Remove a photo along with the variants written next to it"""
+        directory, filename = os.path.split(self._path(public_id))
+        derived_prefix = os.path.splitext(filename)[0] + '-'
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name == filename or name.startswith(derived_prefix):
+                os.unlink(os.path.join(directory, name))
+
+
+def create_image_store(kind, cloudinary_credentials, local_directory, secret):
+    """Cloudinary when configured (or kind='cloudinary'), else the local stand-in"""
+    cloud_name, api_key, api_secret = cloudinary_credentials
+    if kind == 'cloudinary' or (kind != 'local' and cloud_name and api_key and api_secret):
+        return CloudinaryStore(cloud_name, api_key, api_secret)
+    return LocalImageStore(local_directory, secret)
@@ -0,0 +1,131 @@
+# Room Inventory Module - per-listing, per-room-type capacity counters
+# A booking reserves a room with one conditional atomic update on its
+# counter, so concurrent requests can never take more rooms than exist.
+# Each counter stores reserved explicitly and keeps
+# available = max(0, capacity - reserved), so lowering capacity below the
+# rooms already held doesn't lose count of them.
+
+from collections import Counter
+from datetime import datetime
+from pymongo import UpdateOne
+
+RESERVED = 'reserved'
+SOLD_OUT = 'sold_out'
+UNTRACKED = 'untracked'  # Owner hasn't set a capacity for this room type
+
+
+def ensure_inventory_indexes(db):
+    """Create the indexes reservations and expiry sweeps rely on"""
+    db.room_inventory.create_index([('hostel_id', 1), ('room_id', 1)], unique=True)
+    db.bookings.create_index([('hostel_id', 1), ('room_id', 1), ('status', 1), ('expires_at', 1)])
+
+
+# Counters written before reserved was stored derive it from capacity - available
+RESERVED_COUNT = {'$ifNull': ['$reserved', {'$subtract': [
+    {'$ifNull': ['$capacity', 0]}, {'$ifNull': ['$available', 0]}
+]}]}
+AVAILABLE_COUNT = {'$set': {'available': {'$max': [0, {'$subtract': ['$capacity', '$reserved']}]}}}
+
+
+def adjust_reserved(change):
+    """Update pipeline adding change to reserved (never below 0) and recomputing available"""
+    return [
+        {'$set': {'reserved': {'$max': [0, {'$add': [RESERVED_COUNT, change]}]}}},
+        AVAILABLE_COUNT
+    ]
+
+
+def set_capacity(db, hostel_id, room_id, capacity):
+    """Set the number of rooms of a type, keeping rooms already reserved reserved.
+
+    Capacity may go below the current reservations; the room type then stays
+    sold out until enough of them are released.
+    """
+    db.room_inventory.update_one(
+        {'hostel_id': hostel_id, 'room_id': room_id},
+        [
+            {'$set': {
+                'reserved': {'$max': [0, RESERVED_COUNT]},
+                'capacity': capacity,
+                'updated_at': datetime.utcnow()
+            }},
+            AVAILABLE_COUNT
+        ],
+        upsert=True
+    )
+
+
+def get_inventory(db, hostel_id):
+    """Capacity and availability for every room type of a listing"""
+    return list(db.room_inventory.find(
+        {'hostel_id': hostel_id},
+        {'_id': 0, 'room_id': 1, 'capacity': 1, 'reserved': 1, 'available': 1}
+    ))
+
+
+def reserve_room(db, hostel_id, room_id):
+    """Take one room of a type; returns RESERVED, SOLD_OUT or UNTRACKED"""
+    result = db.room_inventory.update_one(
+        {'hostel_id': hostel_id, 'room_id': room_id, 'available': {'$gt': 0}},
+        adjust_reserved(1)
+    )
+    if result.modified_count:
+        return RESERVED
+    if db.room_inventory.count_documents({'hostel_id': hostel_id, 'room_id': room_id}, limit=1):
+        return SOLD_OUT
+    return UNTRACKED
+
+
+def release_room(db, hostel_id, room_id):
+    """Give one room back"""
+    db.room_inventory.update_one({'hostel_id': hostel_id, 'room_id': room_id}, adjust_reserved(-1))
+
+
+def release_rooms(db, bookings):
+    """Give back the rooms held by a batch of closed bookings in one bulk write"""
+    counts = Counter(
+        (booking['hostel_id'], booking['room_id'])
+        for booking in bookings if booking.get('room_reserved')
+    )
+    if not counts:
+        return
+    db.room_inventory.bulk_write([
+        UpdateOne({'hostel_id': hostel_id, 'room_id': room_id}, adjust_reserved(-count))
+        for (hostel_id, room_id), count in counts.items()
+    ], ordered=False)
+
+
+def close_booking(db, booking_id, status):
+    """Move a pending booking to status, releasing its room exactly once.
+
+    The status check and change happen in one update, so a booking that is
+    rejected and expires at the same moment only gives its room back once.
+    Returns the booking as it was before the change, or None if it was no
+    longer pending.
+    """
+    booking = db.bookings.find_one_and_update(
+        {'_id': booking_id, 'status': 'pending'},
+        {'$set': {'status': status, 'updated_at': datetime.utcnow()}}
+    )
+    if booking and booking.get('room_reserved'):
+        release_room(db, booking['hostel_id'], booking['room_id'])
+    return booking
+
+
+def expire_pending_bookings(db, hostel_id=None, room_id=None, now=None):
+    """Expire pending bookings that hold a room past their hold time, freeing the rooms.
+
+    Bookings for room types without a capacity hold nothing, so they stay
+    pending until the owner answers.
+    """
+    query = {'status': 'pending', 'room_reserved': True, 'expires_at': {'$lte': now or datetime.utcnow()}}
+    if hostel_id is not None:
+        query['hostel_id'] = hostel_id
+    if room_id is not None:
+        query['room_id'] = room_id
+
+    expired = 0
+    for booking in db.bookings.find(query, {'_id': 1}):
+        if close_booking(db, booking['_id'], 'expired'):
+            expired += 1
+    return expired
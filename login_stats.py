@@ -0,0 +1,105 @@
+# Login Stats Module - write-behind batching of last_login / login_count
+# Logins record their stats in memory and return; a background thread writes
+# everything gathered since the last flush as one unordered bulk_write, with
+# one update per user however many times they logged in.
+#
+# Lost-update bound: stats live only in this process until flushed.
+# - A normal interpreter exit flushes what is buffered (stop() runs from
+#   atexit). SIGTERM only counts if the server turns it into a normal exit
+#   (gunicorn does for its workers); otherwise it is a hard crash.
+# - A hard crash (SIGKILL, OOM) loses at most flush_interval seconds of
+#   logins, or max_pending users' worth if that fills first, per process.
+# - A failed flush puts its stats back and retries on the next flush.
+# Readers may see last_login / login_count up to flush_interval seconds old.
+# Updates use $max and $inc, so flushes from several processes commute.
+
+import threading
+from datetime import datetime
+from pymongo import UpdateOne
+
+
+class LoginStatsBuffer:
+    """In-memory login stats, flushed to users as one bulk_write"""
+
+    def __init__(self, collection, flush_interval=5, max_pending=500):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}  # user _id -> [logins, latest login time]
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.stats = {'recorded': 0, 'flushes': 0, 'written': 0, 'failed_flushes': 0}
+
+    def record(self, user_id, when=None):
+        """Count a login; returns immediately"""
+        when = when or datetime.utcnow()
+        with self._lock:
+            entry = self._pending.get(user_id)
+            if entry is None:
+                self._pending[user_id] = [1, when]
+            else:
+                entry[0] += 1
+                entry[1] = max(entry[1], when)
+            self.stats['recorded'] += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()  # Flush early rather than let the buffer grow
+
+    def _requeue(self, batch):
+        with self._lock:
+            for user_id, (logins, when) in batch.items():
+                entry = self._pending.get(user_id)
+                if entry is None:
+                    self._pending[user_id] = [logins, when]
+                else:
+                    entry[0] += logins
+                    entry[1] = max(entry[1], when)
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of users updated"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            updates = [
+                UpdateOne({'_id': user_id}, {'$max': {'last_login': when}, '$inc': {'login_count': logins}})
+                for user_id, (logins, when) in batch.items()
+            ]
+            try:
+                self.collection.bulk_write(updates, ordered=False)
+            except Exception:
+                self._requeue(batch)
+                self.stats['failed_flushes'] += 1
+                raise
+            self.stats['flushes'] += 1
+            self.stats['written'] += len(updates)
+            return len(updates)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠ Login stats flush failed, retrying next time: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='login-stats', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and write what is left (registered with atexit)"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠ Final login stats flush failed, {len(self._pending)} users' stats lost: {e}")
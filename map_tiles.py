@@ -0,0 +1,54 @@
+# Map Tiles Module - slippy-map tile math for the clustered map endpoint
+# Tiles are Web Mercator squares, which are plain latitude/longitude
+# rectangles. They are matched with half-open ranges on the latitude and
+# longitude fields: a GeoJSON polygon would draw its edges as geodesics,
+# which bow away from the lines of latitude and leave points near a tile's
+# edge in no tile at all.
+
+import math
+
+MAX_LATITUDE = 85.0511  # Web Mercator stops here
+
+
+def tile_count(zoom):
+    return 1 << zoom
+
+
+def lng_to_tile_x(longitude, zoom):
+    n = tile_count(zoom)
+    return max(0, min(int((longitude + 180.0) / 360.0 * n), n - 1))
+
+
+def lat_to_tile_y(latitude, zoom):
+    n = tile_count(zoom)
+    latitude = max(min(latitude, MAX_LATITUDE), -MAX_LATITUDE)
+    lat_rad = math.radians(latitude)
+    return max(0, min(int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n), n - 1))
+
+
+def tile_bounds(zoom, x, y):
+    """Return (west, south, east, north) of a tile in degrees"""
+    n = tile_count(zoom)
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def tile_match(zoom, x, y):
+    """Query for the points inside a tile.
+
+    Ranges are half-open, so a point on a shared edge belongs to exactly one
+    tile. The outermost tiles are closed at the antimeridian and the poles so
+    points at longitude 180 or beyond the Mercator limit still land somewhere.
+    """
+    n = tile_count(zoom)
+    west, south, east, north = tile_bounds(zoom, x, y)
+    longitude = {'$gte': west, '$lt': east} if x < n - 1 else {'$gte': west}
+    latitude = {'$gte': south, '$lt': north} if y > 0 else {'$gte': south}
+    if y == n - 1:
+        del latitude['$gte']
+    if x == 0:
+        del longitude['$gte']
+    return {'latitude': latitude, 'longitude': longitude}
@@ -0,0 +1,149 @@
+# Password Hashing Module - bcrypt off the request threads, with load shedding
+# bcrypt is slow on purpose (~0.25 s of CPU per call at cost 12), so a burst of
+# logins run inline keeps every request thread on the worker busy hashing.
+# Calls go to a small thread pool instead; once workers + max_pending calls
+# are in flight, new ones are refused with PasswordHasherBusy (served as a 503
+# with Retry-After) rather than queueing behind the burst.
+#
+# Threads rather than processes: bcrypt releases the GIL while hashing, so
+# the workers run in parallel, and forking worker processes out of the app
+# (which already runs pymongo, executor and flusher threads) can deadlock
+# the child on a lock some other thread held.
+
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import bcrypt
+
+
+class PasswordHasherBusy(Exception):
+    """The pool is saturated; retry_after is a suggested wait in seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Password hashing is saturated, retry in {retry_after}s')
+        self.retry_after = retry_after
+
+
+def cost_factor(hashed):
+    """Cost (log2 rounds) of a bcrypt hash like $2b$12$..., None if unreadable"""
+    try:
+        return int(hashed.split(b'$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+# Run in the pool's workers; they return their own running time so the
+# metrics don't include time spent queued
+def _check(password, hashed):
+    started = time.perf_counter()
+    matches = bcrypt.checkpw(password, hashed)
+    return matches, time.perf_counter() - started
+
+
+def _hash(password, rounds):
+    started = time.perf_counter()
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+    return hashed, time.perf_counter() - started
+
+
+class PasswordHasher:
+    """Bounded bcrypt pool shared by the login and registration routes"""
+
+    def __init__(self, workers=2, max_pending=16, rounds=12, timeout=30):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self.in_flight = 0
+        self.rejected = 0
+        self.by_cost = defaultdict(lambda: {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+            return self._executor
+
+    def _retry_after(self):
+        """Seconds until the calls ahead would drain at the observed cost"""
+        with self._lock:
+            calls = sum(stats['calls'] for stats in self.by_cost.values())
+            seconds = sum(stats['seconds'] for stats in self.by_cost.values())
+            pending = self.in_flight
+        average = seconds / calls if calls else 0.25
+        return max(1, round(pending * average / self.workers + 0.5))
+
+    def _run(self, cost, function, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy(self._retry_after())
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._pool().submit(function, *args)
+        except Exception:
+            self._done(None)
+            raise
+        # The slot is held until the call finishes, even if the request gave up waiting
+        future.add_done_callback(self._done)
+        try:
+            result, seconds = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Still queued or hashing; the pool is as good as saturated for this caller
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy(self._retry_after())
+        with self._lock:
+            stats = self.by_cost[cost]
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+        return result
+
+    def _done(self, future):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def check(self, password, hashed):
+        """bcrypt.checkpw in the pool; str or bytes arguments"""
+        password = password.encode('utf-8') if isinstance(password, str) else password
+        hashed = hashed.encode('utf-8') if isinstance(hashed, str) else hashed
+        return self._run(cost_factor(hashed), _check, password, hashed)
+
+    def hash(self, password):
+        """bcrypt hash of password at the configured cost, as str"""
+        password = password.encode('utf-8') if isinstance(password, str) else password
+        return self._run(self.rounds, _hash, password, self.rounds).decode('utf-8')
+
+    def metrics(self):
+        """Pool state and per-cost timings, for sizing workers and max_pending"""
+        with self._lock:
+            by_cost = {
+                str(cost): {
+                    'calls': stats['calls'],
+                    'avg_ms': round(stats['seconds'] / stats['calls'] * 1000, 1) if stats['calls'] else None,
+                    'max_ms': round(stats['max_seconds'] * 1000, 1)
+                }
+                for cost, stats in sorted(self.by_cost.items(), key=lambda item: item[0] or 0)
+            }
+            return {
+                'pool': 'started' if self._executor is not None else 'not started',
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'rounds': self.rounds,
+                'in_flight': self.in_flight,
+                'rejected': self.rejected,
+                'by_cost': by_cost
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
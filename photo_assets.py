@@ -0,0 +1,93 @@
+# Photo Assets Module - content-hash deduplication of listing photos
+# Every stored photo is recorded once per owner under the SHA-256 of its
+# original bytes. Listings take a reference on the assets they show, so an
+# owner's building and amenity photos are uploaded once across all their
+# properties and removed from the image store when the last listing using
+# them is deleted. An asset document exists only while refs > 0.
+
+import re
+from collections import Counter
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+SHA256_HEX = re.compile(r'^[0-9a-f]{64}$')
+
+
+def ensure_photo_asset_indexes(db):
+    db.photo_assets.create_index(
+        [('owner_id', 1), ('sha256', 1)], unique=True,
+        partialFilterExpression={'sha256': {'$type': 'string'}}
+    )
+
+
+def valid_hash(sha256):
+    return isinstance(sha256, str) and bool(SHA256_HEX.match(sha256))
+
+
+def known_hashes(db, owner_id, hashes):
+    """Which of these content hashes the owner already has stored"""
+    hashes = [h for h in hashes if valid_hash(h)]
+    if not hashes:
+        return set()
+    cursor = db.photo_assets.find({'owner_id': owner_id, 'sha256': {'$in': hashes}}, {'sha256': 1})
+    return {doc['sha256'] for doc in cursor}
+
+
+def acquire(db, owner_id, sha256):
+    """Take a reference on the owner's stored copy of this content; None if there isn't one"""
+    if not valid_hash(sha256):
+        return None
+    return db.photo_assets.find_one_and_update(
+        {'owner_id': owner_id, 'sha256': sha256},
+        {'$inc': {'refs': 1}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def register(db, owner_id, sha256, variants, public_ids):
+    """Record a freshly stored photo, holding one reference on it.
+
+    Returns (asset, created). When another request stored the same content
+    first, its asset is acquired instead and created is False; the caller
+    then deletes its own copy from the image store.
+    """
+    while True:
+        asset = {
+            'owner_id': owner_id,
+            'sha256': sha256 if valid_hash(sha256) else None,
+            'variants': variants,
+            'public_ids': public_ids,
+            'refs': 1,
+            'created_at': datetime.utcnow()
+        }
+        try:
+            db.photo_assets.insert_one(asset)
+            return asset, True
+        except DuplicateKeyError:
+            existing = acquire(db, owner_id, sha256)
+            if existing:
+                return existing, False
+            # The other copy lost its last reference in between; try again
+
+
+def release(db, asset_ids):
+    """Drop one reference per id (repeats allowed); returns the assets that are now unused.
+
+    Unused assets are deleted here, so the caller only has to remove their
+    files from the image store.
+    """
+    unused = []
+    for asset_id, count in Counter(asset_ids).items():
+        while True:
+            asset = db.photo_assets.find_one_and_delete({'_id': asset_id, 'refs': {'$lte': count}})
+            if asset:
+                unused.append(asset)
+                break
+            result = db.photo_assets.update_one(
+                {'_id': asset_id, 'refs': {'$gt': count}}, {'$inc': {'refs': -count}}
+            )
+            if result.matched_count or not db.photo_assets.count_documents({'_id': asset_id}, limit=1):
+                break
+            # refs changed between the two updates; look again
+    return unused
@@ -0,0 +1,71 @@
+# Responsive Images Module - width-limited delivery URLs for listing photos
+# Cloudinary resizes on delivery when the transformation is part of the URL,
+# so responsive variants are derived from the stored URL by string rewriting,
+# with no API call. The widths are fixed presets: each maps to one derived
+# image Cloudinary and the CDN cache, whatever the page asks for.
+# URLs from other hosts (placeholders, the local image store) pass through unchanged.
+# Templates and payloads name a preset ('card', 'detail', 'thumbnail') rather than a width.
+
+import re
+
+# Preset -> widths offered in its srcset
+SRCSET_WIDTHS = {
+    'card': (320, 480, 640, 960),
+    'detail': (640, 960, 1280, 1600)
+}
+# Preset -> width of its plain src, for browsers without srcset support
+SRC_WIDTHS = {'card': 640, 'detail': 1280, 'thumbnail': 160}
+
+CLOUDINARY_UPLOAD = re.compile(r'^(https?://res\.cloudinary\.com/[^/]+/image/upload/)(.+)$')
+VERSION = re.compile(r'^v\d+$')
+TRANSFORMATION_PART = re.compile(r'^[a-z]{1,3}_[^,/]+$')
+
+
+def _split(url):
+    """(prefix, path after any existing transformations) of a Cloudinary upload URL, else None"""
+    if not isinstance(url, str):
+        return None
+    match = CLOUDINARY_UPLOAD.match(url.strip())
+    if not match:
+        return None
+    prefix, rest = match.groups()
+    segments = rest.split('/')
+    # Drop transformations already in the URL, e.g. the card/detail variants
+    while len(segments) > 1 and not VERSION.match(segments[0]) and all(
+        TRANSFORMATION_PART.match(part) for part in segments[0].split(',')
+    ):
+        segments.pop(0)
+    return prefix, '/'.join(segments)
+
+
+def responsive_url(url, preset='card'):
+    """The image at url limited to a preset's (or a given) width, in the browser's best format;
+    url itself if not resizable"""
+    width = SRC_WIDTHS[preset] if isinstance(preset, str) else preset
+    parts = _split(url)
+    if parts is None:
+        return url
+    prefix, path = parts
+    return f'{prefix}c_limit,f_auto,q_auto,w_{width}/{path}'
+
+
+def srcset_entries(url, preset='card'):
+    """[{'url', 'width'}] for a srcset attribute; empty when url can't be resized"""
+    if _split(url) is None:
+        return []
+    return [{'url': responsive_url(url, width), 'width': width} for width in SRCSET_WIDTHS[preset]]
+
+
+def srcset(url, preset='card'):
+    """srcset attribute value for url, '' when it can't be resized"""
+    return ', '.join(f"{entry['url']} {entry['width']}w" for entry in srcset_entries(url, preset))
+
+
+def with_responsive_images(hostel):
+    """Copy of a hostel list payload with a card-sized image and a srcset for it"""
+    hostel = dict(hostel)
+    image = hostel.get('image')
+    hostel['image_srcset'] = srcset_entries(image)
+    if not hostel.get('image_card') and hostel['image_srcset']:
+        hostel['image_card'] = responsive_url(image, 'card')
+    return hostel
@@ -0,0 +1,114 @@
+# Serialization Module - encode MongoDB documents straight into API responses
+# JSON by default, msgpack for clients sending Accept: application/msgpack
+# ObjectId, datetime and Decimal128 values are handled by the encoder itself,
+# so routes can return documents as they come out of pymongo
+#
+# Wire format: datetimes are ISO 8601 in UTC with an explicit offset
+# ("2025-06-01T09:30:15.250000+00:00"), replacing Flask's default HTTP-date
+# strings ("Sun, 01 Jun 2025 09:30:15 GMT"). pymongo returns naive UTC, so
+# the offset is added here; without it JavaScript's Date would read the
+# value as local time.
+
+from collections.abc import Mapping
+from datetime import date, datetime, timezone
+from bson.decimal128 import Decimal128
+from bson.objectid import ObjectId
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional: falls back to the standard library encoder
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # Optional: API responses stay JSON-only without it
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_OBJECTID_EXT = 1  # 12 raw ObjectId bytes; datetimes use the standard Timestamp ext
+
+# OPT_NAIVE_UTC: orjson encodes datetimes itself, so it needs telling they are UTC too
+ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC) if orjson else 0
+
+
+def bson_default(obj):
+    """Encode BSON types the JSON encoder doesn't know about"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=timezone.utc)  # pymongo returns naive UTC
+        return obj.isoformat()
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Mapping):
+        return dict(obj)  # RawBSONDocument from the raw read path
+    return DefaultJSONProvider.default(obj)
+
+
+def msgpack_default(obj):
+    """Map BSON types onto msgpack extension types or compact values"""
+    if isinstance(obj, ObjectId):
+        return msgpack.ExtType(MSGPACK_OBJECTID_EXT, obj.binary)
+    if isinstance(obj, datetime):
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=timezone.utc)  # pymongo returns naive UTC
+        return msgpack.Timestamp.from_datetime(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not msgpack serializable')
+
+
+def packb(obj):
+    """Encode a response object to msgpack bytes"""
+    return msgpack.packb(obj, default=msgpack_default, use_bin_type=True)
+
+
+def msgpack_ext_hook(code, data):
+    """Decoder hook turning the ObjectId extension back into an ObjectId"""
+    if code == MSGPACK_OBJECTID_EXT:
+        return ObjectId(data)
+    return msgpack.ExtType(code, data)
+
+
+def wants_msgpack():
+    """True if the current /api/ request prefers msgpack over JSON"""
+    if msgpack is None or not has_request_context() or not request.path.startswith('/api/'):
+        return False
+    best = request.accept_mimetypes.best_match(['application/json', MSGPACK_MIMETYPE])
+    return best == MSGPACK_MIMETYPE
+
+
+class BSONJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that understands BSON types, using orjson when installed"""
+
+    default = staticmethod(bson_default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+
+        if wants_msgpack():
+            response = self._app.response_class(packb(obj), mimetype=MSGPACK_MIMETYPE)
+        elif orjson is None or pretty:
+            response = super().response(obj)
+        else:
+            body = orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS)
+            response = self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+        if msgpack is not None and has_request_context() and request.path.startswith('/api/'):
+            response.vary.add('Accept')
+        return response
@@ -0,0 +1,155 @@
+# SMTP Pool Module - keep SMTP sessions open between flask-mail sends
+# Mail.send() opens a TCP+TLS session, logs in, sends one message and quits;
+# the pool hands out already authenticated sessions instead, checks idle ones
+# with NOOP before reuse, reconnects dropped ones and caps how many are open
+
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app, has_app_context
+from flask_mail import BadHeaderError, email_dispatched, sanitize_address, sanitize_addresses
+
+# Errors that mean the session is gone rather than the message being refused
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class PooledConnection:
+    """One checked-out SMTP session; reconnects once if the server dropped it"""
+
+    def __init__(self, pool, host):
+        self.pool = pool
+        self.host = host
+
+    def send(self, message, envelope_from=None):
+        """Send a flask-mail Message the way flask_mail.Connection.send does"""
+        assert message.send_to, "No recipients have been added"
+        assert message.sender, "The message does not specify a sender"
+        if message.has_bad_headers():
+            raise BadHeaderError
+        if message.date is None:
+            message.date = time.time()
+
+        if not self.pool.mail.suppress:
+            args = (
+                sanitize_address(envelope_from or message.sender),
+                list(sanitize_addresses(message.send_to)),
+                message.as_bytes(),
+                message.mail_options,
+                message.rcpt_options
+            )
+            if self.host is None:
+                self.host = self.pool._connect()  # An earlier reconnect failed
+            try:
+                self.host.sendmail(*args)
+            except CONNECTION_ERRORS:
+                self.pool._discard(self.host)
+                self.host = None
+                self.host = self.pool._connect()
+                self.pool._count('reconnects')
+                self.host.sendmail(*args)
+
+        self.pool._count('sent')
+        if has_app_context():
+            email_dispatched.send(current_app._get_current_object(), message=message)
+
+
+class SMTPPool:
+    """Process-wide pool of SMTP sessions configured like a flask_mail.Mail"""
+
+    def __init__(self, mail, max_connections=4, idle_timeout=60, check_after=5, timeout=10):
+        self.mail = mail
+        self.idle_timeout = idle_timeout  # Close sessions idle longer than this
+        self.check_after = check_after  # NOOP sessions idle longer than this before reuse
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._idle = []  # (host, last used), most recently used last
+        self._lock = threading.Lock()
+        self.stats = {'connects': 0, 'reused': 0, 'reconnects': 0, 'sent': 0, 'discarded': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _connect(self):
+        """Open, secure and authenticate a new session"""
+        if self.mail.use_ssl:
+            host = smtplib.SMTP_SSL(self.mail.server, self.mail.port, timeout=self.timeout)
+        else:
+            host = smtplib.SMTP(self.mail.server, self.mail.port, timeout=self.timeout)
+        try:
+            host.set_debuglevel(int(self.mail.debug))
+            if self.mail.use_tls:
+                host.starttls()
+            if self.mail.username and self.mail.password:
+                host.login(self.mail.username, self.mail.password)
+        except Exception:
+            host.close()
+            raise
+        self._count('connects')
+        return host
+
+    def _discard(self, host):
+        self._count('discarded')
+        try:
+            host.quit()
+        except Exception:
+            host.close()
+
+    def _checkout(self):
+        """Most recently used healthy idle session, or a new one"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                host, last_used = self._idle.pop()
+            idle = time.monotonic() - last_used
+            if idle > self.idle_timeout:
+                self._discard(host)
+                continue
+            if idle > self.check_after:
+                try:
+                    if host.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected('NOOP failed')
+                except OSError:  # SMTPException is an OSError too
+                    self._discard(host)
+                    continue
+            self._count('reused')
+            return host
+        return self._connect()
+
+    def _checkin(self, host):
+        with self._lock:
+            self._idle.append((host, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """Borrow a session for several sends; waits while all are in use"""
+        if self.mail.suppress:
+            yield PooledConnection(self, None)
+            return
+
+        with self._slots:
+            conn = PooledConnection(self, self._checkout())
+            try:
+                yield conn
+            except Exception:
+                if conn.host is not None:
+                    self._discard(conn.host)  # Unknown session state after a failed send
+                raise
+            else:
+                if conn.host is not None:
+                    self._checkin(conn.host)
+
+    def send(self, *messages):
+        """Send messages over one session"""
+        with self.connection() as conn:
+            for message in messages:
+                conn.send(message)
+
+    def close(self):
+        """Quit every idle session, e.g. at shutdown"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for host, _ in idle:
+            self._discard(host)
@@ -361,7 +361,9 @@ class StayfinderApp {
 
     async loadColleges() {
         try {
-            const response = await fetch('/api/colleges');
+            // Content-hash URL from base.html is cached by the browser per dataset version
+            const collegesMeta = document.querySelector('meta[name="colleges-url"]');
+            const response = await fetch(collegesMeta ? collegesMeta.content : '/api/colleges');
             if (response.ok) {
                 const result = await response.json();
                 if (result.success) {
@@ -684,7 +686,7 @@ class StayfinderApp {
         }).join('');
 
         const imageUrl = (hostel.image && hostel.image.trim() && hostel.image !== 'undefined') ? 
-            hostel.image : 
+            (hostel.image_card || hostel.image) : 
             'https://via.placeholder.com/400x300?text=No+Image';
 
         // Add distance badge if available
@@ -700,6 +702,7 @@ class StayfinderApp {
                 <div class="card shadow-sm h-100 border-0 hostel-card">
                     <div class="position-relative">
                         <img src="${imageUrl}" class="card-img-top" alt="${hostel.name}" 
+                             ${srcsetAttributes(hostel, '(max-width: 768px) 300px, 350px')}
                              style="height: 240px; object-fit: cover; width: 100%;" 
                              onerror="this.onerror=null; this.src='https://via.placeholder.com/400x300?text=Image+Not+Available';">
                         
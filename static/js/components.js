@@ -96,7 +96,8 @@ class UIComponents {
             <div class="col-md-6 col-lg-4 mb-4">
                 <div class="card hostel-card h-100">
                     <div class="position-relative">
-                        <img src="${hostel.image}" class="card-img-top" alt="${hostel.name}">
+                        <img src="${hostel.image_card || hostel.image}" class="card-img-top" alt="${hostel.name}"
+                             ${srcsetAttributes(hostel, '(max-width: 767px) 100vw, (max-width: 991px) 50vw, 33vw')}>
                         <span class="badge bg-dark position-absolute top-0 end-0 m-2">${hostel.type}</span>
                     </div>
                     <div class="card-body d-flex flex-column">
@@ -0,0 +1,12 @@
+// Responsive Images - srcset/sizes for listing cards
+// A classic script (not a module) so the inline search script in base.html
+// and the app/components modules all share this one helper
+
+// srcset/sizes attributes from the API's image_srcset (width-limited Cloudinary copies)
+function srcsetAttributes(hostel, sizes) {
+    if (!hostel.image_srcset || !hostel.image_srcset.length) {
+        return '';
+    }
+    const srcset = hostel.image_srcset.map(entry => `${entry.url} ${entry.width}w`).join(', ');
+    return `srcset="${srcset}" sizes="${sizes}"`;
+}
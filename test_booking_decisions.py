@@ -0,0 +1,136 @@
+from contextlib import contextmanager
+import pytest
+from bson.objectid import ObjectId
+import inventory
+
+# Owner accept/reject of booking requests, one at a time and in bulk
+# Route tests need a MongoDB server (see conftest.py)
+ROOM = 'double_ac'
+
+@pytest.fixture
+def sent(stayfinder, monkeypatch):
+    """Bookings handed to the decision emails, instead of queueing real mail"""
+    notified = []
+    monkeypatch.setattr(stayfinder, 'notify_booking_decisions', notified.extend)
+    return notified
+
+@pytest.fixture
+def listing(app_db, make_user):
+    """An owner's listing with two rooms, both held by pending bookings"""
+    owner, owner_headers = make_user(name='Owner', user_type='owner')
+    student, _ = make_user(name='Student')
+    hostel_id = app_db.hostels.insert_one({'name': 'Sunrise', 'created_by': str(owner['_id'])}).inserted_id
+    inventory.set_capacity(app_db, hostel_id, ROOM, 2)
+    bookings = []
+    for _ in range(2):
+        assert inventory.reserve_room(app_db, hostel_id, ROOM) == inventory.RESERVED
+        bookings.append(app_db.bookings.insert_one({
+            'user_id': student['_id'], 'hostel_id': hostel_id, 'room_id': ROOM, 'room_reserved': True,
+            'status': 'pending', 'owner_digest_pending': True
+        }).inserted_id)
+    return {'db': app_db, 'hostel_id': hostel_id, 'bookings': bookings, 'headers': owner_headers}
+
+def available(listing):
+    return listing['db'].room_inventory.find_one({'hostel_id': listing['hostel_id']})['available']
+
+def status(listing, booking_id):
+    return listing['db'].bookings.find_one({'_id': booking_id})['status']
+
+def test_accept_moves_the_booking_out_of_pending(listing, client, sent):
+    booking_id = listing['bookings'][0]
+    response = client.post(f'/api/bookings/{booking_id}/accept', headers=listing['headers'])
+    assert response.status_code == 200
+    assert response.get_json()['data']['status'] == 'accepted'
+
+    booking = listing['db'].bookings.find_one({'_id': booking_id})
+    assert booking['status'] == 'accepted'
+    assert 'owner_digest_pending' not in booking
+    assert available(listing) == 0  # Accepted bookings keep their room
+    assert [b['_id'] for b in sent] == [booking_id]
+
+def test_reject_gives_the_room_back(listing, client, sent):
+    booking_id = listing['bookings'][0]
+    response = client.post(f'/api/bookings/{booking_id}/reject', headers=listing['headers'])
+    assert response.status_code == 200
+    assert status(listing, booking_id) == 'rejected'
+    assert available(listing) == 1
+
+def test_decided_booking_gets_409(listing, client, sent):
+    booking_id = listing['bookings'][0]
+    client.post(f'/api/bookings/{booking_id}/reject', headers=listing['headers'])
+    response = client.post(f'/api/bookings/{booking_id}/accept', headers=listing['headers'])
+    assert response.status_code == 409
+    assert status(listing, booking_id) == 'rejected'
+    assert available(listing) == 1  # The room is not released twice
+    assert len(sent) == 1
+
+def test_another_owner_cannot_decide(listing, client, make_user, sent):
+    _, stranger_headers = make_user(name='Other Owner', user_type='owner')
+    booking_id = listing['bookings'][0]
+    response = client.post(f'/api/bookings/{booking_id}/reject', headers=stranger_headers)
+    assert response.status_code == 404
+    assert status(listing, booking_id) == 'pending'
+    assert available(listing) == 0
+    assert sent == []
+
+def test_bulk_applies_pending_and_skips_the_rest(listing, client, make_user, sent):
+    first, second = listing['bookings']
+    client.post(f'/api/bookings/{first}/accept', headers=listing['headers'])
+    unknown = ObjectId()
+    response = client.post('/api/bookings/bulk', headers=listing['headers'], json={'decisions': [
+        {'booking_id': str(first), 'action': 'reject'},
+        {'booking_id': str(second), 'action': 'reject'},
+        {'booking_id': str(unknown), 'action': 'accept'},
+    ]})
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['data']['updated'] == [{'booking_id': str(second), 'status': 'rejected'}]
+    assert sorted(body['data']['skipped'], key=lambda s: s['reason']) == [
+        {'booking_id': str(unknown), 'reason': 'not_found'},
+        {'booking_id': str(first), 'reason': 'not_pending'},
+    ]
+    assert status(listing, first) == 'accepted'
+    assert status(listing, second) == 'rejected'
+    assert available(listing) == 1
+
+def test_bulk_from_another_owner_changes_nothing(listing, client, make_user, sent):
+    _, stranger_headers = make_user(name='Other Owner', user_type='owner')
+    response = client.post('/api/bookings/bulk', headers=stranger_headers, json={'decisions': [
+        {'booking_id': str(b), 'action': 'reject'} for b in listing['bookings']
+    ]})
+    body = response.get_json()
+    assert body['data']['updated'] == []
+    assert {s['reason'] for s in body['data']['skipped']} == {'not_found'}
+    assert [status(listing, b) for b in listing['bookings']] == ['pending', 'pending']
+    assert available(listing) == 0
+
+@pytest.mark.parametrize('payload', [{}, {'decisions': []}, {'decisions': [{'booking_id': 'x', 'action': 'accept'}]},
+                                     {'decisions': [{'booking_id': str(ObjectId()), 'action': 'maybe'}]}])
+def test_bulk_bad_requests_get_400(listing, client, payload):
+    response = client.post('/api/bookings/bulk', headers=listing['headers'], json=payload)
+    assert response.status_code == 400
+
+def test_decision_emails_use_the_template(stayfinder, listing, monkeypatch):
+    messages = []
+    class Connection:
+        send = messages.append
+    @contextmanager
+    def connection():
+        yield Connection()
+    monkeypatch.setattr(stayfinder.smtp_pool, 'connection', connection)
+
+    student_id = listing['db'].bookings.find_one()['user_id']
+    stayfinder.send_booking_decision_emails([
+        {'user_id': student_id, 'status': 'accepted', 'hostel_name': 'Sunrise', 'property_type': 'Double AC'},
+        {'user_id': student_id, 'status': 'rejected', 'hostel_name': 'Sunrise'},
+    ])
+
+    accepted, rejected = messages
+    assert accepted.subject == 'Booking Accepted - Sunrise'
+    assert 'Dear Student' in accepted.body and 'has been accepted' in accepted.body
+    assert 'Double AC' in accepted.html and '<style' in accepted.html
+    assert rejected.subject == 'Booking Rejected - Sunrise'
+    assert 'has been rejected' in rejected.body and 'Room Type: N/A' in rejected.body
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
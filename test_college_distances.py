@@ -0,0 +1,48 @@
+import pytest
+
+# Precomputed college distance table and the college search that reads it
+# Route tests need a MongoDB server (see conftest.py)
+def college(stayfinder, name='L.D. College Of Engineering'):
+    return stayfinder.find_college_by_name(name)
+
+def offset(stayfinder, base, km_north):
+    """(latitude, longitude) km_north kilometres due north of a college"""
+    return base['Latitude'] + km_north / 111.195, base['Longitude']
+
+def test_distances_are_sorted_and_within_the_horizon(stayfinder):
+    ld = college(stayfinder)
+    latitude, longitude = offset(stayfinder, ld, 1.0)
+    pairs = stayfinder.compute_college_distances(latitude, longitude)
+
+    distances = [pair['distance'] for pair in pairs]
+    assert distances == sorted(distances)
+    assert all(d <= stayfinder.COLLEGE_DISTANCE_HORIZON_KM for d in distances)
+    own = next(pair for pair in pairs if pair['college_id'] == ld['NO.'])
+    assert own['distance'] == pytest.approx(1.0, abs=0.01)
+
+def test_no_coordinates_means_no_distances(stayfinder):
+    fields = stayfinder.hostel_location_fields(None, None)
+    assert fields == {'geo': None, 'college_distances': []}
+
+def test_college_search_filters_by_radius_and_orders_by_distance(stayfinder, app_db, client):
+    ld = college(stayfinder)
+    for name, km in [('Far', 4.0), ('Near', 0.5), ('Outside', 8.0), ('Middle', 2.0)]:
+        latitude, longitude = offset(stayfinder, ld, km)
+        hostel = {'name': name, 'latitude': latitude, 'longitude': longitude, 'property_type': 'Hostel'}
+        hostel.update(stayfinder.hostel_location_fields(latitude, longitude))
+        app_db.hostels.insert_one(hostel)
+
+    response = client.post('/api/hostels/search/college', json={
+        'college_name': ld['Name'], 'max_distance': 5
+    })
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [h['name'] for h in body['data']] == ['Near', 'Middle', 'Far']
+    assert [h['distance_from_college'] for h in body['data']] == pytest.approx([0.5, 2.0, 4.0], abs=0.01)
+    assert all('college_distances' not in h for h in body['data'])
+
+    narrow = client.post('/api/hostels/search/college', json={'college_name': ld['Name'], 'max_distance': 1}).get_json()
+    assert [h['name'] for h in narrow['data']] == ['Near']
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
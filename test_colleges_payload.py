@@ -0,0 +1,53 @@
+import gzip
+import json
+import pytest
+
+# Precompressed colleges dataset: per-encoding ETags and conditional requests
+def get(client, path='/api/colleges', encoding=None, if_none_match=None):
+    headers = {'Accept': 'application/json'}
+    if encoding:
+        headers['Accept-Encoding'] = encoding
+    if if_none_match:
+        headers['If-None-Match'] = if_none_match
+    return client.get(path, headers=headers)
+
+def test_each_encoding_has_its_own_etag(stayfinder, client):
+    identity = get(client)
+    gzipped = get(client, encoding='gzip')
+    assert identity.headers.get('Content-Encoding') is None
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert identity.headers['ETag'] != gzipped.headers['ETag']
+    assert json.loads(gzip.decompress(gzipped.data)) == identity.get_json()
+    assert identity.get_json()['count'] == len(stayfinder.colleges)
+
+    if stayfinder.colleges_payload['br'] is not None:
+        brotli_response = get(client, encoding='br, gzip')
+        assert brotli_response.headers['Content-Encoding'] == 'br'
+        assert brotli_response.headers['ETag'] not in (identity.headers['ETag'], gzipped.headers['ETag'])
+
+def test_matching_etag_in_a_list_gives_304(client):
+    etag = get(client, encoding='gzip').headers['ETag']
+    response = get(client, encoding='gzip', if_none_match=f'"stale", W/{etag}')
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.data == b''
+
+    assert get(client, if_none_match='*').status_code == 304
+
+def test_another_encodings_etag_does_not_match(client):
+    gzip_etag = get(client, encoding='gzip').headers['ETag']
+    identity_etag = get(client).headers['ETag']
+    # The identity tag is a prefix of the gzip one; a substring check would wrongly match
+    assert get(client, if_none_match=gzip_etag).status_code == 200
+    assert get(client, encoding='gzip', if_none_match=identity_etag).status_code == 200
+
+def test_versioned_url(stayfinder, client):
+    digest = stayfinder.colleges_payload['digest']
+    response = get(client, f'/api/colleges/{digest}.json')
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    stale = get(client, '/api/colleges/0000000000000000.json')
+    assert stale.status_code == 302 and stale.headers['Location'].endswith(f'{digest}.json')
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,75 @@
+import gzip
+import json
+import zlib
+from flask import Flask, Response, jsonify, request
+from compression import CompressionMiddleware
+
+# Test the compression middleware against a small stand-in app
+def make_app():
+    app = Flask(__name__)
+
+    @app.route('/catalog')
+    def catalog():
+        response = jsonify({'data': [{'name': f'Hostel {i}', 'city': 'Ahmedabad'} for i in range(200)]})
+        response.add_etag()
+        return response.make_conditional(request)
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'line {i}\n' for i in range(1000)), mimetype='text/plain')
+
+    middleware = CompressionMiddleware(app.wsgi_app)
+    app.wsgi_app = middleware
+    return app, middleware
+
+def test_gzip_negotiated_for_large_json():
+    app, _ = make_app()
+    response = app.test_client().get('/catalog', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.headers['ETag'].startswith('W/')
+    body = json.loads(gzip.decompress(response.data))
+    assert len(body['data']) == 200
+
+def test_small_and_unaccepted_responses_untouched():
+    app, _ = make_app()
+    client = app.test_client()
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/catalog').headers
+    assert 'Content-Encoding' not in client.get('/catalog', headers={'Accept-Encoding': 'gzip;q=0'}).headers
+
+def test_identical_responses_compressed_once():
+    app, middleware = make_app()
+    client = app.test_client()
+    for _ in range(5):
+        client.get('/catalog', headers={'Accept-Encoding': 'gzip'})
+    assert middleware.stats['compressed'] == 1
+    assert middleware.stats['cache_hits'] == 4
+
+def test_weak_etag_revalidates():
+    app, _ = make_app()
+    client = app.test_client()
+    etag = client.get('/catalog', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    response = client.get('/catalog', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304
+
+def test_streamed_response_compressed_incrementally():
+    app, middleware = make_app()
+    response = app.test_client().get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    text = zlib.decompress(response.data, 16 + zlib.MAX_WBITS).decode()
+    assert text.splitlines()[-1] == 'line 999'
+    assert middleware.stats['streamed'] == 1
+
+if __name__ == '__main__':
+    test_gzip_negotiated_for_large_json()
+    test_small_and_unaccepted_responses_untouched()
+    test_identical_responses_compressed_once()
+    test_weak_etag_revalidates()
+    test_streamed_response_compressed_incrementally()
+    print('All compression tests passed')
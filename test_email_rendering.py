@@ -0,0 +1,47 @@
+import os
+from datetime import datetime
+from email_rendering import EmailRenderer, inline_css, moment
+
+# Rendering tests for the booking email templates in emails/
+EMAILS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'emails')
+CONTEXT = {
+    'user': {'name': 'Asha <Patel>', 'email': 'asha@example.com', 'created_at': datetime(2024, 3, 1)},
+    'hostel': {'name': 'Sunrise Boys Hostel', 'location': 'Navrangpura', 'city': 'Ahmedabad'},
+    'property_type': 'Double Sharing',
+    'facility': 'AC'
+}
+
+def test_moment_format():
+    assert moment(datetime(2025, 6, 1)).format('MMMM Do, YYYY') == 'June 1st, 2025'
+    assert moment(datetime(2025, 6, 12, 15, 5)).format('DD/MM/YY h:mm A') == '12/06/25 3:05 PM'
+
+def test_css_inlined_and_inline_styles_win():
+    html = inline_css(
+        '<style>p { color: red; margin: 0 } .note { color: blue }</style>'
+        '<body><p class="note" style="color: green">Hi</p></body>'
+    )
+    assert '<p class="note" style="color: red; margin: 0; color: blue; color: green">' in html
+
+def test_booking_templates_render():
+    renderer = EmailRenderer(EMAILS_DIR)
+    for name in ('booking_confirmation_user', 'booking_confirmation_owner'):
+        html, text = renderer.render(name, **CONTEXT)
+        assert 'class="header" style="background: linear-gradient' in html
+        assert 'Asha &lt;Patel&gt;' in html
+        assert 'Room Type: Double Sharing' in text
+        assert '<' not in text.replace('Asha <Patel>', '')
+        assert datetime.now().strftime('%B') in text
+
+def test_message_is_multipart():
+    renderer = EmailRenderer(EMAILS_DIR)
+    msg = renderer.message('booking_confirmation_user', 'Booking Request Confirmed',
+                           ['asha@example.com'], sender='noreply@example.com', **CONTEXT)
+    assert msg.html.startswith('<!DOCTYPE html>')
+    assert msg.body.startswith('🎉 Booking Request Confirmed!')
+
+if __name__ == '__main__':
+    test_moment_format()
+    test_css_inlined_and_inline_styles_win()
+    test_booking_templates_render()
+    test_message_is_multipart()
+    print('All email rendering tests passed')
@@ -0,0 +1,88 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+import idempotency
+
+# Idempotency-Key handling on POST /api/bookings/request
+# Needs a MongoDB server (see conftest.py)
+@pytest.fixture
+def booking(stayfinder, app_db, make_user, monkeypatch):
+    """A student, a listing to book, and confirmation emails that go nowhere"""
+    monkeypatch.setattr(stayfinder.smtp_pool, 'send', lambda *messages: None)
+    hostel_id = app_db.hostels.insert_one({'name': 'Sunrise', 'city': 'Ahmedabad'}).inserted_id
+    _, headers = make_user(name='Student')
+    body = {'hostel_id': str(hostel_id), 'room_id': 'double_ac', 'property_type': 'Double', 'facility': 'AC'}
+    return {'db': app_db, 'headers': headers, 'body': body}
+
+def post(client, booking, key, body=None):
+    return client.post('/api/bookings/request', json=body or booking['body'],
+                       headers=dict(booking['headers'], **{'Idempotency-Key': key}))
+
+def test_retry_replays_the_first_response(client, booking):
+    first = post(client, booking, 'key-1')
+    retry = post(client, booking, 'key-1')
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_data() == first.get_data()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert booking['db'].bookings.count_documents({}) == 1
+
+def test_new_key_runs_again(client, booking):
+    post(client, booking, 'key-1')
+    post(client, booking, 'key-2')
+    assert booking['db'].bookings.count_documents({}) == 2
+
+def test_key_reused_for_a_different_body_gets_422(client, booking):
+    post(client, booking, 'key-1')
+    response = post(client, booking, 'key-1', dict(booking['body'], facility='Non-AC'))
+    assert response.status_code == 422
+    assert booking['db'].bookings.count_documents({}) == 1
+
+def test_keys_are_scoped_to_the_user(client, booking, make_user):
+    _, other_headers = make_user(name='Other Student')
+    post(client, booking, 'key-1')
+    response = post(client, dict(booking, headers=other_headers), 'key-1')
+    assert 'Idempotent-Replayed' not in response.headers
+    assert booking['db'].bookings.count_documents({}) == 2
+
+def test_duplicate_while_in_flight_gets_409(stayfinder, client, booking, monkeypatch):
+    started, finish = threading.Event(), threading.Event()
+    def slow_send(*messages):
+        started.set()
+        finish.wait(10)
+    monkeypatch.setattr(stayfinder.smtp_pool, 'send', slow_send)
+
+    responses = {}
+    first = threading.Thread(target=lambda: responses.update(first=post(stayfinder.app.test_client(), booking, 'key-1')))
+    first.start()
+    try:
+        assert started.wait(10)
+        duplicate = post(client, booking, 'key-1')
+    finally:
+        finish.set()
+        first.join(10)
+
+    assert duplicate.status_code == 409
+    assert duplicate.headers['Retry-After'] == '1'
+    assert responses['first'].status_code == 200
+    assert booking['db'].bookings.count_documents({}) == 1
+    assert post(client, booking, 'key-1').headers['Idempotent-Replayed'] == 'true'
+
+def test_failed_request_can_be_retried(client, booking):
+    response = post(client, booking, 'key-1', dict(booking['body'], hostel_id='not-an-id'))
+    assert response.status_code == 500
+    assert booking['db'].idempotency_keys.count_documents({}) == 0
+
+def test_abandoned_claim_is_taken_over(app_db):
+    assert idempotency.claim(app_db, 'k', 'f', lock_seconds=60) == (idempotency.CLAIMED, None)
+    assert idempotency.claim(app_db, 'k', 'f', lock_seconds=60)[0] == idempotency.IN_PROGRESS
+    app_db.idempotency_keys.update_one({'_id': 'k'}, {'$set': {'locked_at': datetime.utcnow() - timedelta(minutes=2)}})
+    assert idempotency.claim(app_db, 'k', 'f', lock_seconds=60) == (idempotency.CLAIMED, None)
+
+def test_keys_expire_after_the_ttl(stayfinder, app_db):
+    index = app_db.idempotency_keys.index_information()['created_at_1']
+    assert index['expireAfterSeconds'] == stayfinder.IDEMPOTENCY_TTL_HOURS * 3600
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
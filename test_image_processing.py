@@ -0,0 +1,79 @@
+import io
+import os
+import tempfile
+import pytest
+import image_processing
+from werkzeug.datastructures import FileStorage
+from image_store import LocalImageStore
+
+PIL = pytest.importorskip('PIL')
+from PIL import Image
+
+# Downscaling of listing photos into card and detail variants
+def phone_photo(path, size=(4032, 3024)):
+    """A JPEG shaped like a phone photo, with EXIF saying it was taken rotated"""
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+    exif[0x010F] = 'PhoneMaker'
+    Image.new('RGB', size, (200, 120, 40)).save(path, 'JPEG', quality=95, exif=exif)
+
+def test_variants_fit_their_boxes_and_drop_exif():
+    with tempfile.TemporaryDirectory() as directory:
+        original = os.path.join(directory, 'room.jpg')
+        phone_photo(original)
+        variants = image_processing.make_variants(original)
+        try:
+            assert set(variants) == set(image_processing.VARIANTS)
+            for name, variant in variants.items():
+                box = image_processing.VARIANTS[name]
+                # Rotated by its EXIF orientation, so it is portrait now
+                assert variant['height'] > variant['width']
+                assert variant['width'] <= box[0] and variant['height'] <= box[1]
+                assert variant['bytes'] < os.path.getsize(original)
+                with Image.open(variant['path']) as image:
+                    assert image.format == variant['format']
+                    assert not image.getexif()
+            assert variants['card']['bytes'] < variants['detail']['bytes']
+        finally:
+            image_processing.discard_variants(variants)
+        assert not any(os.path.exists(v['path']) for v in variants.values())
+
+def test_small_photos_are_not_enlarged():
+    with tempfile.TemporaryDirectory() as directory:
+        original = os.path.join(directory, 'small.png')
+        Image.new('RGB', (300, 200), 'white').save(original)
+        variants = image_processing.make_variants(original)
+        try:
+            assert (variants['detail']['width'], variants['detail']['height']) == (300, 200)
+        finally:
+            image_processing.discard_variants(variants)
+
+def test_non_images_and_oversized_uploads_are_refused():
+    with tempfile.TemporaryDirectory() as directory:
+        bogus = os.path.join(directory, 'bogus.jpg')
+        with open(bogus, 'wb') as f:
+            f.write(b'not an image')
+        with pytest.raises(ValueError):
+            image_processing.make_variants(bogus)
+
+    with pytest.raises(ValueError):
+        image_processing.spool_to_tempfile(io.BytesIO(b'x' * 11), max_bytes=10)
+
+def test_local_store_serves_variants_of_direct_uploads():
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'upload.jpg')
+        phone_photo(source)
+        store = LocalImageStore(os.path.join(directory, 'store'), 'test-secret')
+        fields = {k: str(v) for k, v in store.upload_params('stayfinder/hostels/owner1')['fields'].items()}
+        with open(source, 'rb') as f:
+            result = store.accept_upload(fields, FileStorage(f, filename='upload.jpg'))
+
+        urls = store.variant_urls(result['public_id'], result['version'])
+        assert set(urls) == {'card', 'detail'}
+        for url in urls.values():
+            public_id = url.split('/', 3)[3]
+            with Image.open(store._path(public_id)) as image:
+                assert max(image.size) <= 1600
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
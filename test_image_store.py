@@ -0,0 +1,97 @@
+import io
+import os
+import tempfile
+import time
+import pytest
+import cloudinary.utils
+from werkzeug.datastructures import FileStorage
+from image_store import CloudinaryStore, LocalImageStore, create_image_store
+
+# Signed direct uploads against the local stand-in store
+def make_store(directory, **kwargs):
+    return LocalImageStore(directory, 'test-secret', **kwargs)
+
+def photo(data=b'\xff\xd8 fake jpeg', filename='room.JPG'):
+    return FileStorage(io.BytesIO(data), filename=filename)
+
+def test_signed_upload_round_trip():
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        params = store.upload_params('stayfinder/hostels/owner1')
+        fields = {k: str(v) for k, v in params['fields'].items()}  # As the browser posts them
+        result = store.accept_upload(fields, photo())
+
+        assert result['public_id'].startswith('stayfinder/hostels/owner1/')
+        assert result['public_id'].endswith('.jpg')
+        assert store.verify(result['public_id'], result['version'], result['signature'])
+        assert store.url(result['public_id'], result['version']) == result['secure_url']
+        with open(os.path.join(directory, *result['public_id'].split('/')), 'rb') as f:
+            assert f.read() == b'\xff\xd8 fake jpeg'
+
+def test_forged_results_are_rejected():
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        fields = {k: str(v) for k, v in store.upload_params('stayfinder/hostels/owner1')['fields'].items()}
+        result = store.accept_upload(fields, photo())
+
+        assert not store.verify('stayfinder/hostels/owner2/x.jpg', result['version'], result['signature'])
+        assert not store.verify(result['public_id'], result['version'] + 1, result['signature'])
+        assert not store.verify(result['public_id'], result['version'], 'f' * 64)
+
+def test_tampered_or_expired_upload_params_are_refused():
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        fields = {k: str(v) for k, v in store.upload_params('stayfinder/hostels/owner1')['fields'].items()}
+        with pytest.raises(PermissionError):
+            store.accept_upload(dict(fields, folder='stayfinder/hostels/owner2'), photo())
+
+        expired = make_store(directory, ttl=-1)
+        fields = {k: str(v) for k, v in expired.upload_params('stayfinder/hostels/owner1')['fields'].items()}
+        with pytest.raises(PermissionError):
+            expired.accept_upload(fields, photo())
+
+def test_oversized_upload_is_refused():
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory, max_bytes=10)
+        fields = {k: str(v) for k, v in store.upload_params('stayfinder/hostels/owner1')['fields'].items()}
+        with pytest.raises(ValueError):
+            store.accept_upload(fields, photo(b'x' * 11))
+        assert not os.listdir(directory)
+
+def test_delete_removes_derived_files():
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        fields = {k: str(v) for k, v in store.upload_params('stayfinder/hostels/owner1')['fields'].items()}
+        kept = store.accept_upload(fields, photo())
+        removed = store.accept_upload(fields, photo())
+        base = os.path.join(directory, *removed['public_id'].split('/'))[:-len('.jpg')]
+        with open(base + '-card.webp', 'wb') as f:
+            f.write(b'variant')
+
+        store.delete(removed['public_id'])
+        assert os.listdir(os.path.dirname(base)) == [os.path.basename(kept['public_id'])]
+
+def test_cloudinary_signatures_match_cloudinary():
+    store = CloudinaryStore('demo', 'key', 'secret')
+    params = store.upload_params('stayfinder/hostels/owner1')
+    fields = params['fields']
+    assert params['upload_url'] == 'https://api.cloudinary.com/v1_1/demo/image/upload'
+    assert abs(fields['timestamp'] - time.time()) < 5
+    assert fields['signature'] == cloudinary.utils.api_sign_request(
+        {'folder': fields['folder'], 'timestamp': fields['timestamp'], 'transformation': fields['transformation']},
+        'secret'
+    )
+
+    response_signature = cloudinary.utils.api_sign_request(
+        {'public_id': 'stayfinder/hostels/owner1/abc', 'version': 1712345678}, 'secret', signature_version=1
+    )
+    assert store.verify('stayfinder/hostels/owner1/abc', 1712345678, response_signature)
+    assert not store.verify('stayfinder/hostels/owner1/abd', 1712345678, response_signature)
+
+def test_store_selection():
+    assert create_image_store('auto', ('demo', 'key', 'secret'), '/tmp', 's').name == 'cloudinary'
+    assert create_image_store('auto', (None, None, None), '/tmp', 's').name == 'local'
+    assert create_image_store('local', ('demo', 'key', 'secret'), '/tmp', 's').name == 'local'
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+import pytest
+from login_stats import LoginStatsBuffer
+
+# Login storm against the write-behind stats buffer, with an in-memory users collection
+class UsersCollection:
+    """Applies the $max/$inc UpdateOnes the buffer sends, like MongoDB would"""
+
+    def __init__(self, fail_next=0):
+        self.docs = {}
+        self.bulk_writes = 0
+        self.fail_next = fail_next
+        self.lock = threading.Lock()
+
+    def bulk_write(self, requests, ordered=True):
+        with self.lock:
+            if self.fail_next:
+                self.fail_next -= 1
+                raise ConnectionError('primary stepped down')
+            self.bulk_writes += 1
+            for request in requests:
+                doc = self.docs.setdefault(request._filter['_id'], {'login_count': 0, 'last_login': None})
+                doc['login_count'] += request._doc['$inc']['login_count']
+                when = request._doc['$max']['last_login']
+                doc['last_login'] = max(doc['last_login'] or when, when)
+
+def storm(buffer, users=25, threads=40, logins_per_thread=250):
+    """Many request threads logging users in at once; returns expected counts and latest times"""
+    expected, latest = Counter(), {}
+    lock = threading.Lock()
+    start = datetime(2025, 6, 2, 9, 0)
+    barrier = threading.Barrier(threads)
+    def logins(n):
+        barrier.wait()
+        for i in range(logins_per_thread):
+            user_id, when = f'user{(n + i) % users}', start + timedelta(seconds=n * logins_per_thread + i)
+            buffer.record(user_id, when)
+            with lock:
+                expected[user_id] += 1
+                latest[user_id] = max(latest.get(user_id, when), when)
+    workers = [threading.Thread(target=logins, args=(n,)) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return expected, latest
+
+def test_login_storm_is_written_in_few_batches_without_losing_logins():
+    users = UsersCollection()
+    buffer = LoginStatsBuffer(users, flush_interval=0.01, max_pending=10)
+    buffer.start()
+    expected, latest = storm(buffer)
+    buffer.stop()  # Shutdown flushes the rest
+
+    assert sum(expected.values()) == 10000
+    assert {user_id: doc['login_count'] for user_id, doc in users.docs.items()} == dict(expected)
+    assert {user_id: doc['last_login'] for user_id, doc in users.docs.items()} == latest
+    assert users.bulk_writes < 10000 // 10
+    assert buffer.stats['recorded'] == 10000
+
+def test_failed_flush_keeps_stats_for_the_next_one():
+    users = UsersCollection(fail_next=1)
+    buffer = LoginStatsBuffer(users, flush_interval=60)
+    buffer.record('user1')
+    buffer.record('user1')
+    with pytest.raises(ConnectionError):
+        buffer.flush()
+    buffer.record('user1')
+
+    assert buffer.flush() == 1
+    assert users.docs['user1']['login_count'] == 3
+    assert buffer.stats['failed_flushes'] == 1
+
+def test_full_buffer_flushes_before_the_interval():
+    users = UsersCollection()
+    buffer = LoginStatsBuffer(users, flush_interval=60, max_pending=5)
+    buffer.start()
+    try:
+        for n in range(5):
+            buffer.record(f'user{n}')
+        deadline = time.time() + 5
+        while len(users.docs) < 5 and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(users.docs) == 5
+    finally:
+        buffer.stop()
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,72 @@
+import os
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from map_tiles import lat_to_tile_y, lng_to_tile_x, tile_bounds, tile_count, tile_match
+
+# Every hostel must fall in exactly one map tile, including those on tile edges
+# The MongoDB check needs a server: TEST_MONGO_URI (default mongodb://localhost:27017)
+TEST_MONGO_URI = os.environ.get('TEST_MONGO_URI', 'mongodb://localhost:27017')
+EPSILON = 1e-9
+
+def edge_points(zoom, x, y):
+    """Points on and just inside/outside every edge and corner of a tile"""
+    west, south, east, north = tile_bounds(zoom, x, y)
+    middle_lat, middle_lng = (south + north) / 2, (west + east) / 2
+    points = []
+    for lat in (south - EPSILON, south, south + EPSILON, middle_lat, north - EPSILON, north, north + EPSILON):
+        for lng in (west - EPSILON, west, west + EPSILON, middle_lng, east - EPSILON, east, east + EPSILON):
+            points.append((lat, lng))
+    return points
+
+def in_range(value, condition):
+    return ('$gte' not in condition or value >= condition['$gte']) and \
+        ('$lt' not in condition or value < condition['$lt'])
+
+def tiles_containing(zoom, lat, lng):
+    """Tiles around the point whose query matches it"""
+    x, y = lng_to_tile_x(lng, zoom), lat_to_tile_y(lat, zoom)
+    found = []
+    for tx in range(max(x - 1, 0), min(x + 2, tile_count(zoom))):
+        for ty in range(max(y - 1, 0), min(y + 2, tile_count(zoom))):
+            match = tile_match(zoom, tx, ty)
+            if in_range(lat, match['latitude']) and in_range(lng, match['longitude']):
+                found.append((tx, ty))
+    return found
+
+@pytest.mark.parametrize('zoom', [2, 5, 8, 10, 15])
+def test_points_on_tile_edges_land_in_exactly_one_tile(zoom):
+    # A tile around latitude 23, where geodesic polygon edges used to drop points
+    x, y = lng_to_tile_x(72.57, zoom), lat_to_tile_y(23.03, zoom)
+    for lat, lng in edge_points(zoom, x, y):
+        found = tiles_containing(zoom, lat, lng)
+        assert len(found) == 1, (lat, lng, found)
+
+def test_world_edges_are_covered():
+    zoom = 2
+    for lat, lng in [(89.9, 0.0), (-89.9, 0.0), (10.0, 180.0), (10.0, -180.0), (85.0511, 179.99)]:
+        assert len(tiles_containing(zoom, lat, lng)) == 1, (lat, lng)
+
+def test_mongodb_agrees_on_edge_points():
+    client = MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command('ping')
+    except PyMongoError:
+        pytest.skip(f'MongoDB not reachable at {TEST_MONGO_URI}')
+    db = client['stayfinder_map_tiles_test']
+    try:
+        zoom = 8
+        x, y = lng_to_tile_x(72.57, zoom), lat_to_tile_y(23.03, zoom)
+        points = edge_points(zoom, x, y)
+        db.hostels.insert_many([{'latitude': lat, 'longitude': lng} for lat, lng in points])
+        counted = sum(
+            db.hostels.count_documents(tile_match(zoom, tx, ty))
+            for tx in range(x - 1, x + 2) for ty in range(y - 1, y + 2)
+        )
+        assert counted == len(points)
+    finally:
+        client.drop_database('stayfinder_map_tiles_test')
+        client.close()
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,94 @@
+import json
+from datetime import datetime, timezone
+import msgpack
+from bson.decimal128 import Decimal128
+from bson.objectid import ObjectId
+from flask import Flask, jsonify
+from serialization import BSONJSONProvider, MSGPACK_MIMETYPE, msgpack_ext_hook
+
+# Round-trip tests: msgpack responses must carry the same data as the JSON ones
+HOSTEL = {
+    '_id': ObjectId('65a1f0c2e4b0a1b2c3d4e5f6'),
+    'name': 'Sunrise Boys Hostel',
+    'price': 8500,
+    'deposit': Decimal128('15000.50'),
+    'latitude': 23.03423441,
+    'longitude': 72.54660545,
+    'amenities': ['WiFi', 'AC'],
+    'room_types': [{'type': 'Double Sharing', 'facility': 'AC', 'price': 9000}],
+    'created_by': ObjectId('65a1f0c2e4b0a1b2c3d4e5f7'),
+    'created_at': datetime(2025, 6, 1, 9, 30, 15, 250000),
+    'original_price': None,
+    'available': True
+}
+
+def make_app():
+    app = Flask(__name__)
+    app.json = BSONJSONProvider(app)
+
+    @app.route('/api/hostels')
+    def hostels():
+        return jsonify({'success': True, 'data': [HOSTEL, dict(HOSTEL, _id=ObjectId('65a1f0c2e4b0a1b2c3d4e5f8'))], 'count': 2})
+
+    @app.route('/page-data')
+    def page_data():
+        return jsonify({'success': True})
+
+    return app
+
+def to_json_types(value):
+    """Apply the JSON encoding rules to a decoded msgpack value"""
+    if isinstance(value, dict):
+        return {k: to_json_types(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_json_types(v) for v in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).isoformat()
+    return value
+
+def fetch_both(client, path):
+    json_response = client.get(path, headers={'Accept': 'application/json'})
+    msgpack_response = client.get(path, headers={'Accept': MSGPACK_MIMETYPE})
+    return json_response, msgpack_response
+
+def test_msgpack_negotiated():
+    client = make_app().test_client()
+    json_response, msgpack_response = fetch_both(client, '/api/hostels')
+    assert json_response.mimetype == 'application/json'
+    assert msgpack_response.mimetype == MSGPACK_MIMETYPE
+    assert 'Accept' in msgpack_response.headers['Vary']
+
+def test_round_trip_parity():
+    client = make_app().test_client()
+    json_response, msgpack_response = fetch_both(client, '/api/hostels')
+    decoded = msgpack.unpackb(msgpack_response.data, ext_hook=msgpack_ext_hook, timestamp=3)
+    assert to_json_types(decoded) == json.loads(json_response.data)
+
+def test_bson_types_use_extensions():
+    client = make_app().test_client()
+    _, msgpack_response = fetch_both(client, '/api/hostels')
+    hostel = msgpack.unpackb(msgpack_response.data, ext_hook=msgpack_ext_hook, timestamp=3)['data'][0]
+    assert hostel['_id'] == HOSTEL['_id']
+    assert hostel['created_by'] == HOSTEL['created_by']
+    assert hostel['created_at'] == HOSTEL['created_at'].replace(tzinfo=timezone.utc)
+    assert hostel['deposit'] == '15000.50'
+
+def test_msgpack_smaller_than_json():
+    client = make_app().test_client()
+    json_response, msgpack_response = fetch_both(client, '/api/hostels')
+    assert len(msgpack_response.data) < len(json_response.data)
+
+def test_non_api_routes_stay_json():
+    client = make_app().test_client()
+    response = client.get('/page-data', headers={'Accept': MSGPACK_MIMETYPE})
+    assert response.mimetype == 'application/json'
+
+if __name__ == '__main__':
+    test_msgpack_negotiated()
+    test_round_trip_parity()
+    test_bson_types_use_extensions()
+    test_msgpack_smaller_than_json()
+    test_non_api_routes_stay_json()
+    print('All msgpack parity tests passed')
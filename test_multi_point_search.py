@@ -0,0 +1,64 @@
+import pytest
+
+# Multi-point proximity search: ranking and request validation
+# The end-to-end search needs a MongoDB server (see conftest.py)
+CAMPUS_A = {'latitude': 23.0, 'longitude': 72.50}
+CAMPUS_B = {'latitude': 23.0, 'longitude': 72.60}  # ~10.2 km east of A
+
+def hostel(name, longitude):
+    return {'name': name, 'latitude': 23.0, 'longitude': longitude}
+
+def points(weight_a=1, weight_b=1):
+    return [dict(CAMPUS_A, weight=weight_a), dict(CAMPUS_B, weight=weight_b)]
+
+def test_max_ranks_by_the_farthest_point(stayfinder):
+    hostels = [hostel('Next to A', 72.51), hostel('Halfway', 72.55)]
+    ranked = stayfinder.rank_by_distance(hostels, points(), 'max')
+    assert [h['name'] for h in ranked] == ['Halfway', 'Next to A']
+    assert ranked[0]['score'] == max(ranked[0]['distances'])
+
+def test_weighted_favours_the_heavier_point(stayfinder):
+    hostels = [hostel('Halfway', 72.55), hostel('Next to A', 72.51)]
+    ranked = stayfinder.rank_by_distance(hostels, points(weight_a=3), 'weighted')
+    assert [h['name'] for h in ranked] == ['Next to A', 'Halfway']
+    near_a = ranked[0]
+    assert near_a['score'] == pytest.approx((3 * near_a['distances'][0] + near_a['distances'][1]) / 4, abs=0.01)
+
+@pytest.mark.parametrize('kwargs', [
+    {'data': 'not json', 'content_type': 'text/plain'},
+    {'json': ['a', 'list']},
+    {'json': {'points': points(), 'max_distance': 'far'}},
+    {'json': {'points': points(), 'max_distance': -1}},
+    {'json': {'points': points(), 'max_distance': 0}},
+    {'json': {'points': {'a': CAMPUS_A, 'b': CAMPUS_B}}},
+    {'json': {'points': 'campus'}},
+    {'json': {'points': ['campus', 'library']}},
+    {'json': {'points': [CAMPUS_A]}},
+    {'json': {'points': points(weight_a='heavy')}},
+    {'json': {'points': points(weight_a=0)}},
+    {'json': {'points': points(), 'rank_by': 'average'}},
+])
+def test_bad_requests_get_400(client, kwargs):
+    response = client.post('/api/hostels/search/multi', **kwargs)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+def test_unknown_college_gets_404(client):
+    response = client.post('/api/hostels/search/multi', json={
+        'points': [{'college_name': 'No Such College Anywhere'}, CAMPUS_B]
+    })
+    assert response.status_code == 404
+
+def test_search_keeps_hostels_near_every_point(stayfinder, app_db, client):
+    for name, longitude in [('Halfway', 72.55), ('Next to A', 72.51), ('Far east', 72.75)]:
+        doc = hostel(name, longitude)
+        doc.update(stayfinder.hostel_location_fields(doc['latitude'], doc['longitude']))
+        app_db.hostels.insert_one(doc)
+
+    body = client.post('/api/hostels/search/multi', json={
+        'points': points(), 'max_distance': 10, 'rank_by': 'max'
+    }).get_json()
+    assert [h['name'] for h in body['data']] == ['Halfway', 'Next to A']
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
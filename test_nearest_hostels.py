@@ -0,0 +1,41 @@
+import pytest
+
+# k-nearest hostels around an arbitrary point
+# Searches need a MongoDB server (see conftest.py)
+ORIGIN = {'lat': 23.0, 'lng': 72.5}
+
+def add_hostels(stayfinder, db):
+    """Hostels 1, 3 and 6 km due north of ORIGIN"""
+    for name, km in [('Six', 6.0), ('One', 1.0), ('Three', 3.0)]:
+        latitude, longitude = ORIGIN['lat'] + km / 111.195, ORIGIN['lng']
+        doc = {'name': name, 'latitude': latitude, 'longitude': longitude, 'property_type': 'Hostel'}
+        doc.update(stayfinder.hostel_location_fields(latitude, longitude))
+        db.hostels.insert_one(doc)
+
+def nearest(client, **params):
+    return client.get('/api/hostels/nearest', query_string=dict(ORIGIN, **params))
+
+def test_nearest_first_with_distances(stayfinder, app_db, client):
+    add_hostels(stayfinder, app_db)
+    body = nearest(client, k=2).get_json()
+    assert [h['name'] for h in body['data']] == ['One', 'Three']
+    assert [h['distance'] for h in body['data']] == pytest.approx([1.0, 3.0], abs=0.01)
+
+def test_max_distance_cuts_off_the_search(stayfinder, app_db, client):
+    add_hostels(stayfinder, app_db)
+    assert [h['name'] for h in nearest(client, max_distance=3.5).get_json()['data']] == ['One', 'Three']
+    assert [h['name'] for h in nearest(client, max_distance=0.5).get_json()['data']] == []
+    # An empty value means no radius
+    assert len(nearest(client, max_distance='').get_json()['data']) == 3
+
+@pytest.mark.parametrize('value', ['0', '-2', 'far', 'nan', 'inf'])
+def test_unusable_max_distance_gets_400(client, value):
+    response = nearest(client, max_distance=value)
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('params', [{'lat': 'x', 'lng': 72.5}, {'lng': 72.5}, {'lat': 95, 'lng': 72.5}])
+def test_bad_coordinates_get_400(client, params):
+    assert client.get('/api/hostels/nearest', query_string=params).status_code == 400
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
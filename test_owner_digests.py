@@ -0,0 +1,103 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pytest
+
+# Owner booking digests: claim, send, mark notified, or release for a retry
+# Needs a MongoDB server (see conftest.py)
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+@pytest.fixture
+def mailbox(stayfinder, monkeypatch):
+    """Messages the sweep sends; set mailbox.fail to make sends raise"""
+    class Mailbox(list):
+        fail = False
+        def send(self, message):
+            if self.fail:
+                raise ConnectionError('SMTP down')
+            self.append(message)
+    box = Mailbox()
+    @contextmanager
+    def connection():
+        yield box
+    monkeypatch.setattr(stayfinder.smtp_pool, 'connection', connection)
+    return box
+
+@pytest.fixture
+def digest(stayfinder, app_db, make_user):
+    """A digest-mode owner with two bookings old enough to be due"""
+    owner, _ = make_user(name='Owner', email='owner@example.com', user_type='owner', notification_mode='digest')
+    student, _ = make_user(name='Student')
+    hostel_id = app_db.hostels.insert_one({'name': 'Sunrise', 'created_by': str(owner['_id'])}).inserted_id
+    due = NOW - timedelta(minutes=stayfinder.OWNER_DIGEST_MINUTES + 1)
+    app_db.bookings.insert_many([
+        {'user_id': student['_id'], 'hostel_id': hostel_id, 'owner_id': owner['_id'], 'status': 'pending',
+         'owner_digest_pending': True, 'created_at': due + timedelta(minutes=m),
+         'property_type': 'Double', 'facility': 'AC'}
+        for m in (0, 1)
+    ])
+    return {'db': app_db, 'owner': owner, 'hostel_id': hostel_id}
+
+def bookings(digest):
+    return list(digest['db'].bookings.find().sort('created_at', 1))
+
+def sweep(stayfinder, minutes_later=0):
+    return stayfinder.send_owner_digests(NOW + timedelta(minutes=minutes_later))
+
+def test_due_bookings_go_out_in_one_digest_and_are_marked(stayfinder, digest, mailbox):
+    assert sweep(stayfinder) == 1
+    assert len(mailbox) == 1
+    assert mailbox[0].recipients == ['owner@example.com']
+    assert mailbox[0].subject.startswith('2 New Booking Requests')
+    for booking in bookings(digest):
+        assert booking['owner_notified_at'] == NOW
+        assert not {'owner_digest_pending', 'owner_digest_batch', 'owner_digest_claimed_at'} & set(booking)
+
+    assert sweep(stayfinder, 1) == 0  # Nothing is mailed twice
+    assert len(mailbox) == 1
+
+def test_digest_waits_until_the_oldest_booking_is_due(stayfinder, digest, mailbox):
+    digest['db'].bookings.update_many({}, {'$set': {'created_at': NOW}})
+    assert sweep(stayfinder) == 0
+    assert all(b['owner_digest_pending'] for b in bookings(digest))
+
+def test_decided_bookings_are_left_out(stayfinder, digest, mailbox):
+    first = bookings(digest)[0]
+    digest['db'].bookings.update_one({'_id': first['_id']}, {'$set': {'status': 'accepted'}})
+    assert sweep(stayfinder) == 1
+    assert mailbox[0].subject.startswith('1 New Booking Request ')
+    assert 'owner_notified_at' not in bookings(digest)[0]
+
+def test_failed_send_releases_the_claim(stayfinder, digest, mailbox):
+    mailbox.fail = True
+    assert sweep(stayfinder) == 0
+    for booking in bookings(digest):
+        assert booking['owner_digest_pending'] is True
+        assert 'owner_notified_at' not in booking and 'owner_digest_batch' not in booking
+
+    mailbox.fail = False
+    assert sweep(stayfinder, 1) == 1
+
+def test_claim_held_by_another_sweep_is_not_sent_again(stayfinder, digest, mailbox):
+    digest['db'].bookings.update_many({}, {'$set': {'owner_digest_pending': False, 'owner_digest_claimed_at': NOW}})
+    assert sweep(stayfinder) == 0
+    assert mailbox == []
+
+def test_claim_left_by_a_dead_sweep_is_reclaimed(stayfinder, digest, mailbox):
+    digest['db'].bookings.update_many({}, {'$set': {'owner_digest_pending': False, 'owner_digest_claimed_at': NOW}})
+    assert sweep(stayfinder, stayfinder.OWNER_DIGEST_CLAIM_MINUTES) == 1
+    assert all(b['owner_notified_at'] for b in bookings(digest))
+
+def test_owner_without_an_email_is_not_marked_notified(stayfinder, digest, mailbox):
+    digest['db'].users.update_one({'_id': digest['owner']['_id']}, {'$unset': {'email': ''}})
+    assert sweep(stayfinder) == 0
+    assert mailbox == []
+    assert not any('owner_notified_at' in b for b in bookings(digest))
+
+    # Once there is somewhere to send it, the lapsed claim is picked up again
+    digest['db'].hostels.update_one({'_id': digest['hostel_id']}, {'$set': {'contact_email': 'desk@example.com'}})
+    assert sweep(stayfinder, 1) == 0
+    assert sweep(stayfinder, stayfinder.OWNER_DIGEST_CLAIM_MINUTES) == 1
+    assert mailbox[0].recipients == ['desk@example.com']
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
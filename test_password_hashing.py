@@ -0,0 +1,55 @@
+import threading
+import time
+import pytest
+import bcrypt
+from password_hashing import PasswordHasher, PasswordHasherBusy, cost_factor
+
+# bcrypt pool: results match bcrypt, saturation is refused instead of queued
+def test_hash_and_check_match_bcrypt():
+    hasher = PasswordHasher(workers=2, max_pending=2, rounds=4)
+    try:
+        hashed = hasher.hash('s3cret')
+        assert cost_factor(hashed.encode('utf-8')) == 4
+        assert bcrypt.checkpw(b's3cret', hashed.encode('utf-8'))
+        existing = bcrypt.hashpw(b'older', bcrypt.gensalt(5)).decode('utf-8')
+        assert hasher.check('older', existing)
+        assert not hasher.check('wrong', existing)
+
+        metrics = hasher.metrics()
+        assert metrics['by_cost']['4']['calls'] == 1
+        assert metrics['by_cost']['5']['calls'] == 2
+        assert metrics['in_flight'] == 0 and metrics['rejected'] == 0
+    finally:
+        hasher.shutdown()
+
+def test_saturated_pool_refuses_with_retry_after():
+    hasher = PasswordHasher(workers=1, max_pending=0, rounds=13)
+    try:
+        slow = threading.Thread(target=hasher.hash, args=('burst',))
+        slow.start()
+        deadline = time.time() + 5
+        while hasher.in_flight == 0 and time.time() < deadline:
+            time.sleep(0.005)
+
+        with pytest.raises(PasswordHasherBusy) as busy:
+            hasher.check('another', bcrypt.hashpw(b'another', bcrypt.gensalt(4)))
+        assert busy.value.retry_after >= 1
+        assert hasher.metrics()['rejected'] == 1
+
+        slow.join()
+        assert hasher.check('again', bcrypt.hashpw(b'again', bcrypt.gensalt(4)))  # Capacity is back
+    finally:
+        hasher.shutdown()
+
+def test_timeout_is_reported_as_busy():
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=14, timeout=0.01)
+    try:
+        with pytest.raises(PasswordHasherBusy) as busy:
+            hasher.hash('slow')
+        assert busy.value.retry_after >= 1
+        assert hasher.metrics()['rejected'] == 1
+    finally:
+        hasher.shutdown()
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import threading
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+import photo_assets
+
+# Reference counting and deduplication of listing photos
+# Needs a MongoDB server: TEST_MONGO_URI (default mongodb://localhost:27017)
+TEST_MONGO_URI = os.environ.get('TEST_MONGO_URI', 'mongodb://localhost:27017')
+SHA = hashlib.sha256(b'front gate').hexdigest()
+VARIANTS = {'card': '/card.webp', 'detail': '/detail.webp'}
+
+@pytest.fixture
+def db():
+    client = MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command('ping')
+    except PyMongoError:
+        pytest.skip(f'MongoDB not reachable at {TEST_MONGO_URI}')
+    database = client['stayfinder_photo_assets_test']
+    photo_assets.ensure_photo_asset_indexes(database)
+    yield database
+    client.drop_database('stayfinder_photo_assets_test')
+    client.close()
+
+def test_same_content_is_reused_per_owner(db):
+    asset, created = photo_assets.register(db, 'owner1', SHA, VARIANTS, ['p1'])
+    assert created and asset['refs'] == 1
+
+    reused = photo_assets.acquire(db, 'owner1', SHA)
+    assert reused['_id'] == asset['_id'] and reused['refs'] == 2
+    assert photo_assets.acquire(db, 'owner2', SHA) is None
+    assert photo_assets.known_hashes(db, 'owner1', [SHA, 'f' * 64, 'junk']) == {SHA}
+
+def test_last_release_returns_the_asset_for_cleanup(db):
+    asset, _ = photo_assets.register(db, 'owner1', SHA, VARIANTS, ['p1', 'p2'])
+    photo_assets.acquire(db, 'owner1', SHA)
+
+    assert photo_assets.release(db, [asset['_id']]) == []
+    unused = photo_assets.release(db, [asset['_id']])
+    assert [a['public_ids'] for a in unused] == [['p1', 'p2']]
+    assert db.photo_assets.count_documents({}) == 0
+    assert photo_assets.release(db, [asset['_id']]) == []  # Already gone
+
+def test_concurrent_registrations_keep_one_copy(db):
+    results = []
+    barrier = threading.Barrier(8)
+    def upload(n):
+        barrier.wait()
+        results.append(photo_assets.register(db, 'owner1', SHA, VARIANTS, [f'p{n}']))
+    threads = [threading.Thread(target=upload, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(created for _, created in results) == 1
+    assert len({asset['_id'] for asset, _ in results}) == 1
+    assert db.photo_assets.find_one()['refs'] == 8
+
+    unused = photo_assets.release(db, [asset['_id'] for asset, _ in results])
+    assert len(unused) == 1
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,37 @@
+from responsive_images import responsive_url, srcset, srcset_entries, with_responsive_images
+
+# Offline derivation of width-limited Cloudinary delivery URLs
+ORIGINAL = 'https://res.cloudinary.com/demo/image/upload/v1712345678/stayfinder/hostels/abc.jpg'
+
+def test_transformation_is_inserted_before_the_version():
+    assert responsive_url(ORIGINAL, 320) == (
+        'https://res.cloudinary.com/demo/image/upload/c_limit,f_auto,q_auto,w_320/v1712345678/stayfinder/hostels/abc.jpg'
+    )
+    assert responsive_url(ORIGINAL, 'thumbnail').endswith('/c_limit,f_auto,q_auto,w_160/v1712345678/stayfinder/hostels/abc.jpg')
+
+def test_existing_transformations_are_replaced_not_stacked():
+    variant = 'https://res.cloudinary.com/demo/image/upload/c_limit,f_auto,h_480,q_auto,w_640/v1/stayfinder/hostels/abc'
+    assert responsive_url(variant, 960) == 'https://res.cloudinary.com/demo/image/upload/c_limit,f_auto,q_auto,w_960/v1/stayfinder/hostels/abc'
+    unversioned = 'https://res.cloudinary.com/demo/image/upload/stayfinder/hostels/abc.jpg'
+    assert responsive_url(unversioned, 320) == 'https://res.cloudinary.com/demo/image/upload/c_limit,f_auto,q_auto,w_320/stayfinder/hostels/abc.jpg'
+
+def test_other_hosts_pass_through():
+    for url in ('https://via.placeholder.com/400x300?text=No+Image', '/_local_store/v1/stayfinder/x.webp', None):
+        assert responsive_url(url) == url
+        assert srcset(url) == ''
+        assert srcset_entries(url, 'detail') == []
+
+def test_srcset_and_card_payload():
+    assert srcset(ORIGINAL).count('w, ') == 3 and srcset(ORIGINAL).endswith(' 960w')
+    hostel = with_responsive_images({'name': 'Sunrise', 'image': ORIGINAL})
+    assert [entry['width'] for entry in hostel['image_srcset']] == [320, 480, 640, 960]
+    assert hostel['image_card'] == responsive_url(ORIGINAL, 640)
+    # An uploaded card variant is kept
+    assert with_responsive_images({'image': ORIGINAL, 'image_card': '/card.webp'})['image_card'] == '/card.webp'
+
+if __name__ == '__main__':
+    test_transformation_is_inserted_before_the_version()
+    test_existing_transformations_are_replaced_not_stacked()
+    test_other_hosts_pass_through()
+    test_srcset_and_card_payload()
+    print('All responsive image tests passed')
@@ -0,0 +1,118 @@
+import os
+import threading
+from datetime import datetime, timedelta
+import pytest
+from bson.objectid import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+import inventory
+
+# Concurrency stress test for room reservations
+# Needs a MongoDB server: TEST_MONGO_URI (default mongodb://localhost:27017)
+TEST_MONGO_URI = os.environ.get('TEST_MONGO_URI', 'mongodb://localhost:27017')
+
+@pytest.fixture
+def db():
+    client = MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command('ping')
+    except PyMongoError:
+        pytest.skip(f'MongoDB not reachable at {TEST_MONGO_URI}')
+    database = client['stayfinder_inventory_test']
+    inventory.ensure_inventory_indexes(database)
+    yield database
+    client.drop_database('stayfinder_inventory_test')
+    client.close()
+
+def hammer(workers, target):
+    """Start all workers at once and wait for them"""
+    barrier = threading.Barrier(workers)
+    def run():
+        barrier.wait()
+        target()
+    threads = [threading.Thread(target=run) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_burst_never_oversells(db):
+    hostel_id = ObjectId()
+    inventory.set_capacity(db, hostel_id, 'double_ac', 10)
+
+    results = []
+    lock = threading.Lock()
+    def book():
+        for _ in range(5):
+            outcome = inventory.reserve_room(db, hostel_id, 'double_ac')
+            with lock:
+                results.append(outcome)
+
+    hammer(40, book)  # 200 requests for 10 rooms
+
+    assert results.count(inventory.RESERVED) == 10
+    assert results.count(inventory.SOLD_OUT) == 190
+    room = db.room_inventory.find_one({'hostel_id': hostel_id, 'room_id': 'double_ac'})
+    assert room['available'] == 0
+
+def test_untracked_room_types_are_not_limited(db):
+    assert inventory.reserve_room(db, ObjectId(), 'triple_regular') == inventory.UNTRACKED
+
+def test_concurrent_close_releases_once(db):
+    hostel_id = ObjectId()
+    inventory.set_capacity(db, hostel_id, 'triple_ac', 1)
+    assert inventory.reserve_room(db, hostel_id, 'triple_ac') == inventory.RESERVED
+    booking_id = db.bookings.insert_one({
+        'hostel_id': hostel_id,
+        'room_id': 'triple_ac',
+        'status': 'pending',
+        'room_reserved': True,
+        'expires_at': datetime.utcnow() - timedelta(minutes=1)
+    }).inserted_id
+
+    # An owner rejection racing the expiry sweep
+    hammer(20, lambda: inventory.close_booking(db, booking_id, 'rejected'))
+    inventory.expire_pending_bookings(db)
+
+    room = db.room_inventory.find_one({'hostel_id': hostel_id, 'room_id': 'triple_ac'})
+    assert room['available'] == 1
+    assert db.bookings.find_one({'_id': booking_id})['status'] == 'rejected'
+
+def test_capacity_change_keeps_reservations(db):
+    hostel_id = ObjectId()
+    inventory.set_capacity(db, hostel_id, 'double_regular', 5)
+    for _ in range(3):
+        inventory.reserve_room(db, hostel_id, 'double_regular')
+
+    inventory.set_capacity(db, hostel_id, 'double_regular', 4)
+    room = db.room_inventory.find_one({'hostel_id': hostel_id, 'room_id': 'double_regular'})
+    assert (room['capacity'], room['available']) == (4, 1)
+
+    inventory.set_capacity(db, hostel_id, 'double_regular', 2)
+    room = db.room_inventory.find_one({'hostel_id': hostel_id, 'room_id': 'double_regular'})
+    assert (room['reserved'], room['available']) == (3, 0)
+
+    # Releases below the new capacity free nothing until reservations fit it
+    inventory.release_room(db, hostel_id, 'double_regular')
+    room = db.room_inventory.find_one({'hostel_id': hostel_id, 'room_id': 'double_regular'})
+    assert (room['reserved'], room['available']) == (2, 0)
+    inventory.release_rooms(db, [
+        {'hostel_id': hostel_id, 'room_id': 'double_regular', 'room_reserved': True}
+    ] * 5)
+    room = db.room_inventory.find_one({'hostel_id': hostel_id, 'room_id': 'double_regular'})
+    assert (room['reserved'], room['available']) == (0, 2)
+
+def test_expiry_leaves_untracked_bookings_pending(db):
+    hostel_id = ObjectId()
+    booking_id = db.bookings.insert_one({
+        'hostel_id': hostel_id,
+        'room_id': 'single_regular',
+        'status': 'pending',
+        'room_reserved': False,
+        'expires_at': datetime.utcnow() - timedelta(minutes=1)
+    }).inserted_id
+    assert inventory.expire_pending_bookings(db) == 0
+    assert db.bookings.find_one({'_id': booking_id})['status'] == 'pending'
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
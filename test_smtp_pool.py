@@ -0,0 +1,180 @@
+import socket
+import socketserver
+import threading
+import time
+from flask import Flask
+from flask_mail import Mail, Message
+from smtp_pool import SMTPPool
+
+# Stand-in SMTP server: enough of the protocol for smtplib, counting sessions
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.sessions += 1
+            server.open_sessions.add(self)
+            server.peak = max(server.peak, len(server.open_sessions))
+        try:
+            self.reply('220 stand-in ESMTP')
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                command = line.decode('ascii', 'replace').strip().upper()
+                if command.startswith('EHLO'):
+                    self.reply('250 stand-in')
+                elif command.startswith('DATA'):
+                    self.reply('354 end with .')
+                    while self.rfile.readline() not in (b'.\r\n', b''):
+                        pass
+                    time.sleep(server.delay)
+                    with server.lock:
+                        server.messages += 1
+                    self.reply('250 queued')
+                elif command.startswith('QUIT'):
+                    self.reply('221 bye')
+                    return
+                else:  # HELO, MAIL, RCPT, NOOP, RSET
+                    self.reply('250 ok')
+        except OSError:
+            pass
+        finally:
+            with server.lock:
+                server.open_sessions.discard(self)
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, delay=0):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.lock = threading.Lock()
+        self.delay = delay
+        self.sessions = 0
+        self.messages = 0
+        self.peak = 0
+        self.open_sessions = set()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def drop_sessions(self):
+        """Hang up on every client, like a server timing out idle sessions"""
+        with self.lock:
+            for handler in list(self.open_sessions):
+                handler.connection.shutdown(socket.SHUT_RDWR)
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def make_app(server):
+    app = Flask(__name__)
+    app.config.update(
+        MAIL_SERVER='127.0.0.1', MAIL_PORT=server.server_address[1],
+        MAIL_USE_TLS=False, MAIL_DEFAULT_SENDER='noreply@stayfinder.test'
+    )
+    return app, Mail(app)
+
+def booking_emails(n):
+    """The user and owner emails one booking request sends"""
+    return [
+        Message(subject, recipients=[to])
+        for i in range(n)
+        for subject, to in ((f'Booking Request Confirmed {i}', 'student@example.com'),
+                            (f'New Booking Request {i}', 'owner@example.com'))
+    ]
+
+def test_handshakes_drop_with_pool():
+    server = StandInSMTPServer()
+    try:
+        app, mail = make_app(server)
+        with app.app_context():
+            for message in booking_emails(5):
+                mail.send(message)
+            unpooled = server.sessions
+
+            pool = SMTPPool(mail)
+            for i in range(5):
+                pool.send(*booking_emails(1))
+        assert unpooled == 10  # Two handshakes per booking
+        assert server.sessions - unpooled == 1
+        assert server.messages == 20
+        assert pool.stats['reused'] == 4
+    finally:
+        server.stop()
+
+def test_reconnects_after_server_hangs_up():
+    server = StandInSMTPServer()
+    try:
+        app, mail = make_app(server)
+        pool = SMTPPool(mail, check_after=3600)  # Skip NOOP, so the send itself fails
+        with app.app_context():
+            pool.send(*booking_emails(1))
+            server.drop_sessions()
+            time.sleep(0.1)
+            pool.send(*booking_emails(1))
+        assert pool.stats['reconnects'] == 1
+        assert server.messages == 4
+    finally:
+        server.stop()
+
+def test_noop_check_replaces_dead_idle_session():
+    server = StandInSMTPServer()
+    try:
+        app, mail = make_app(server)
+        pool = SMTPPool(mail, check_after=0)
+        with app.app_context():
+            pool.send(*booking_emails(1))
+            server.drop_sessions()
+            time.sleep(0.1)
+            pool.send(*booking_emails(1))
+        assert pool.stats['reconnects'] == 0
+        assert pool.stats['connects'] == 2
+        assert server.messages == 4
+    finally:
+        server.stop()
+
+def test_idle_sessions_expire():
+    server = StandInSMTPServer()
+    try:
+        app, mail = make_app(server)
+        pool = SMTPPool(mail, idle_timeout=0)
+        with app.app_context():
+            pool.send(*booking_emails(1))
+            time.sleep(0.01)
+            pool.send(*booking_emails(1))
+        assert pool.stats['connects'] == 2
+        assert pool.stats['reused'] == 0
+    finally:
+        server.stop()
+
+def test_concurrent_sessions_are_capped():
+    server = StandInSMTPServer(delay=0.02)
+    try:
+        app, mail = make_app(server)
+        pool = SMTPPool(mail, max_connections=2)
+
+        def book():
+            with app.app_context():
+                pool.send(*booking_emails(1))
+
+        threads = [threading.Thread(target=book) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert server.messages == 16
+        assert server.peak <= 2
+        assert pool.stats['connects'] <= 2
+    finally:
+        server.stop()
+
+if __name__ == '__main__':
+    test_handshakes_drop_with_pool()
+    test_reconnects_after_server_hangs_up()
+    test_noop_check_replaces_dead_idle_session()
+    test_idle_sessions_expire()
+    test_concurrent_sessions_are_capped()
+    print('All SMTP pool tests passed')
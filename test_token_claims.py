@@ -0,0 +1,62 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+# Token claims (name, user_type, pv) and when /api/auth/verify stops trusting them
+# Needs a MongoDB server (see conftest.py)
+def verify(client, headers):
+    return client.get('/api/auth/verify', headers=headers)
+
+def test_current_claims_are_served_without_reading_the_user(client, app_db, make_user):
+    user, headers = make_user(name='Asha', user_type='owner')
+    app_db.users.update_one({'_id': user['_id']}, {'$set': {'name': 'Changed behind the cache'}})
+    data = verify(client, headers).get_json()['data']
+    assert data == {'_id': str(user['_id']), 'name': 'Asha', 'user_type': 'owner', 'profile_version': 0}
+
+def test_profile_update_makes_issued_tokens_stale(stayfinder, client, app_db, make_user):
+    user, headers = make_user(name='Asha')
+    assert verify(client, headers).get_json()['data']['name'] == 'Asha'  # Caches pv 0
+
+    with client.session_transaction() as session:
+        session['user_id'] = str(user['_id'])
+    assert client.post('/update-profile', json={'name': 'Asha Patel'}).get_json()['success']
+
+    data = verify(client, headers).get_json()['data']
+    assert data['name'] == 'Asha Patel'
+    assert data['profile_version'] == 1
+    with stayfinder.app.test_request_context(headers=headers):
+        stayfinder.verify_jwt_in_request()
+        assert stayfinder.token_profile() is None
+
+def test_forget_profile_version_drops_the_cached_entry(stayfinder, app_db, make_user):
+    user, _ = make_user()
+    user_id = str(user['_id'])
+    assert stayfinder.current_profile_version(user_id) == 0
+
+    app_db.users.update_one({'_id': user['_id']}, {'$inc': {'profile_version': 1}})
+    assert stayfinder.current_profile_version(user_id) == 0  # Still cached
+
+    stayfinder.forget_profile_version(user['_id'])  # Accepts the ObjectId update_profile has
+    assert user_id not in stayfinder.profile_versions
+    assert stayfinder.current_profile_version(user_id) == 1
+
+def test_cache_keeps_only_the_most_recent_users(stayfinder, app_db, make_user, monkeypatch):
+    monkeypatch.setattr(stayfinder, 'PROFILE_VERSION_CACHE_SIZE', 2)
+    ids = [str(make_user()[0]['_id']) for _ in range(3)]
+    for user_id in ids:
+        stayfinder.current_profile_version(user_id)
+    assert list(stayfinder.profile_versions) == ids[1:]
+
+def test_token_without_claims_reads_the_user(stayfinder, client, make_user):
+    user, _ = make_user(name='Asha')
+    with stayfinder.app.app_context():
+        token = create_access_token(identity=str(user['_id']))  # Issued before tokens carried claims
+    data = verify(client, {'Authorization': f'Bearer {token}'}).get_json()['data']
+    assert data['name'] == 'Asha'
+
+def test_deleted_user_is_not_found(client, app_db, make_user):
+    user, headers = make_user()
+    app_db.users.delete_one({'_id': user['_id']})
+    assert verify(client, headers).status_code == 404
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+import pytest
+from bson.objectid import ObjectId
+
+# Keyset pagination of /api/user/bookings
+# Needs a MongoDB server (see conftest.py)
+def add_bookings(db, user_id):
+    """Seven bookings, three of them created in the same millisecond"""
+    hostel_id = db.hostels.insert_one({'name': 'Sunrise', 'city': 'Ahmedabad', 'price': 6000}).inserted_id
+    base = datetime(2025, 6, 1, 9, 0, 0)
+    times = [base + timedelta(minutes=m) for m in (0, 5, 10, 10, 10, 15, 20)]
+    for created_at in times:
+        db.bookings.insert_one({'user_id': user_id, 'hostel_id': hostel_id, 'status': 'pending', 'created_at': created_at})
+    db.bookings.insert_one({'user_id': ObjectId(), 'hostel_id': hostel_id, 'status': 'pending', 'created_at': base})
+    return list(db.bookings.find({'user_id': user_id}).sort([('created_at', -1), ('_id', -1)]))
+
+def fetch_all(client, headers, limit):
+    pages, cursor = [], None
+    while True:
+        params = {'limit': limit}
+        if cursor:
+            params['cursor'] = cursor
+        body = client.get('/api/user/bookings', query_string=params, headers=headers).get_json()
+        assert body['success'], body
+        pages.append(body['data'])
+        cursor = body['next_cursor']
+        if not cursor:
+            return pages
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 7, 100])
+def test_pages_cover_every_booking_once_in_order(app_db, client, make_user, limit):
+    user, headers = make_user()
+    expected = add_bookings(app_db, user['_id'])
+
+    pages = fetch_all(client, headers, limit)
+    seen = [booking['_id'] for page in pages for booking in page]
+    assert seen == [str(booking['_id']) for booking in expected]  # Ties broken by _id, nothing repeated or lost
+    assert all(len(page) <= limit for page in pages)
+    assert pages[0][0]['hostel']['name'] == 'Sunrise'
+
+def test_same_cursor_gives_the_same_page(app_db, client, make_user):
+    user, headers = make_user()
+    add_bookings(app_db, user['_id'])
+    cursor = client.get('/api/user/bookings?limit=2', headers=headers).get_json()['next_cursor']
+    first = client.get('/api/user/bookings', query_string={'limit': 2, 'cursor': cursor}, headers=headers).get_json()
+    again = client.get('/api/user/bookings', query_string={'limit': 2, 'cursor': cursor}, headers=headers).get_json()
+    assert first['data'] == again['data']
+
+@pytest.mark.parametrize('params', [{'cursor': 'garbage'}, {'cursor': '123-notanobjectid'}, {'limit': 'abc'}])
+def test_malformed_parameters_get_400(app_db, client, make_user, params):
+    _, headers = make_user()
+    response = client.get('/api/user/bookings', query_string=params, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -2,7 +2,7 @@
 # Add this to your Flask app requirements.txt: flask-socketio
 
 from flask_socketio import SocketIO, emit, join_room, leave_room, disconnect
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 import json
 from datetime import datetime
 
@@ -74,10 +74,13 @@ def handle_authenticate(data):
     """Handle user authentication"""
     try:
         current_user_id = get_jwt_identity()
+        claims = get_jwt()  # name and user_type travel in the token; no user lookup
         connected_users[request.sid] = current_user_id
         
         emit('authenticated', {
             'user_id': current_user_id,
+            'name': claims.get('name'),
+            'user_type': claims.get('user_type'),
             'message': 'Authentication successful'
         })
         